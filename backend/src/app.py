@@ -4,9 +4,27 @@ from app.api.infrastructure_routes import planner_bp
 from app.api.flow_optimization_routes import flow_bp
 from app.api.transportation_routes import transportation_bp
 from app.api.emergency_routes import emergency_bp
-def create_app():
+from app.api.network_routes import network_bp
+from app.graph.snapshot import init_network, registry, watch_network
+def create_app(config=None):
     app = Flask(__name__)
-    CORS(app)  # Enables CORS for all routes    # Register infrastructure-related routes
+    CORS(app)  # Enables CORS for all routes
+
+    # Settings such as NETWORK_DATA_DIR / NETWORK_WATCH come from FLASK_* env vars or config
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+
+    # Build the shared network snapshot once; every blueprint borrows it.
+    # OD_MATRIX_DIR opts in to precomputed all-pairs route tables stored in that folder
+    init_network(app.config.get("NETWORK_DATA_DIR", "data"), app.config.get("OD_MATRIX_DIR"))
+    app.extensions["network_snapshots"] = registry
+
+    # Optionally pick up edits to the data folder without restarting the workers
+    if app.config.get("NETWORK_WATCH", False):
+        app.extensions["network_watcher"] = watch_network(app.config.get("NETWORK_WATCH_INTERVAL", 2.0))
+
+    # Register infrastructure-related routes
     app.register_blueprint(planner_bp, url_prefix="/planner")
 
     # Register flow optimization routes
@@ -18,6 +36,9 @@ def create_app():
     # Register emergency response routes
     app.register_blueprint(emergency_bp, url_prefix="/emergency")
 
+    # Register network snapshot status and reload routes
+    app.register_blueprint(network_bp, url_prefix="/network")
+
     return app
 
 if __name__ == "__main__":
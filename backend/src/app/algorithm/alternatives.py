@@ -0,0 +1,180 @@
+"""
+Alternative routes by the via-node (plateau) method over a CompiledGraph.
+One Dijkstra tree is grown from the origin and one from the destination,
+each only as far as (1 + MAX_STRETCH) times the shortest route cost. Every
+node v that both trees reach names a route origin -> v -> destination read
+straight from the trees. Where the two trees run along the same edges they
+form a plateau, and a long plateau marks a route that is a sensible detour
+rather than one that doubles back. The shortest route is read from the same
+origin tree, so the primary route and any number of alternatives cost two
+bounded searches instead of one search per route.
+"""
+import heapq
+import math
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import networkx as nx
+
+from .search import RouteEngine
+
+# Alternatives cost at most this much more than the shortest route (0.25 = 25 %)
+MAX_STRETCH = 0.25
+
+# Share of its kilometres an alternative may have in common with routes already chosen
+MAX_SHARING = 0.8
+
+# Shortest plateau, as a share of the shortest route's kilometres, that marks a usable detour
+MIN_PLATEAU = 0.1
+
+# Most alternatives one request may ask for
+MAX_ALTERNATIVES = 5
+
+
+def parse_alternatives(value: Optional[str]) -> int:
+    """Number of alternatives asked for by a query parameter (0 if absent); raises ValueError if invalid."""
+    try:
+        count = int(value) if value else 0
+    except ValueError:
+        raise ValueError(f"Invalid alternatives: {value}") from None
+    if not 0 <= count <= MAX_ALTERNATIVES:
+        raise ValueError(f"alternatives must be between 0 and {MAX_ALTERNATIVES}")
+    return count
+
+
+class AlternativeRoutes:
+    """
+    Alternative routes over the weights of a RouteEngine.
+    Overlap and plateaus are measured in kilometres of road, so they stay meaningful
+    for profiles where many edges cost nothing (e.g. the flow-free congestion column).
+    Safe to share between threads.
+    """
+
+    def __init__(self, engine: RouteEngine):
+        self.engine = engine
+        graph = engine.graph
+        self.arc_km = graph.dist_km[graph.arc_edge].tolist()
+
+    def paths(self, origin: Hashable, dest: Hashable, count: int,
+              primary: Optional[Sequence[Hashable]] = None) -> List[Tuple[float, List[Hashable]]]:
+        """
+        Up to count (cost, path of node IDs) routes from origin to dest, cheapest first.
+        Without primary the first one is the shortest route, read from the origin tree
+        the alternatives are found with; with primary (a path the caller already has)
+        only routes that differ enough from it are returned.
+        """
+        engine = self.engine
+        source, target = engine.node(origin), engine.node(dest)
+        if count <= 0:
+            return []
+        if source == target:
+            return [] if primary is not None else [(0.0, [origin])]
+        fwd = self._tree(source, target)
+        cost_f, _, parent_f, _ = fwd
+        if target not in cost_f:
+            raise nx.NetworkXNoPath(f"Node {dest} not reachable from {origin}")
+        limit = cost_f[target] * (1 + MAX_STRETCH)
+        bwd = self._tree(target, -1, limit)
+
+        chosen: Set[Tuple[int, int]] = set()
+        routes = []
+        if primary is not None:
+            ids = [engine.node(nid) for nid in primary]
+            chosen.update(_pairs(ids))
+        else:
+            path = [target]
+            while path[-1] != source:
+                path.append(parent_f[path[-1]])
+            path.reverse()
+            chosen.update(_pairs(path))
+            routes.append((cost_f[target], [engine.graph.nodes.id_of(v) for v in path]))
+            if len(routes) == count:
+                return routes
+        for cost, path, arcs, km in self._candidates(source, target, fwd, bwd, limit):
+            pairs = _pairs(path)
+            shared = sum(self.arc_km[a] for a, pair in zip(arcs, pairs) if pair in chosen)
+            if shared > MAX_SHARING * km:
+                continue
+            chosen.update(pairs)
+            routes.append((cost, [engine.graph.nodes.id_of(v) for v in path]))
+            if len(routes) == count:
+                break
+        return routes
+
+    # ------------------------------------------------------------------
+    # Trees and candidates (node integers)
+    # ------------------------------------------------------------------
+
+    def _tree(self, source: int, target: int, limit: float = math.inf):
+        """
+        (cost, km, parent, parent arc) dicts of the nodes settled from source up to limit.
+        With a target, limit becomes (1 + MAX_STRETCH) times its cost once it is settled.
+        """
+        offsets, heads, weights = self.engine.offsets, self.engine.targets, self.engine.weights
+        arc_km = self.arc_km
+        cost: Dict[int, float] = {}
+        km: Dict[int, float] = {}
+        parent: Dict[int, int] = {}
+        via: Dict[int, int] = {}
+        best = {source: 0.0}
+        heap = [(0.0, 0.0, source, -1, -1)]
+        while heap:
+            d, dk, u, p, a = heapq.heappop(heap)
+            if u in cost:
+                continue
+            if d > limit:
+                break
+            cost[u], km[u], parent[u], via[u] = d, dk, p, a
+            if u == target:
+                limit = d * (1 + MAX_STRETCH)
+            for k in range(offsets[u], offsets[u + 1]):
+                v = heads[k]
+                nd = d + weights[k]
+                if v not in cost and nd < best.get(v, math.inf):
+                    best[v] = nd
+                    heapq.heappush(heap, (nd, dk + arc_km[k], v, u, k))
+        return cost, km, parent, via
+
+    def _candidates(self, source: int, target: int, fwd, bwd, limit: float):
+        """
+        (cost, path, arcs, km) of one simple via route per plateau, cheapest first,
+        skipping plateaus shorter than MIN_PLATEAU of the shortest route's kilometres.
+        """
+        cost_f, km_f, parent_f, via_f = fwd
+        cost_b, km_b, parent_b, via_b = bwd
+        min_plateau = MIN_PLATEAU * km_f[target]
+        vias = sorted((cost_f[v] + c, v) for v, c in cost_b.items() if v in cost_f and cost_f[v] + c <= limit)
+        claimed = set()
+        for total, v in vias:
+            if v in claimed:
+                continue
+            # Walk the plateau through v: edges that lie on both trees
+            x = v
+            while x != source and parent_b.get(parent_f[x]) == x:
+                x = parent_f[x]
+            y = v
+            while y != target and parent_f.get(parent_b[y]) == y:
+                y = parent_b[y]
+            z = y
+            while z != x:
+                claimed.add(z)
+                z = parent_f[z]
+            claimed.add(x)
+            if km_f[y] - km_f[x] < min_plateau:
+                continue
+            path, arcs = [v], []
+            while path[-1] != source:
+                arcs.append(via_f[path[-1]])
+                path.append(parent_f[path[-1]])
+            path.reverse()
+            arcs.reverse()
+            while path[-1] != target:
+                arcs.append(via_b[path[-1]])
+                path.append(parent_b[path[-1]])
+            if len(set(path)) != len(path):
+                continue
+            yield total, path, arcs, km_f[v] + km_b[v]
+
+
+def _pairs(path: Sequence[int]) -> List[Tuple[int, int]]:
+    """Undirected node pairs of the edges along path."""
+    return [(u, v) if u < v else (v, u) for u, v in zip(path[:-1], path[1:])]
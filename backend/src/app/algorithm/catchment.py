@@ -0,0 +1,194 @@
+"""
+Facility catchments (network Voronoi cells) over a CompiledGraph.
+One Dijkstra seeded from every facility of a type assigns each node to the
+facility that reaches it first, with the time and the predecessor on that
+facility's route. The nearest facility of a node is then an array lookup,
+and its route is unpacked by following predecessors. When only the edge
+weights change, updated() repairs the index around the changed edges
+instead of searching the whole graph again.
+"""
+import heapq
+import math
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from ..graph.compiled import CompiledGraph
+
+# Share of changed edges above which updated() rebuilds the index instead of repairing it
+REPAIR_FRACTION = 0.02
+
+
+class FacilityCatchment:
+    """
+    Nearest facility of every node of a CompiledGraph under one edge-minutes column.
+    facility holds the node integer of each node's facility, minutes its time and
+    parent / parent_edge the predecessor and edge on the route from that facility;
+    all are -1 (minutes inf) where no facility reaches the node.
+    Safe to share between threads.
+    """
+
+    def __init__(self, graph: CompiledGraph, weights: np.ndarray, sources: np.ndarray,
+                 facility: np.ndarray, minutes: np.ndarray, parent: np.ndarray, parent_edge: np.ndarray):
+        self.graph = graph
+        self.weights = weights
+        self.sources = sources
+        self.facility = facility
+        self.minutes = minutes
+        self.parent = parent
+        self.parent_edge = parent_edge
+
+    @classmethod
+    def build(cls, graph: CompiledGraph, weights: np.ndarray, facilities: Iterable[Hashable]) -> 'FacilityCatchment':
+        """Catchments of facilities (node IDs; ones missing from graph are ignored) under weights."""
+        weights = np.asarray(weights, dtype=np.float64)
+        if np.any(weights < 0):
+            raise ValueError("FacilityCatchment requires non-negative travel times")
+        nodes = graph.nodes
+        sources = np.array(sorted({i for i in (nodes.get(f) for f in facilities) if i >= 0}), dtype=np.int32)
+        n = graph.num_nodes
+        dist = [math.inf] * n
+        facility = [-1] * n
+        for s in sources.tolist():
+            dist[s] = 0.0
+            facility[s] = s
+        labels = (dist, facility, [-1] * n, [-1] * n)
+        heap = [(0.0, s) for s in sources.tolist()]
+        cls._settle(cls._adjacency(graph, weights), heap, labels)
+        return cls(graph, weights, sources, *cls._arrays(labels))
+
+    def compatible(self, graph: CompiledGraph, facilities: Iterable[Hashable]) -> bool:
+        """
+        True when graph has the same nodes and edges as the graph of this index and
+        facilities are the same set, so that only the edge weights can differ.
+        """
+        old = self.graph
+        if graph is not old and not (graph.nodes.ids == old.nodes.ids
+                                     and np.array_equal(graph.edge_u, old.edge_u)
+                                     and np.array_equal(graph.edge_v, old.edge_v)):
+            return False
+        nodes = graph.nodes
+        return sorted({i for i in (nodes.get(f) for f in facilities) if i >= 0}) == self.sources.tolist()
+
+    def updated(self, graph: CompiledGraph, weights: np.ndarray) -> 'FacilityCatchment':
+        """
+        Index of the same facilities over graph (see compatible()) with new weights.
+        Nodes whose route used an edge that got slower are cleared, together with everything
+        routed through them; they and the ends of every edge that got faster seed a Dijkstra
+        that only runs until the labels stop improving.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if np.any(weights < 0):
+            raise ValueError("FacilityCatchment requires non-negative travel times")
+        changed = np.flatnonzero(weights != self.weights)
+        if not len(changed):
+            return type(self)(graph, weights, self.sources, self.facility, self.minutes, self.parent,
+                              self.parent_edge)
+
+        if len(changed) > REPAIR_FRACTION * len(weights):
+            return self.build(graph, weights, (graph.nodes.id_of(s) for s in self.sources.tolist()))
+
+        slower = changed[weights[changed] > self.weights[changed]]
+        faster = changed[weights[changed] < self.weights[changed]]
+        labels = dist, facility, parent, parent_edge = (
+            self.minutes.copy(), self.facility.copy(), self.parent.copy(), self.parent_edge.copy())
+
+        # Every node whose route from its facility crosses a slower edge, by walking the tree down
+        cleared = np.flatnonzero(np.isin(self.parent_edge, slower)).tolist()
+        if cleared:
+            routed = np.flatnonzero(self.parent >= 0)
+            children = routed[np.argsort(self.parent[routed], kind='stable')]
+            first = np.zeros(graph.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.parent[routed], minlength=graph.num_nodes), out=first[1:])
+            seen = set(cleared)
+            for v in cleared:
+                for c in children[first[v]:first[v + 1]].tolist():
+                    if c not in seen:
+                        seen.add(c)
+                        cleared.append(c)
+            dist[cleared] = math.inf
+            facility[cleared] = parent[cleared] = parent_edge[cleared] = -1
+
+        # The arrays are indexed directly: the repair only touches the nodes around changed edges
+        adjacency = offsets, heads, arc_edge, arc_weights = (graph.offsets, graph.targets, graph.arc_edge,
+                                                             weights[graph.arc_edge])
+        heap = []
+
+        def relax(u: int, v: int, e: int, w: float) -> None:
+            nd = dist[u] + w
+            if nd < dist[v]:
+                dist[v] = nd
+                facility[v] = facility[u]
+                parent[v] = u
+                parent_edge[v] = e
+                heap.append((nd, v))
+
+        # Cleared nodes take the best offer of a neighbour that kept its label
+        for v in cleared:
+            for a in range(offsets[v], offsets[v + 1]):
+                relax(int(heads[a]), v, int(arc_edge[a]), float(arc_weights[a]))
+        for e in faster.tolist():
+            u, v, w = int(graph.edge_u[e]), int(graph.edge_v[e]), float(weights[e])
+            relax(u, v, e, w)
+            relax(v, u, e, w)
+        heapq.heapify(heap)
+        self._settle(adjacency, heap, labels)
+        return type(self)(graph, weights, self.sources, facility, dist, parent, parent_edge)
+
+    @staticmethod
+    def _adjacency(graph: CompiledGraph, weights: np.ndarray) -> Tuple[List[int], List[int], List[int], List[float]]:
+        """(offsets, neighbours, edge ids, weights) of the arcs as plain lists for a full search."""
+        return graph.offsets.tolist(), graph.targets.tolist(), graph.arc_edge.tolist(), weights[graph.arc_edge].tolist()
+
+    @staticmethod
+    def _settle(adjacency, heap: List[Tuple[float, int]], labels) -> None:
+        """Dijkstra from the labels in heap, improving labels (lists or arrays) in place."""
+        dist, facility, parent, parent_edge = labels
+        offsets, heads, arc_edge, arc_weights = adjacency
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for a in range(offsets[u], offsets[u + 1]):
+                v = heads[a]
+                nd = d + arc_weights[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    facility[v] = facility[u]
+                    parent[v] = u
+                    parent_edge[v] = arc_edge[a]
+                    heapq.heappush(heap, (nd, v))
+
+    @staticmethod
+    def _arrays(labels) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        dist, facility, parent, parent_edge = labels
+        return (np.array(facility, dtype=np.int32), np.array(dist, dtype=np.float64),
+                np.array(parent, dtype=np.int32), np.array(parent_edge, dtype=np.int32))
+
+    def nearest(self, node: Hashable) -> Optional[Tuple[Hashable, float, List[Hashable]]]:
+        """
+        (facility ID, minutes, path from the facility to node) of the facility
+        that reaches node first, or None if no facility reaches it.
+        """
+        nodes = self.graph.nodes
+        v = nodes.get(node)
+        if v < 0:
+            raise nx.NodeNotFound(f"Node {node} not in graph")
+        if self.facility[v] < 0:
+            return None
+        path = [v]
+        while self.parent[path[-1]] >= 0:
+            path.append(int(self.parent[path[-1]]))
+        return nodes.id_of(path[-1]), float(self.minutes[v]), [nodes.id_of(u) for u in reversed(path)]
+
+    def cell(self, facility: Hashable) -> List[Hashable]:
+        """IDs of the nodes that facility reaches first (its Voronoi cell), itself included."""
+        idx = self.graph.nodes.get(facility)
+        if idx < 0:
+            return []
+        return [self.graph.nodes.id_of(v) for v in np.flatnonzero(self.facility == idx).tolist()]
+
+    def __repr__(self) -> str:
+        covered = int(np.count_nonzero(self.facility >= 0))
+        return f"FacilityCatchment(facilities={len(self.sources)}, nodes={covered}/{self.graph.num_nodes})"
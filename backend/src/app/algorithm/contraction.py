@@ -0,0 +1,503 @@
+"""
+Contraction Hierarchies over one weight column of a CompiledGraph.
+Nodes are contracted in order of importance; every contraction adds the
+shortcuts needed to keep shortest-path costs between the remaining nodes.
+Queries then run a bidirectional Dijkstra that only climbs to higher-ranked
+nodes, settling a few dozen nodes where a plain search settles thousands,
+and shortcuts are unpacked back into road nodes afterwards.
+"""
+import heapq
+import math
+import threading
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+from ..graph.compiled import CompiledGraph, NodeIndex
+from .search import SearchSpace
+
+# Cost profiles preprocessed for every traffic period when a snapshot is built
+HIERARCHY_PROFILES = (
+    'congestion',
+    'emergency:ambulance',
+    'emergency:fire_truck',
+    'emergency:police',
+)
+
+# Nodes a witness search may settle before it gives up and keeps the shortcut
+WITNESS_LIMIT = 64
+
+
+class ContractionHierarchy:
+    """
+    Upward graph of a contracted network in CSR form.
+
+    Arcs leaving node i are offsets[i]:offsets[i+1] and always lead to a
+    higher-ranked node. An arc is either an original edge (edges[a] is its
+    edge id) or a shortcut whose two halves are the arcs children[a] of the
+    node it bypasses. Like RouteEngine, it is safe to share between threads.
+    """
+
+    ARRAY_FIELDS = ('rank', 'offsets', 'targets', 'weights', 'children', 'edges')
+
+    def __init__(self, nodes: NodeIndex, rank: np.ndarray, offsets: np.ndarray, targets: np.ndarray,
+                 weights: np.ndarray, children: np.ndarray, edges: np.ndarray):
+        self.nodes = nodes
+        self.rank = rank
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.children = children
+        self.edges = edges
+        self._local = threading.local()
+        # Plain lists for the pure-Python query loop
+        self._offsets = offsets.tolist()
+        self._targets = targets.tolist()
+        self._weights = weights.tolist()
+        self._children = children.tolist()
+        sources = np.repeat(np.arange(len(rank), dtype=np.int32), np.diff(offsets))
+        self._sources = sources.tolist()
+        # Arcs grouped by their (higher) head, used to stall nodes reached too expensively
+        order = np.argsort(targets, kind='stable')
+        down_offsets = np.zeros(len(rank) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=len(rank)), out=down_offsets[1:])
+        self._down_offsets = down_offsets.tolist()
+        self._down_sources = sources[order].tolist()
+        self._down_weights = weights[order].tolist()
+
+    # ------------------------------------------------------------------
+    # Preprocessing
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, graph: CompiledGraph, weights: Optional[np.ndarray] = None,
+              witness_limit: int = WITNESS_LIMIT) -> 'ContractionHierarchy':
+        """Contract graph under weights (an array over edge ids, default dist_km)."""
+        weights = graph.dist_km if weights is None else np.asarray(weights, dtype=np.float64)
+        n = graph.num_nodes
+        # adjacency[v][u] = (weight, edge id or -1, bypassed node or -1) over uncontracted nodes;
+        # parallel edges keep the cheapest one
+        adjacency: List[Dict[int, Tuple[float, int, int]]] = [{} for _ in range(n)]
+        for e, (u, v, w) in enumerate(zip(graph.edge_u.tolist(), graph.edge_v.tolist(), weights.tolist())):
+            if u == v or not (w >= 0 and math.isfinite(w)):
+                continue
+            current = adjacency[u].get(v)
+            if current is None or w < current[0]:
+                adjacency[u][v] = adjacency[v][u] = (w, e, -1)
+
+        contractor = _Contractor(adjacency, witness_limit)
+        deleted = [0] * n
+        heap = [(contractor.priority(v, deleted[v]), v) for v in range(n)]
+        heapq.heapify(heap)
+        rank = np.zeros(n, dtype=np.int32)
+        up: List[List[Tuple[int, float, int, int]]] = [[] for _ in range(n)]
+        contracted = [False] * n
+        level = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            if contracted[v]:
+                continue
+            # Lazy update: re-evaluate v and put it back if it is no longer the least important
+            priority = contractor.priority(v, deleted[v])
+            if heap and priority > heap[0][0]:
+                heapq.heappush(heap, (priority, v))
+                continue
+            rank[v] = level
+            level += 1
+            contracted[v] = True
+            for u, (w, e, mid) in adjacency[v].items():
+                up[v].append((u, w, e, mid))
+                deleted[u] += 1
+            contractor.contract(v)
+
+        # Upward arcs in CSR form; a shortcut u-w via mid points at the arcs mid->u and mid->w
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(arcs) for arcs in up], out=offsets[1:])
+        arc_of: Dict[Tuple[int, int], int] = {}
+        for v, arcs in enumerate(up):
+            for k, (u, _w, _e, _mid) in enumerate(arcs):
+                arc_of[(v, u)] = int(offsets[v]) + k
+        count = int(offsets[-1])
+        targets = np.empty(count, dtype=np.int32)
+        arc_weights = np.empty(count, dtype=np.float64)
+        children = np.full((count, 2), -1, dtype=np.int32)
+        edges = np.full(count, -1, dtype=np.int32)
+        a = 0
+        for v, arcs in enumerate(up):
+            for u, w, e, mid in arcs:
+                targets[a] = u
+                arc_weights[a] = w
+                if mid >= 0:
+                    children[a] = (arc_of[(mid, v)], arc_of[(mid, u)])
+                else:
+                    edges[a] = e
+                a += 1
+        return cls(graph.nodes, rank, offsets, targets, arc_weights, children, edges)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays of the hierarchy keyed by ARRAY_FIELDS, for serialisation."""
+        return {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+
+    @classmethod
+    def from_arrays(cls, nodes: NodeIndex, arrays: Dict[str, np.ndarray]) -> 'ContractionHierarchy':
+        return cls(nodes, *(arrays[name] for name in cls.ARRAY_FIELDS))
+
+    @property
+    def num_shortcuts(self) -> int:
+        return int(np.count_nonzero(self.edges < 0))
+
+    def __repr__(self) -> str:
+        return f"ContractionHierarchy(nodes={len(self.rank)}, arcs={len(self.targets)}, shortcuts={self.num_shortcuts})"
+
+    # ------------------------------------------------------------------
+    # Queries (node IDs), same interface as search.RouteEngine
+    # ------------------------------------------------------------------
+
+    @property
+    def settled(self) -> int:
+        """Nodes settled by the last query of the calling thread."""
+        return getattr(self._local, 'settled', 0)
+
+    def node(self, nid: Hashable) -> int:
+        idx = self.nodes.get(nid)
+        if idx < 0:
+            raise nx.NodeNotFound(f"Node {nid} not found in graph")
+        return idx
+
+    def shortest_path(self, origin: Hashable, dest: Hashable, heuristic: bool = True) -> Tuple[float, List[Hashable]]:
+        """(cost, path of node IDs) from origin to dest; heuristic is accepted for RouteEngine compatibility."""
+        cost, path = self.search(self.node(origin), self.node(dest))
+        if path is None:
+            raise nx.NetworkXNoPath(f"Node {dest} not reachable from {origin}")
+        ids = self.nodes.ids
+        return cost, [ids[v] for v in path]
+
+    def dijkstra_path(self, origin: Hashable, dest: Hashable) -> List[Hashable]:
+        return self.shortest_path(origin, dest)[1]
+
+    def astar_path(self, origin: Hashable, dest: Hashable) -> List[Hashable]:
+        return self.shortest_path(origin, dest)[1]
+
+    def distance(self, origin: Hashable, dest: Hashable) -> float:
+        """Shortest-path cost, or inf if dest cannot be reached."""
+        return self.search(self.node(origin), self.node(dest), unpack=False)[0]
+
+    # ------------------------------------------------------------------
+    # Search (node integers)
+    # ------------------------------------------------------------------
+
+    def _spaces(self) -> Tuple[SearchSpace, SearchSpace]:
+        spaces = getattr(self._local, 'spaces', None)
+        if spaces is None:
+            n = len(self.rank)
+            spaces = self._local.spaces = (SearchSpace(n), SearchSpace(n))
+        return spaces
+
+    def search(self, source: int, target: int, unpack: bool = True) -> Tuple[float, Optional[List[int]]]:
+        """
+        Upward bidirectional search; returns (cost, path) or (inf, None).
+        In the spaces, parent[v] holds the arc v was reached by.
+        """
+        fwd, bwd = self._spaces()
+        if source == target:
+            self._local.settled = 0
+            return 0.0, [source]
+        gen_f, gen_b = fwd.reset(), bwd.reset()
+        for space, gen, start in ((fwd, gen_f, source), (bwd, gen_b, target)):
+            space.seen[start] = gen
+            space.dist[start] = 0.0
+            space.parent[start] = -1
+        heap_f, heap_b = [(0.0, source)], [(0.0, target)]
+        offsets, heads, weights = self._offsets, self._targets, self._weights
+        down_offsets, down_sources, down_weights = self._down_offsets, self._down_sources, self._down_weights
+        best, meet, settled = math.inf, -1, 0
+
+        # Both searches only climb, so each one runs until its frontier passes best
+        while True:
+            top_f = heap_f[0][0] if heap_f else math.inf
+            top_b = heap_b[0][0] if heap_b else math.inf
+            if top_f <= top_b:
+                if top_f >= best:
+                    break
+                heap, space, other, gen, other_gen = heap_f, fwd, bwd, gen_f, gen_b
+            else:
+                if top_b >= best:
+                    break
+                heap, space, other, gen, other_gen = heap_b, bwd, fwd, gen_b, gen_f
+            d, u = heapq.heappop(heap)
+            done = space.done
+            if done[u] == gen:
+                continue
+            done[u] = gen
+            settled += 1
+            if other.seen[u] == other_gen and d + other.dist[u] < best:
+                best = d + other.dist[u]
+                meet = u
+            dist, parent, seen = space.dist, space.parent, space.seen
+            # Stall-on-demand: a higher neighbour already offers a cheaper way to u, so no
+            # shortest path continues upward from here
+            stalled = False
+            for a in range(down_offsets[u], down_offsets[u + 1]):
+                w = down_sources[a]
+                if seen[w] == gen and dist[w] + down_weights[a] < d:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+            for a in range(offsets[u], offsets[u + 1]):
+                v = heads[a]
+                nd = d + weights[a]
+                if seen[v] != gen or nd < dist[v]:
+                    seen[v] = gen
+                    dist[v] = nd
+                    parent[v] = a
+                    heapq.heappush(heap, (nd, v))
+        self._local.settled = settled
+
+        if meet < 0:
+            return math.inf, None
+        if not unpack:
+            return best, None
+        return best, self._unpack(meet, fwd.parent, bwd.parent)
+
+    def arc_sums(self, values: np.ndarray) -> np.ndarray:
+        """
+        Per-arc totals of an edge array (e.g. dist_km): the edge's own value for an
+        original arc, the sum over the road edges it bypasses for a shortcut.
+        """
+        sums = np.zeros(len(self.targets), dtype=np.float64)
+        original = self.edges >= 0
+        sums[original] = np.asarray(values, dtype=np.float64)[self.edges[original]]
+        children = self._children
+        sources = self._sources
+        # A shortcut's children leave the bypassed node, which was contracted earlier
+        for a in sorted(np.flatnonzero(~original).tolist(), key=lambda a: self.rank[sources[a]]):
+            low, high = children[a]
+            sums[a] = sums[low] + sums[high]
+        return sums
+
+    def _upward(self, source: int) -> Tuple[List[int], List[float], List[int]]:
+        """
+        Complete upward search from source with stall-on-demand.
+        Returns the unstalled settled nodes in settle order with their costs and the arcs
+        they were reached by (-1 for source); stalled nodes lie on no shortest path.
+        """
+        space = self._spaces()[0]
+        gen = space.reset()
+        dist, parent, seen, done = space.dist, space.parent, space.seen, space.done
+        seen[source] = gen
+        dist[source] = 0.0
+        parent[source] = -1
+        heap = [(0.0, source)]
+        offsets, heads, weights = self._offsets, self._targets, self._weights
+        down_offsets, down_sources, down_weights = self._down_offsets, self._down_sources, self._down_weights
+        nodes, costs, arcs = [], [], []
+        while heap:
+            d, u = heapq.heappop(heap)
+            if done[u] == gen:
+                continue
+            done[u] = gen
+            stalled = False
+            for a in range(down_offsets[u], down_offsets[u + 1]):
+                w = down_sources[a]
+                if seen[w] == gen and dist[w] + down_weights[a] < d:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+            nodes.append(u)
+            costs.append(d)
+            arcs.append(parent[u])
+            for a in range(offsets[u], offsets[u + 1]):
+                v = heads[a]
+                nd = d + weights[a]
+                if seen[v] != gen or nd < dist[v]:
+                    seen[v] = gen
+                    dist[v] = nd
+                    parent[v] = a
+                    heapq.heappush(heap, (nd, v))
+        return nodes, costs, arcs
+
+    def _upward_metrics(self, source: int, arc_metrics: Sequence[List[float]]):
+        """_upward() plus the arc_sums() totals along the tree to every node it returns."""
+        nodes, costs, arcs = self._upward(source)
+        sources = self._sources
+        columns = []
+        for values in arc_metrics:
+            total = {source: 0.0}
+            column = [0.0] * len(nodes)
+            for i in range(1, len(nodes)):
+                a = arcs[i]
+                column[i] = total[nodes[i]] = total[sources[a]] + values[a]
+            columns.append(column)
+        return nodes, costs, columns
+
+    def table(self, sources: Sequence[int], targets: Sequence[int],
+              metrics: Sequence[np.ndarray] = ()) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """
+        Many-to-many costs between node integers with the bucket algorithm: one upward
+        search per source and per target, after which every node holds a bucket of the
+        sources and of the targets that reached it. A shortest path meets both halves at
+        its highest node, so each pair's cost is the cheapest sum over shared nodes; each
+        bucket pair is combined in one vectorised step.
+        metrics are edge arrays summed along each chosen route.
+        Returns the len(sources) x len(targets) cost matrix (inf where unreachable)
+        and one matrix per metric (nan where unreachable).
+        """
+        arc_metrics = [self.arc_sums(values).tolist() for values in metrics]
+        forward = self._buckets(sources, arc_metrics)
+        backward = self._buckets(targets, arc_metrics)
+
+        cost = np.full((len(sources), len(targets)), math.inf)
+        results = [np.full((len(sources), len(targets)), math.nan) for _ in metrics]
+        f_offsets, f_index, f_cost, f_metrics = forward
+        b_offsets, b_index, b_cost, b_metrics = backward
+        shared = np.flatnonzero((np.diff(f_offsets) > 0) & (np.diff(b_offsets) > 0))
+        for v in shared.tolist():
+            fs = slice(f_offsets[v], f_offsets[v + 1])
+            bs = slice(b_offsets[v], b_offsets[v + 1])
+            cells = np.ix_(f_index[fs], b_index[bs])
+            candidate = f_cost[fs][:, None] + b_cost[bs][None, :]
+            current = cost[cells]
+            better = candidate < current
+            if metrics:
+                # Equal costs prefer the smaller first metric: halves meeting across a free
+                # edge tie with the direct route but add to its metrics
+                first = f_metrics[0][fs][:, None] + b_metrics[0][bs][None, :]
+                better |= (candidate == current) & (first < results[0][cells])
+            if not better.any():
+                continue
+            cost[cells] = np.where(better, candidate, current)
+            for m, result in enumerate(results):
+                total = f_metrics[m][fs][:, None] + b_metrics[m][bs][None, :]
+                result[cells] = np.where(better, total, result[cells])
+        return cost, results
+
+    def _buckets(self, starts: Sequence[int], arc_metrics: Sequence[List[float]]):
+        """
+        Upward searches from every start, regrouped by the node reached: entries of
+        node v are offsets[v]:offsets[v+1] of (index into starts, cost, metric totals).
+        """
+        searches = [self._upward_metrics(s, arc_metrics) for s in starts]
+        node = np.array([v for nodes, _, _ in searches for v in nodes], dtype=np.int64)
+        index = np.array([i for i, (nodes, _, _) in enumerate(searches) for _ in nodes], dtype=np.int64)
+        cost = np.array([c for _, costs, _ in searches for c in costs], dtype=np.float64)
+        totals = [np.array([x for _, _, columns in searches for x in columns[m]], dtype=np.float64)
+                  for m in range(len(arc_metrics))]
+        order = np.argsort(node, kind='stable')
+        offsets = np.zeros(len(self.rank) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(node, minlength=len(self.rank)), out=offsets[1:])
+        return offsets, index[order], cost[order], [values[order] for values in totals]
+
+    def _unpack(self, meet: int, fwd_parent: List[int], bwd_parent: List[int]) -> List[int]:
+        """Expand the arcs source -> meet -> target into the original road nodes."""
+        sources = self._sources
+        # (arc, reverse) segments in travel order; reverse means head -> tail
+        segments = []
+        v = meet
+        while fwd_parent[v] != -1:
+            a = fwd_parent[v]
+            segments.append((a, False))
+            v = sources[a]
+        segments.reverse()
+        path = [v]
+        v = meet
+        while bwd_parent[v] != -1:
+            a = bwd_parent[v]
+            segments.append((a, True))
+            v = sources[a]
+
+        heads, children = self._targets, self._children
+        stack = segments[::-1]
+        while stack:
+            a, reverse = stack.pop()
+            low, high = children[a]
+            if low < 0:
+                path.append(sources[a] if reverse else heads[a])
+            elif reverse:
+                # head -> mid -> tail
+                stack.append((low, False))
+                stack.append((high, True))
+            else:
+                # tail -> mid -> head
+                stack.append((high, False))
+                stack.append((low, True))
+        return _drop_cycles(path)
+
+
+def _drop_cycles(path: List[int]) -> List[int]:
+    """
+    Cut revisits out of a path. The two halves of a query can meet across a free
+    (zero-weight) edge, so an optimal path may step off and back at no cost.
+    """
+    position: Dict[int, int] = {}
+    out: List[int] = []
+    for v in path:
+        if v in position:
+            for u in out[position[v] + 1:]:
+                del position[u]
+            del out[position[v] + 1:]
+        else:
+            position[v] = len(out)
+            out.append(v)
+    return out
+
+
+class _Contractor:
+    """Witness searches and shortcut insertion over the shrinking adjacency."""
+
+    def __init__(self, adjacency: List[Dict[int, Tuple[float, int, int]]], witness_limit: int):
+        self.adjacency = adjacency
+        self.witness_limit = witness_limit
+
+    def _witness(self, source: int, skip: int, limit: float) -> Dict[int, float]:
+        """Distances from source avoiding skip, up to limit cost or witness_limit settled nodes."""
+        adjacency = self.adjacency
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        while heap and settled < self.witness_limit:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            for v, (w, _e, _mid) in adjacency[u].items():
+                if v == skip:
+                    continue
+                nd = d + w
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+    def shortcuts(self, v: int) -> List[Tuple[int, int, float]]:
+        """(u, w, cost) shortcuts that contracting v would need."""
+        neighbours = list(self.adjacency[v].items())
+        needed = []
+        for i, (u, (wu, _e, _mid)) in enumerate(neighbours):
+            rest = neighbours[i + 1:]
+            if not rest:
+                break
+            limit = wu + max(ww for _w, (ww, _e2, _m2) in rest)
+            witness = self._witness(u, v, limit)
+            for w, (ww, _e2, _m2) in rest:
+                if witness.get(w, math.inf) > wu + ww:
+                    needed.append((u, w, wu + ww))
+        return needed
+
+    def priority(self, v: int, deleted: int) -> int:
+        """Edge difference plus contracted neighbours, which spreads contraction evenly."""
+        return len(self.shortcuts(v)) - len(self.adjacency[v]) + deleted
+
+    def contract(self, v: int) -> None:
+        adjacency = self.adjacency
+        for u, w, cost in self.shortcuts(v):
+            current = adjacency[u].get(w)
+            if current is None or cost < current[0]:
+                adjacency[u][w] = adjacency[w][u] = (cost, -1, v)
+        for u in adjacency[v]:
+            del adjacency[u][v]
+        adjacency[v] = {}
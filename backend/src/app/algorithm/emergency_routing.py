@@ -2,27 +2,66 @@
 Emergency vehicle routing algorithms and priority system.
 """
 import networkx as nx
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 import math
+
+import numpy as np
+
+from ..graph.compiled import nearest_sources
 from .path_finding import AStarAlgorithm
 
+# Facility types of the data served for the names callers use
+FACILITY_ALIASES = {
+    "hospital": "Medical",
+    "clinic": "Medical",
+    "fire_station": "Fire Station",
+    "police_station": "Police Station",
+}
+
+# Facility each vehicle type is dispatched from; their catchments are precomputed
+DISPATCH_FACILITIES = {
+    "ambulance": "hospital",
+    "fire_truck": "fire_station",
+    "police": "police_station",
+}
+
+
+def resolve_facility_type(name: str, type_names: Sequence[str]) -> Optional[str]:
+    """
+    Facility type of the data that name asks for: an alias such as 'hospital'
+    or a case-insensitive match of a type, None if there is none.
+    """
+    wanted = FACILITY_ALIASES.get(name.lower(), name).lower()
+    return next((t for t in type_names if t is not None and t.lower() == wanted), None)
+
+
 class EmergencyRouter:
     """
     Specialized router for emergency vehicles that considers traffic and priority.
     """
     
-    def __init__(self, graph: nx.Graph, emergency_type: str = "ambulance", period: str = "morning"):
+    def __init__(self, graph: Optional[nx.Graph], emergency_type: str = "ambulance", period: str = "morning",
+                 engine=None, compiled=None, response_minutes: Optional[np.ndarray] = None):
         """
         Initialize emergency router with graph, vehicle type and time period.
         
         Args:
-            graph: Road network graph with traffic data
+            graph: Road network graph with traffic data; may be None when engine,
+                   compiled and response_minutes are all given
             emergency_type: Type of emergency vehicle (ambulance, fire_truck, police)
             period: Time period for traffic data (morning, afternoon, evening, night)
+            engine: Optional compiled backend (e.g. a ContractionHierarchy) weighted
+                    by the emergency profile of this vehicle type and period
+            compiled: Optional CompiledGraph of the road network, with
+            response_minutes: its response minutes per edge id for this vehicle and period
         """
         self.G = graph
         self.emergency_type = emergency_type
         self.period = period
+        self.engine = engine
+        self.compiled = compiled
+        self.response_minutes = response_minutes
+        self._adjacency = None
         self.priority_weights = {
             "ambulance": 1.5,
             "fire_truck": 1.3,
@@ -67,16 +106,15 @@ class EmergencyRouter:
     def find_emergency_route(self, origin: str, dest: str) -> Tuple[List[str], float]:
         """
         Find optimal route for emergency vehicle using modified A* algorithm.
+        With an engine the precomputed emergency weights are searched directly;
+        otherwise Dijkstra weighs the edges it scans with calculate_emergency_weight.
         """
-        # Create a graph copy with emergency-adjusted weights
-        G_emergency = self.G.copy()
-        
-        # Update edge weights for emergency routing
-        for u, v, data in G_emergency.edges(data=True):
-            data['weight'] = self.calculate_emergency_weight(u, v, data)
-        
-        # Use A* algorithm with emergency-adjusted weights
-        path = AStarAlgorithm.find_route(G_emergency, origin, dest)
+        if self.engine is not None:
+            path = AStarAlgorithm.find_route(self.engine, origin, dest)
+            return path, self.calculate_response_time(path)
+
+        # Weigh only the edges the search scans, on the graph itself (no copy)
+        path = nx.dijkstra_path(self.G, origin, dest, weight=self.calculate_emergency_weight)
         
         # Calculate estimated response time
         total_time = self.calculate_response_time(path)
@@ -91,46 +129,72 @@ class EmergencyRouter:
         - Current traffic conditions
         - Emergency vehicle type
         """
+        if self.response_minutes is not None:
+            nodes = self.compiled.nodes
+            edges = self.compiled.path_edges([nodes[nid] for nid in path])
+            return round(float(self.response_minutes[edges].sum()), 2)
+        
         total_time = 0.0
         for u, v in zip(path[:-1], path[1:]):
-            data = self.G[u][v]
-            distance = data.get('dist_km', 0)
-            
-            # Get traffic data 
-            traffic_flow = data.get('flow', 0)
-            capacity = data.get('capacity', 1000)
-            
-            # Calculate traffic impact on speed
-            traffic_ratio = traffic_flow / capacity if capacity > 0 else 0
-            traffic_impact = max(0.3, 1.0 - traffic_ratio * 0.7)
-            
-            # Base emergency vehicle speed (80 km/h) adjusted for traffic
-            # Higher priority vehicles can maintain better speeds in traffic
-            priority_factor = self.priority_weights.get(self.emergency_type, 1.0)
-            emergency_speed = 80 * traffic_impact * priority_factor
-            
-            # Convert to minutes
-            time = (distance / emergency_speed) * 60
-            total_time += time
+            total_time += self.edge_response_time(u, v, self.G[u][v])
             
         return round(total_time, 2)
+
+    def edge_response_time(self, u: str, v: str, data: Dict) -> float:
+        """Minutes this vehicle needs for one road edge."""
+        distance = data.get('dist_km', 0)
+        
+        # Get traffic data 
+        traffic_flow = data.get('flow', 0)
+        capacity = data.get('capacity', 1000)
+        
+        # Calculate traffic impact on speed
+        traffic_ratio = traffic_flow / capacity if capacity > 0 else 0
+        traffic_impact = max(0.3, 1.0 - traffic_ratio * 0.7)
+        
+        # Base emergency vehicle speed (80 km/h) adjusted for traffic
+        # Higher priority vehicles can maintain better speeds in traffic
+        priority_factor = self.priority_weights.get(self.emergency_type, 1.0)
+        emergency_speed = 80 * traffic_impact * priority_factor
+        
+        # Convert to minutes
+        return (distance / emergency_speed) * 60
+
+    def find_nearest_facilities(self, location: str, facility_ids: Sequence[str],
+                                k: int = 1) -> List[Tuple[str, float, List[str]]]:
+        """
+        The k facilities with the shortest response times to location, nearest first,
+        as (facility ID, minutes, path from the facility to location).
+        With precomputed response minutes one Dijkstra is seeded from every facility at
+        once and stops when location has been reached from k of them; otherwise one
+        Dijkstra from location weighs the edges it scans with edge_response_time.
+        """
+        if self.response_minutes is None:
+            times, paths = nx.single_source_dijkstra(self.G, location, weight=self.edge_response_time)
+            ranked = sorted((times[f], f) for f in set(facility_ids) if f in times)[:k]
+            return [(f, round(t, 2), paths[f][::-1]) for t, f in ranked]
+
+        nodes = self.compiled.nodes
+        target = nodes.get(location)
+        if target < 0:
+            raise nx.NodeNotFound(f"Node {location} not in graph")
+        if self._adjacency is None:
+            self._adjacency = self.compiled.adjacency(self.response_minutes)
+        sources = [i for i in (nodes.get(f) for f in facility_ids) if i >= 0]
+        return [(nodes.id_of(path[0]), round(t, 2), [nodes.id_of(v) for v in path])
+                for t, path in nearest_sources(self._adjacency, sources, target, k)]
     
     @staticmethod
     def find_nearest_facility(G: nx.Graph, location: str, facility_type: str, facilities: Dict[str, Dict]) -> str:
         """
         Find the nearest emergency facility (hospital, fire station, etc.)
+        by road distance, with one Dijkstra seeded from every facility of the type.
         """
-        min_distance = float('inf')
-        nearest = None
-        
-        for facility_id, data in facilities.items():
-            if data.get('type') == facility_type:
-                try:
-                    distance = nx.shortest_path_length(G, location, facility_id, weight='dist_km')
-                    if distance < min_distance:
-                        min_distance = distance
-                        nearest = facility_id
-                except nx.NetworkXNoPath:
-                    continue
-                    
-        return nearest
\ No newline at end of file
+        sources = {fid for fid, data in facilities.items() if data.get('type') == facility_type and fid in G}
+        if not sources:
+            return None
+        try:
+            _, path = nx.multi_source_dijkstra(G, sources, target=location, weight='dist_km')
+        except nx.NetworkXNoPath:
+            return None
+        return path[0]
@@ -0,0 +1,119 @@
+"""
+Isochrones (reachable sets) over a CompiledGraph.
+One Dijkstra from the origin over an edge-minutes column runs until the
+frontier passes the largest time budget; every smaller budget is a prefix
+of the nodes it settled, in settle order. Each budget can also be outlined
+by the convex hull of its nodes' coordinates.
+"""
+import bisect
+import heapq
+import math
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+from ..graph.compiled import CompiledGraph
+
+
+def convex_hull(points: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """
+    Counter-clockwise convex hull of (x, y) points (Andrew's monotone chain).
+    Fewer than three distinct points are returned as they are.
+    """
+    points = sorted(set(points))
+    if len(points) < 3:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+class IsochroneEngine:
+    """
+    Reachability queries over one edge-minutes column of a CompiledGraph.
+    x and y are node coordinates for hulls; nodes without them are left out of hulls.
+    Safe to share between threads.
+    """
+
+    def __init__(self, graph: CompiledGraph, minutes: np.ndarray,
+                 x: Optional[np.ndarray] = None, y: Optional[np.ndarray] = None):
+        minutes = np.asarray(minutes, dtype=np.float64)
+        if np.any(minutes < 0):
+            raise ValueError("IsochroneEngine requires non-negative travel times")
+        self.graph = graph
+        self.offsets, self.targets, self.minutes = graph.adjacency(minutes)
+        self.x = None if x is None else np.asarray(x, dtype=np.float64)
+        self.y = None if y is None else np.asarray(y, dtype=np.float64)
+
+    @classmethod
+    def from_network(cls, tn, profile: str = 'travel_time', period: Optional[str] = None,
+                     include_transit: bool = False) -> 'IsochroneEngine':
+        """Engine over a TransportationNetwork graph for one minutes profile and period."""
+        graph = tn.compiled_network(include_transit=include_transit)
+        table = tn.node_table
+        return cls(graph, tn.edge_weights(profile, include_transit=include_transit).column(period),
+                   table.take('x', graph.nodes.ids), table.take('y', graph.nodes.ids))
+
+    def reach(self, source: int, limit: float) -> Tuple[List[int], List[float]]:
+        """Nodes settled within limit minutes of source and their times, in settle order."""
+        offsets, heads, minutes = self.offsets, self.targets, self.minutes
+        best = {source: 0.0}
+        done = set()
+        nodes, times = [], []
+        heap = [(0.0, source)]
+        while heap:
+            t, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            if t > limit:
+                break
+            done.add(u)
+            nodes.append(u)
+            times.append(t)
+            for k in range(offsets[u], offsets[u + 1]):
+                v = heads[k]
+                nt = t + minutes[k]
+                if v not in done and nt < best.get(v, math.inf):
+                    best[v] = nt
+                    heapq.heappush(heap, (nt, v))
+        return nodes, times
+
+    def isochrones(self, origin: Hashable, budgets: Sequence[float], hull: bool = False) -> Dict:
+        """
+        Times of every node within max(budgets) minutes of origin, and for each budget
+        (ascending) the node IDs reached within it plus, with hull, their convex hull.
+        """
+        source = self.graph.nodes.get(origin)
+        if source < 0:
+            raise nx.NodeNotFound(f"Node {origin} not found in graph")
+        budgets = sorted(budgets)
+        nodes, times = self.reach(source, budgets[-1])
+        ids = [self.graph.nodes.id_of(v) for v in nodes]
+        result = {"times": dict(zip(ids, times)), "isochrones": []}
+        for budget in budgets:
+            end = bisect.bisect_right(times, budget)
+            entry = {"budget": budget, "nodes": ids[:end]}
+            if hull:
+                entry["hull"] = self.hull(nodes[:end])
+            result["isochrones"].append(entry)
+        return result
+
+    def hull(self, nodes: Sequence[int]) -> List[Tuple[float, float]]:
+        """Convex hull of the coordinates of nodes (integers); empty without coordinates."""
+        if self.x is None or self.y is None:
+            return []
+        xs, ys = self.x[list(nodes)], self.y[list(nodes)]
+        known = np.isfinite(xs) & np.isfinite(ys)
+        return convex_hull(list(zip(xs[known].tolist(), ys[known].tolist())))
@@ -0,0 +1,123 @@
+"""
+ALT (A*, landmarks, triangle inequality) lower bounds.
+Shortest-path costs from a handful of landmark nodes are precomputed for
+one weight column of a CompiledGraph. For any landmark L the triangle
+inequality gives |d(L, t) - d(L, v)| <= d(v, t), so the largest of these
+differences is an admissible and consistent A* heuristic for every weight
+profile, including ones that a straight-line bound says nothing about.
+"""
+import heapq
+import math
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+from ..graph.compiled import CompiledGraph, NodeIndex
+from .contraction import HIERARCHY_PROFILES
+
+# Landmarks selected per profile and period
+LANDMARK_COUNT = 8
+
+# Cost profiles whose landmark tables are precomputed with the snapshot
+LANDMARK_PROFILES = HIERARCHY_PROFILES
+
+
+def single_source_costs(adjacency, source: int, num_nodes: int) -> np.ndarray:
+    """Dijkstra from source over a CompiledGraph.adjacency() triple; inf where unreachable."""
+    offsets, heads, weights = adjacency
+    dist = [math.inf] * num_nodes
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for k in range(offsets[u], offsets[u + 1]):
+            v = heads[k]
+            nd = d + weights[k]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return np.array(dist, dtype=np.float64)
+
+
+class Landmarks:
+    """
+    Costs from each landmark to every node (a landmarks x nodes matrix).
+    lower_bound(v, t) is the ALT bound on the cost between nodes v and t.
+    """
+
+    ARRAY_FIELDS = ('landmarks', 'costs')
+
+    def __init__(self, nodes: NodeIndex, landmarks: np.ndarray, costs: np.ndarray):
+        self.nodes = nodes
+        self.landmarks = landmarks
+        self.costs = costs
+        # One list per node with its cost from every landmark, for the pure-Python search loop
+        self._columns: List[List[float]] = costs.T.tolist()
+
+    @classmethod
+    def build(cls, graph: CompiledGraph, weights: Optional[np.ndarray] = None,
+              count: int = LANDMARK_COUNT) -> 'Landmarks':
+        """
+        Pick count landmarks by farthest-point selection and compute their costs.
+        Each new landmark is the node farthest from the ones already chosen, which
+        puts them on the periphery; unreachable nodes count as farthest, so every
+        connected component receives a landmark before any gets a second one.
+        """
+        n = graph.num_nodes
+        adjacency = graph.adjacency(weights)
+        landmarks: List[int] = []
+        rows: List[np.ndarray] = []
+        if n:
+            # Start from the node farthest from node 0 rather than node 0 itself
+            nearest = single_source_costs(adjacency, 0, n)
+            chosen = np.zeros(n, dtype=bool)
+            for _ in range(min(count, n)):
+                candidates = np.where(chosen, -1.0, np.where(np.isinf(nearest), np.finfo(np.float64).max, nearest))
+                landmark = int(np.argmax(candidates))
+                landmarks.append(landmark)
+                chosen[landmark] = True
+                row = single_source_costs(adjacency, landmark, n)
+                rows.append(row)
+                nearest = row if len(rows) == 1 else np.minimum(nearest, row)
+        costs = np.vstack(rows) if rows else np.zeros((0, n), dtype=np.float64)
+        return cls(graph.nodes, np.array(landmarks, dtype=np.int32), costs)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays of the table keyed by ARRAY_FIELDS, for serialisation."""
+        return {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+
+    @classmethod
+    def from_arrays(cls, nodes: NodeIndex, arrays: Dict[str, np.ndarray]) -> 'Landmarks':
+        return cls(nodes, *(arrays[name] for name in cls.ARRAY_FIELDS))
+
+    def __repr__(self) -> str:
+        return f"Landmarks(landmarks={len(self.landmarks)}, nodes={self.costs.shape[1]})"
+
+    def lower_bound(self, v: int, t: int) -> float:
+        """Lower bound on the cost between node integers v and t; inf if they are not connected."""
+        return self.bound_to(t)(v)
+
+    def bound_to(self, target: int):
+        """lower_bound(v, target) as a one-argument callable, for repeated use in one search."""
+        column = self._columns[target]
+        columns = self._columns
+
+        def bound(v: int) -> float:
+            best = 0.0
+            for dv, dt in zip(columns[v], column):
+                # A landmark reaching only one of the two nodes gives inf (different
+                # components); one reaching neither gives nan, which never compares greater
+                gap = dv - dt if dv > dt else dt - dv
+                if gap > best:
+                    best = gap
+            return best
+
+        return bound
+
+    def heuristic(self, target: Hashable):
+        """networkx-style heuristic h(u, target) over node IDs, for nx.astar_path."""
+        get = self.nodes.get
+        bound = self.bound_to(self.nodes[target])
+        return lambda u, _v: bound(get(u)) if get(u) >= 0 else 0.0
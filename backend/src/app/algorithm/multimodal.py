@@ -0,0 +1,344 @@
+"""
+Transfer-aware multimodal routing over a layered state graph.
+Roads form one layer with a state per node; every stop of every transit
+route direction (see raptor.TransitTimetable) is a state of its own.
+Boarding, alighting and changing between routes are arcs between the
+layers at one node; every change of leg (road, or one transit route) is a
+transfer, and boarding costs the route's average wait (half its headway).
+A label-setting search keeps, per state, the earliest time for each number
+of transfers, so a transfer limit yields the true optimum under that limit,
+not a penalised guess. The multi-criteria search keeps a bag of labels per
+state instead and returns the Pareto front over time, transfers and road
+kilometres (McRAPTOR-style bags on the layered graph).
+"""
+import heapq
+import math
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..graph.compiled import BUS, METRO, MODES, ROAD, CompiledGraph
+from .raptor import TransitTimetable
+
+# Arc kinds of the layered graph
+RIDE, BOARD, ALIGHT, CHANGE = 0, 1, 2, 3
+
+# Road kilometres are compared in steps of this size by the Pareto search, so routes
+# that differ by less than a step on the road do not both make the front
+ROAD_KM_STEP = 0.5
+
+
+class Segment(NamedTuple):
+    """One road edge or transit hop of a route; route is None on roads."""
+    u: Hashable
+    v: Hashable
+    mode: str
+    route: Optional[str]
+    minutes: float
+    km: float
+    wait: float             # minutes waited to board before this hop
+
+
+class MultimodalRoute(NamedTuple):
+    minutes: float
+    km: float
+    transfers: int
+    segments: List[Segment]
+    road_km: float          # kilometres on the road layer (driving or walking between stops)
+
+
+class MultimodalRouter:
+    """
+    Layered road + transit graph and its label-setting search.
+    States 0..N-1 are the road layer (one per node of graph); state N + i is
+    position i of the flattened stop lists of the timetable routes.
+    Safe to share between threads.
+    """
+
+    def __init__(self, graph: CompiledGraph, road_minutes: np.ndarray, timetable: TransitTimetable):
+        self.graph = graph
+        self.timetable = timetable
+        n = graph.num_nodes
+        nodes = graph.nodes
+        road = graph.mode == ROAD
+        # Flattened route positions: state of (route r, position i) is starts[r] + i
+        starts, state_node, state_route = [], [], []
+        for r, route in enumerate(timetable.routes):
+            starts.append(n + len(state_node))
+            for stop in route.stops:
+                state_node.append(nodes.get(timetable.stop_ids[stop]))
+                state_route.append(r)
+        self.num_states = n + len(state_node)
+        self.route_starts = starts
+        self.state_node = list(range(n)) + state_node
+        self.state_route = [-1] * n + state_route
+
+        arcs: List[List[Tuple]] = [[] for _ in range(self.num_states)]
+        for e in np.flatnonzero(road).tolist():
+            u, v = int(graph.edge_u[e]), int(graph.edge_v[e])
+            minutes, km = float(road_minutes[e]), float(graph.dist_km[e])
+            arcs[u].append((v, minutes, km, RIDE, ROAD))
+            arcs[v].append((u, minutes, km, RIDE, ROAD))
+        # States of every stop node, to connect the layers at that node
+        at_node: Dict[int, List[int]] = {}
+        for r, route in enumerate(timetable.routes):
+            mode = BUS if route.mode == 'bus' else METRO
+            wait = route.headway / 2
+            base = starts[r]
+            for i in range(len(route.stops) - 1):
+                arcs[base + i].append((base + i + 1, route.offsets[i + 1] - route.offsets[i],
+                                       route.km[i + 1] - route.km[i], RIDE, mode))
+            for i in range(len(route.stops)):
+                node = self.state_node[base + i]
+                if node < 0:
+                    continue
+                arcs[node].append((base + i, wait, 0.0, BOARD, mode))
+                arcs[base + i].append((node, 0.0, 0.0, ALIGHT, mode))
+                at_node.setdefault(node, []).append(base + i)
+        for node, states in at_node.items():
+            for a in states:
+                for b in states:
+                    if self.state_route[a] != self.state_route[b]:
+                        route = timetable.routes[self.state_route[b]]
+                        arcs[a].append((b, route.headway / 2, 0.0, CHANGE,
+                                        BUS if route.mode == 'bus' else METRO))
+        self.offsets = [0]
+        self.heads, self.minutes, self.km, self.kind, self.mode = [], [], [], [], []
+        incoming: List[List[Tuple[int, int]]] = [[] for _ in range(self.num_states)]
+        for tail, out in enumerate(arcs):
+            for head, minutes, km, kind, mode in out:
+                incoming[head].append((tail, len(self.heads)))
+                self.heads.append(head)
+                self.minutes.append(minutes)
+                self.km.append(km)
+                self.kind.append(kind)
+                self.mode.append(mode)
+            self.offsets.append(len(self.heads))
+        # Reverse arcs (tail, arc) for the backward search of the Pareto bounds
+        self.in_offsets = [0]
+        self.in_arcs: List[Tuple[int, int]] = []
+        for into in incoming:
+            self.in_arcs.extend(into)
+            self.in_offsets.append(len(self.in_arcs))
+
+    @classmethod
+    def from_network(cls, tn, period: Optional[str] = None) -> 'MultimodalRouter':
+        """Router over the roads and transit lines of a TransportationNetwork for one period."""
+        return cls(tn.compiled_network(), tn.edge_weights('multimodal').column(period),
+                   TransitTimetable.from_network(tn))
+
+    @classmethod
+    def from_cairo_graph(cls, graph, time_of_day: Optional[str] = None) -> 'MultimodalRouter':
+        """Router over the roads and transit lines of a CairoTransportationGraph."""
+        from ..graph.weights import compute_weights
+
+        roads = graph.build_compiled_graph(include_potential=False, include_transit=False)
+        return cls(roads, compute_weights(roads, 'multimodal').column(time_of_day),
+                   TransitTimetable.from_cairo_graph(graph))
+
+    def __repr__(self) -> str:
+        return f"MultimodalRouter(states={self.num_states}, arcs={len(self.heads)})"
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def route(self, origin: Hashable, dest: Hashable, max_transfers: Optional[int] = None,
+              modes: Optional[Iterable[str]] = None,
+              penalties: Optional[Dict[str, float]] = None) -> Optional[MultimodalRoute]:
+        """
+        Fastest route from origin to dest with at most max_transfers transfers (None for
+        no limit); among equally fast routes the one with the fewest transfers.
+        modes restricts the modes used ('road', 'bus', 'metro'); penalties multiplies the
+        minutes of a mode for the search only, so reported minutes stay real.
+        None if no such route exists.
+        """
+        nodes = self.graph.nodes
+        source, target = nodes.get(origin), nodes.get(dest)
+        if source < 0 or target < 0:
+            return None
+        allowed = [True] * len(MODES) if modes is None else [m in set(modes) for m in MODES]
+        factor = [1.0] * len(MODES)
+        for mode, value in (penalties or {}).items():
+            factor[MODES.index(mode)] = value
+        labels = self._search(source, target, max_transfers, allowed, factor)
+        if labels is None:
+            return None
+        return self._unpack(labels)
+
+    def _search(self, source: int, target: int, max_transfers: Optional[int],
+                allowed: List[bool], factor: List[float]):
+        """
+        Label-setting search; returns the label chain [(state, arc, transfers)] from
+        source to the first target label settled, or None.
+        A label (cost, transfers) at a state is dropped when one settled there has no
+        higher cost and no more transfers; without a limit transfers only break ties.
+        """
+        offsets, heads, minutes, kind, mode = self.offsets, self.heads, self.minutes, self.kind, self.mode
+        state_node = self.state_node
+        limited = max_transfers is not None
+        # Settled labels: state -> costs by transfers (limited) or its single cost
+        settled: Dict[int, List[float]] = {}
+        parents: List[Tuple[int, int, int, int]] = []       # (state, arc, transfers, parent label)
+        heap = [(0.0, 0, source, -1, -1)]
+        while heap:
+            cost, k, state, arc, parent = heapq.heappop(heap)
+            costs = settled.get(state)
+            if costs is None:
+                costs = settled[state] = [math.inf] * (max_transfers + 1 if limited else 1)
+            slot = k if limited else 0
+            if costs[slot] <= cost:
+                continue
+            # The slot holds the best cost with at most k transfers, so later slots improve too
+            for j in range(slot, len(costs)):
+                if costs[j] > cost:
+                    costs[j] = cost
+            label = len(parents)
+            parents.append((state, arc, k, parent))
+            if state == target:
+                return self._chain(parents, label)
+            for a in range(offsets[state], offsets[state + 1]):
+                m = mode[a]
+                if not allowed[m]:
+                    continue
+                nk = _transfers(k, kind[a], arc < 0, state_node[state] == target)
+                if limited and nk > max_transfers:
+                    continue
+                head = heads[a]
+                nc = cost + (minutes[a] * factor[m] if kind[a] == RIDE else minutes[a])
+                best = settled.get(head)
+                if best is not None and best[nk if limited else 0] <= nc:
+                    continue
+                heapq.heappush(heap, (nc, nk, head, a, label))
+        return None
+
+    @staticmethod
+    def _chain(parents, label: int) -> List[Tuple[int, int, int]]:
+        chain = []
+        while label >= 0:
+            state, arc, k, label = parents[label]
+            chain.append((state, arc, k))
+        chain.reverse()
+        return chain
+
+    def _unpack(self, chain: List[Tuple[int, int, int]]) -> MultimodalRoute:
+        """Segments of a label chain; waits are attached to the hop that follows them."""
+        ids = self.graph.nodes.ids
+        routes = self.timetable.routes
+        segments = []
+        wait = 0.0
+        for (prev, _, _), (state, arc, _) in zip(chain, chain[1:]):
+            kind = self.kind[arc]
+            if kind in (BOARD, CHANGE):
+                wait += self.minutes[arc]
+            elif kind == RIDE:
+                route = self.state_route[state]
+                segments.append(Segment(ids[self.state_node[prev]], ids[self.state_node[state]],
+                                        MODES[self.mode[arc]], routes[route].route_id if route >= 0 else None,
+                                        self.minutes[arc], self.km[arc], wait))
+                wait = 0.0
+        return MultimodalRoute(sum(s.minutes + s.wait for s in segments), sum(s.km for s in segments),
+                               chain[-1][2], segments, sum(s.km for s in segments if s.mode == 'road'))
+
+    def pareto(self, origin: Hashable, dest: Hashable, max_transfers: Optional[int] = None,
+               modes: Optional[Iterable[str]] = None) -> List[MultimodalRoute]:
+        """
+        Pareto-optimal routes from origin to dest over (minutes, transfers, road_km), fastest
+        first: no other route is at least as good in all three and better in one. The
+        fastest route and the one with the fewest transfers are always among them.
+        """
+        nodes = self.graph.nodes
+        source, target = nodes.get(origin), nodes.get(dest)
+        if source < 0 or target < 0:
+            return []
+        allowed = [True] * len(MODES) if modes is None else [m in set(modes) for m in MODES]
+        return [self._unpack(chain) for chain in self._bag_search(source, target, max_transfers, allowed)]
+
+    def _bag_search(self, source: int, target: int, max_transfers: Optional[int],
+                    allowed: List[bool]) -> List[List[Tuple[int, int, int]]]:
+        """
+        Multi-criteria label-setting search; label chains of the target labels, fastest first.
+        Labels are settled in order of minutes plus the fewest minutes still needed to reach
+        target, which orders the labels of one state by minutes and the target labels by the
+        lower bound of any label that could extend to them. A label therefore only needs
+        checking against its state's bag and the front found so far on transfers and road
+        kilometres: every label there is no slower. Equal labels are dominated, so each front
+        point is kept once.
+        """
+        offsets, heads, minutes, km, kind, mode = (self.offsets, self.heads, self.minutes, self.km,
+                                                    self.kind, self.mode)
+        state_node = self.state_node
+        bound = self._bounds(target, allowed)
+        if source not in bound:
+            return []
+        # Bags: fewest road steps of the labels with at most k transfers, for every k (a staircase)
+        bags: Dict[int, List[int]] = {}
+        parents: List[Tuple[int, int, int, int]] = []
+        found: List[int] = []
+        front: List[int] = []
+        heap = [(bound[source], 0.0, 0, 0.0, source, -1, -1)]
+        while heap:
+            _, cost, k, road, state, arc, parent = heapq.heappop(heap)
+            step = int(road / ROAD_KM_STEP)
+            bag = bags.setdefault(state, [])
+            if _dominated(bag, k, step) or _dominated(front, k, step):
+                continue
+            _insert(bag, k, step)
+            label = len(parents)
+            parents.append((state, arc, k, parent))
+            if state == target:
+                _insert(front, k, step)
+                found.append(label)
+                continue
+            for a in range(offsets[state], offsets[state + 1]):
+                m = mode[a]
+                head = heads[a]
+                if not allowed[m] or head not in bound:
+                    continue
+                nk = _transfers(k, kind[a], arc < 0, state_node[state] == target)
+                if max_transfers is not None and nk > max_transfers:
+                    continue
+                nr = road + km[a] if m == ROAD and kind[a] == RIDE else road
+                step = int(nr / ROAD_KM_STEP)
+                if _dominated(bags.get(head, ()), nk, step) or _dominated(front, nk, step):
+                    continue
+                nc = cost + minutes[a]
+                heapq.heappush(heap, (nc + bound[head], nc, nk, nr, head, a, label))
+        return [self._chain(parents, label) for label in found]
+
+    def _bounds(self, target: int, allowed: List[bool]) -> Dict[int, float]:
+        """Fewest minutes from every state that can reach target to it (a backward Dijkstra)."""
+        in_offsets, in_arcs, minutes, mode = self.in_offsets, self.in_arcs, self.minutes, self.mode
+        bound: Dict[int, float] = {}
+        heap = [(0.0, target)]
+        while heap:
+            t, state = heapq.heappop(heap)
+            if state in bound:
+                continue
+            bound[state] = t
+            for i in range(in_offsets[state], in_offsets[state + 1]):
+                tail, a = in_arcs[i]
+                if allowed[mode[a]] and tail not in bound:
+                    heapq.heappush(heap, (t + minutes[a], tail))
+        return bound
+
+
+def _transfers(k: int, kind: int, first: bool, at_target: bool) -> int:
+    """Transfers after taking an arc of kind; the first leg and the final alighting are free."""
+    if kind == RIDE or (kind == BOARD and first) or (kind == ALIGHT and at_target):
+        return k
+    return k + 1
+
+
+def _dominated(bag: List[int], k: int, step: int) -> bool:
+    """Whether a settled (no slower) label of bag has no more transfers and road kilometre steps."""
+    return bool(bag) and bag[min(k, len(bag) - 1)] <= step
+
+
+def _insert(bag: List[int], k: int, step: int) -> None:
+    """Add a label that bag does not dominate; bag[j] is the fewest steps with at most j transfers."""
+    while len(bag) <= k:
+        bag.append(bag[-1] if bag else math.inf)
+    for j in range(k, len(bag)):
+        if bag[j] > step:
+            bag[j] = step
@@ -0,0 +1,263 @@
+"""
+Precomputed origin-destination matrices of a CompiledGraph.
+One single-source Dijkstra per node, spread over a process pool, fills an
+N x N table of route kilometres and minutes plus the predecessor of every
+destination. The tables are written as .npy files and memory-mapped on
+load, so point queries are array lookups and paths are read back from the
+predecessor rows. Memory is O(N^2): 4 bytes per cell and table.
+"""
+import heapq
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from ..graph.compiled import CompiledGraph, NodeIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent builds are not serialised, each still publishes whole
+    fcntl = None
+
+# Below this many nodes the rows are computed in-process; a pool costs more than it saves
+PARALLEL_THRESHOLD = 2000
+
+# Sources handed to a worker at a time
+CHUNK_SIZE = 64
+
+# Adjacency and per-arc metrics of the graph being solved, set once per worker process
+_worker_state: Dict[str, Tuple] = {}
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on the file at path (created if missing) across processes."""
+    with open(path, 'a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _init_worker(adjacency, arc_km, arc_minutes) -> None:
+    _worker_state['graph'] = (adjacency, arc_km, arc_minutes)
+
+
+def shortest_path_tree(adjacency, arc_km: List[float], arc_minutes: List[float], source: int,
+                       targets: Optional[Iterable[int]] = None) -> Tuple[List[float], List[float], List[int]]:
+    """
+    Least-cost tree from source over an adjacency() triple.
+    Returns the kilometres and minutes along the tree path to every node (inf where
+    unreachable) and each node's predecessor (-1 for the source and unreachable nodes).
+    With targets the search stops once all of them are settled; nodes left unsettled
+    then read as unreachable.
+    """
+    offsets, heads, weights = adjacency
+    n = len(offsets) - 1
+    cost = [math.inf] * n
+    pred = [-1] * n
+    via = [-1] * n
+    done = [False] * n
+    order = []
+    remaining = None if targets is None else set(targets) - {source}
+    cost[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if done[u]:
+            continue
+        done[u] = True
+        order.append(u)
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for k in range(offsets[u], offsets[u + 1]):
+            v = heads[k]
+            nd = d + weights[k]
+            if nd < cost[v]:
+                cost[v] = nd
+                pred[v] = u
+                via[v] = k
+                heapq.heappush(heap, (nd, v))
+
+    # Predecessors are settled first, so one pass in settle order sums the metrics
+    km = [math.inf] * n
+    minutes = [math.inf] * n
+    km[source] = minutes[source] = 0.0
+    if remaining is not None:
+        # A node relaxed but not settled before the early stop has no final predecessor
+        pred = [u if done[v] else -1 for v, u in enumerate(pred)]
+    for v in order[1:]:
+        u, k = pred[v], via[v]
+        km[v] = km[u] + arc_km[k]
+        minutes[v] = minutes[u] + arc_minutes[k]
+    return km, minutes, pred
+
+
+def _solve_chunk(sources: range) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    adjacency, arc_km, arc_minutes = _worker_state['graph']
+    rows = [shortest_path_tree(adjacency, arc_km, arc_minutes, s) for s in sources]
+    return (sources.start,
+            np.array([r[0] for r in rows], dtype=np.float32),
+            np.array([r[1] for r in rows], dtype=np.float32),
+            np.array([r[2] for r in rows], dtype=np.int32))
+
+
+class ODMatrix:
+    """
+    All-pairs route kilometres and minutes for one weight column.
+    Routes are the least-cost paths under the weights; distance and time are the
+    totals along those routes, as calculate_total_distance / calculate_total_time
+    would report them for the same path.
+    """
+
+    ARRAY_FIELDS = ('distance', 'time', 'predecessor')
+    DTYPES = (np.float32, np.float32, np.int32)
+
+    def __init__(self, nodes: NodeIndex, distance: np.ndarray, time: np.ndarray, predecessor: np.ndarray):
+        self.nodes = nodes
+        self.distance = distance
+        self.time = time
+        self.predecessor = predecessor
+
+    @classmethod
+    def build(cls, graph: CompiledGraph, weights: Optional[np.ndarray] = None,
+              minutes: Optional[np.ndarray] = None, directory: Optional[str] = None,
+              processes: Optional[int] = None) -> 'ODMatrix':
+        """
+        Solve every source of graph under weights (default dist_km).
+        minutes is the per-edge time summed along each route (default: 90 km/h at a
+        0.8 traffic factor, as calculate_total_time assumes for road graphs).
+        With a directory the tables are written there as .npy files and the result is
+        memory-mapped from them, so an N x N matrix never has to fit in memory twice.
+        The tables are written to a staging folder beside directory, which is renamed
+        to directory once all of them are complete; processes building the same
+        directory wait on its lock file and load the first one's tables.
+        processes defaults to the CPU count; graphs under PARALLEL_THRESHOLD nodes and
+        processes=1 run in the calling process.
+        """
+        if not directory:
+            tables = {name: np.empty((graph.num_nodes, graph.num_nodes), dtype=dtype)
+                      for name, dtype in zip(cls.ARRAY_FIELDS, cls.DTYPES)}
+            cls._solve(graph, weights, minutes, tables, processes)
+            return cls(graph.nodes, **tables)
+
+        directory = os.path.abspath(directory)
+        parent = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+        with _locked(directory + '.lock'):
+            matrix = cls.load(graph.nodes, directory)
+            if matrix is not None:
+                return matrix
+            staging = tempfile.mkdtemp(prefix='.od-', dir=parent)
+            try:
+                n = graph.num_nodes
+                tables = {name: np.lib.format.open_memmap(os.path.join(staging, name + '.npy'), mode='w+',
+                                                          dtype=dtype, shape=(n, n))
+                          for name, dtype in zip(cls.ARRAY_FIELDS, cls.DTYPES)}
+                cls._solve(graph, weights, minutes, tables, processes)
+                for table in tables.values():
+                    table.flush()
+                del tables
+                # Tables of an older build (e.g. another node count) are moved aside first
+                stale = None
+                if os.path.exists(directory):
+                    stale = tempfile.mkdtemp(prefix='.od-stale-', dir=parent)
+                    os.rename(directory, os.path.join(stale, 'tables'))
+                os.rename(staging, directory)
+                if stale:
+                    shutil.rmtree(stale, ignore_errors=True)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        return cls.load(graph.nodes, directory)
+
+    @classmethod
+    def _solve(cls, graph: CompiledGraph, weights: Optional[np.ndarray], minutes: Optional[np.ndarray],
+               tables: Dict[str, np.ndarray], processes: Optional[int]) -> None:
+        """Fill tables with the rows of every source of graph."""
+        n = graph.num_nodes
+        minutes = graph.dist_km / (90 * 0.8) * 60 if minutes is None else minutes
+        adjacency = graph.adjacency(weights)
+        arc_km = graph.dist_km[graph.arc_edge].tolist()
+        arc_minutes = np.asarray(minutes, dtype=np.float64)[graph.arc_edge].tolist()
+
+        chunks = [range(start, min(start + CHUNK_SIZE, n)) for start in range(0, n, CHUNK_SIZE)]
+        workers = processes or os.cpu_count() or 1
+        if workers <= 1 or n < PARALLEL_THRESHOLD:
+            _init_worker(adjacency, arc_km, arc_minutes)
+            try:
+                cls._store(tables, map(_solve_chunk, chunks))
+            finally:
+                _worker_state.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(adjacency, arc_km, arc_minutes)) as pool:
+                cls._store(tables, pool.map(_solve_chunk, chunks))
+
+    @staticmethod
+    def _store(tables: Dict[str, np.ndarray], results) -> None:
+        for start, km, minutes, pred in results:
+            end = start + len(km)
+            tables['distance'][start:end] = km
+            tables['time'][start:end] = minutes
+            tables['predecessor'][start:end] = pred
+
+    @classmethod
+    def load(cls, nodes: NodeIndex, directory: str, mmap_mode: Optional[str] = 'r') -> Optional['ODMatrix']:
+        """
+        Open tables written by build(directory=...); None if they are missing or were
+        built for a different number of nodes.
+        """
+        tables = {}
+        for name in cls.ARRAY_FIELDS:
+            try:
+                tables[name] = np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+            except (OSError, ValueError):
+                return None
+            if tables[name].shape != (len(nodes), len(nodes)):
+                return None
+        return cls(nodes, **tables)
+
+    def __repr__(self) -> str:
+        return f"ODMatrix(nodes={len(self.nodes)})"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAY_FIELDS)
+
+    def _pair(self, origin: Hashable, dest: Hashable) -> Tuple[int, int]:
+        for nid in (origin, dest):
+            if nid not in self.nodes:
+                raise nx.NodeNotFound(f"Node {nid} not in graph")
+        return self.nodes[origin], self.nodes[dest]
+
+    def route_distance(self, origin: Hashable, dest: Hashable) -> float:
+        """Kilometres along the route from origin to dest; inf if unreachable."""
+        o, d = self._pair(origin, dest)
+        return float(self.distance[o, d])
+
+    def route_time(self, origin: Hashable, dest: Hashable) -> float:
+        """Minutes along the route from origin to dest; inf if unreachable."""
+        o, d = self._pair(origin, dest)
+        return float(self.time[o, d])
+
+    def path(self, origin: Hashable, dest: Hashable) -> List[Hashable]:
+        """Node IDs of the route, read back from the predecessor row of origin."""
+        o, d = self._pair(origin, dest)
+        if o != d and self.predecessor[o, d] < 0:
+            raise nx.NetworkXNoPath(f"Node {dest} not reachable from {origin}")
+        row = self.predecessor[o]
+        path = [d]
+        while path[-1] != o:
+            path.append(int(row[path[-1]]))
+        return [self.nodes.id_of(v) for v in reversed(path)]
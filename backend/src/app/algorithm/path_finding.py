@@ -1,10 +1,19 @@
 """
 Path finding algorithms for transportation networks.
 Includes implementation of A* and Dijkstra algorithms.
+Both accept either a networkx graph or a compiled search backend
+(search.RouteEngine or contraction.ContractionHierarchy).
 """
 import math
 import networkx as nx
-from typing import List
+from typing import List, Optional, Union
+
+from .contraction import ContractionHierarchy
+from .landmarks import Landmarks
+from .search import RouteEngine
+
+# Backends that answer point-to-point queries on compiled arrays
+COMPILED_BACKENDS = (RouteEngine, ContractionHierarchy)
 
 
 class AStarAlgorithm:
@@ -40,25 +49,68 @@ class AStarAlgorithm:
         return 2 * R * math.asin(math.sqrt(a))
     
     @staticmethod
-    def find_route(G: nx.Graph, origin: str, dest: str) -> List[str]:
+    def heuristic_scale(G: nx.Graph, weight: str = "weight") -> float:
+        """
+        Largest factor k for which k * great-circle km never exceeds the weight of an edge.
+        Scaling the geographic heuristic by k keeps it admissible and consistent for any
+        weight; weights unrelated to distance (e.g. free roads) give k = 0.
+        The scan over the edges runs once per graph and weight: the result is kept in
+        G.graph['astar_scale'], which code that edits edge weights in place must delete.
+        """
+        cache = G.graph.setdefault("astar_scale", {})
+        if weight not in cache:
+            cache[weight] = AStarAlgorithm._scan_scale(G, weight)
+        return cache[weight]
+
+    @staticmethod
+    def _scan_scale(G: nx.Graph, weight: str) -> float:
+        scale = math.inf
+        nodes = G.nodes
+        for u, v, w in G.edges(data=weight, default=0):
+            try:
+                km = AStarAlgorithm.haversine(nodes[u]["x"], nodes[u]["y"], nodes[v]["x"], nodes[v]["y"])
+            except KeyError:
+                return 0.0
+            if km > 0:
+                scale = min(scale, w / km)
+        return scale if math.isfinite(scale) and scale > 0 else 0.0
+
+    @staticmethod
+    def find_route(G: Union[nx.Graph, RouteEngine, ContractionHierarchy], origin: str, dest: str,
+                   landmarks: Optional[Landmarks] = None) -> List[str]:
         """
         Find the shortest path from origin to destination using A* with geographic heuristic.
         
         Args:
-            G: NetworkX graph with x, y coordinates in node attributes
+            G: NetworkX graph with x, y coordinates in node attributes, or a compiled backend
             origin: Starting node ID
             dest: Destination node ID
+            landmarks: Optional ALT landmark table of the same weights, used as the heuristic
+                       on a NetworkX graph instead of the scaled geographic distance. Pass one
+                       for weights with free edges (e.g. 'congestion'), where the geographic
+                       scale is 0 and the search runs as a plain Dijkstra
             
         Returns:
             List of node IDs representing the path
         """
+        if isinstance(G, COMPILED_BACKENDS):
+            return G.astar_path(origin, dest)
+
+        if landmarks is not None:
+            return nx.astar_path(G, origin, dest, heuristic=landmarks.heuristic(dest), weight="weight")
+
+        scale = AStarAlgorithm.heuristic_scale(G)
+        if scale == 0:
+            # No geographic bound holds for these weights; skip the zero heuristic
+            return nx.dijkstra_path(G, origin, dest, weight="weight")
+
         # Get goal coordinates
         gx, gy = G.nodes[dest]["x"], G.nodes[dest]["y"]
         
         def heuristic(u: str, v: str) -> float:
             """Geographic distance heuristic function using x/y coordinates"""
             ux, uy = G.nodes[u]["x"], G.nodes[u]["y"]
-            return AStarAlgorithm.haversine(ux, uy, gx, gy)
+            return scale * AStarAlgorithm.haversine(ux, uy, gx, gy)
             
         # Use NetworkX's A* implementation
         return nx.astar_path(G, origin, dest, heuristic=heuristic, weight="weight")
@@ -70,18 +122,20 @@ class DijkstraAlgorithm:
     """
     
     @staticmethod
-    def find_route(G: nx.Graph, origin: str, dest: str) -> List[str]:
+    def find_route(G: Union[nx.Graph, RouteEngine, ContractionHierarchy], origin: str, dest: str) -> List[str]:
         """
         Find the shortest path from origin to destination using Dijkstra's algorithm.
         
         Args:
-            G: NetworkX graph
+            G: NetworkX graph, or a compiled backend for a bidirectional search
             origin: Starting node ID
             dest: Destination node ID
             
         Returns:
             List of node IDs representing the path
         """
+        if isinstance(G, COMPILED_BACKENDS):
+            return G.dijkstra_path(origin, dest)
         return nx.dijkstra_path(G, origin, dest, weight="weight")
 
 
@@ -0,0 +1,276 @@
+"""
+Round-based public transit routing (RAPTOR) over bus routes and metro lines.
+The network has no published timetables, so every route runs a periodic
+service: a trip leaves its first stop every headway minutes around the
+clock and reaches each later stop after a fixed ride time, derived from the
+great-circle distance between stops and the mode speeds used elsewhere.
+Round k scans every route serving a stop improved in round k - 1, so it
+finds the earliest arrival with at most k trips, and a query costs time
+linear in the route stops scanned.
+"""
+import math
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..graph.compiled import haversine_km
+
+# Average speeds (km/h) and the extra minutes spent at every metro stop,
+# as services.pathfinding.multimodal_route assumes
+BUS_SPEED = 25
+METRO_SPEED = 60
+METRO_STOP_MINUTES = 2
+
+# Minutes between metro trains (an average wait of 3 minutes)
+METRO_HEADWAY = 6
+
+# Most trips one journey may use
+MAX_ROUNDS = 8
+
+
+def bus_headway(buses: int) -> float:
+    """Minutes between buses of a route with this many buses, as multimodal_route assumes."""
+    return max(5, 60 / max(1, buses))
+
+
+class TransitRoute(NamedTuple):
+    """One direction of a bus route or metro line, with its periodic trips."""
+    route_id: str
+    mode: str
+    stops: List[int]
+    offsets: List[float]    # minutes from the first stop to each stop
+    km: List[float]         # kilometres from the first stop to each stop
+    headway: float          # minutes between trips; trip n leaves the first stop at n * headway
+
+
+class Leg(NamedTuple):
+    """One trip of a journey, from stops[board] to stops[alight] of routes[route]."""
+    route: int
+    board: int
+    alight: int
+    trip: int
+
+
+class Journey(NamedTuple):
+    departure: float
+    arrival: float
+    legs: List[Leg]
+
+
+class TransitTimetable:
+    """
+    Stop and route arrays of the periodic transit service.
+    Stops are dense integers (stop_ids interns the node IDs); serving[s] lists the
+    (route, position) pairs at which routes call at stop s.
+    """
+
+    def __init__(self, stop_ids: List[Hashable], routes: List[TransitRoute]):
+        self.stop_ids = stop_ids
+        self.stop_index = {sid: i for i, sid in enumerate(stop_ids)}
+        self.routes = routes
+        self.serving: List[List[Tuple[int, int]]] = [[] for _ in stop_ids]
+        for r, route in enumerate(routes):
+            for pos, stop in enumerate(route.stops):
+                self.serving[stop].append((r, pos))
+
+    @classmethod
+    def from_network(cls, tn) -> 'TransitTimetable':
+        """Timetable of the bus routes and metro lines of a TransportationNetwork."""
+        table = tn.node_table
+
+        def locate(sid):
+            row = table.row(sid)
+            return (table.x[row], table.y[row]) if row >= 0 else None
+
+        lines = [('bus', r['id'], r['stops'], bus_headway(r.get('buses', 0))) for r in tn.bus_routes]
+        lines += [('metro', m['id'], m['stations'], METRO_HEADWAY) for m in tn.metro_lines]
+        return cls.from_lines(lines, locate)
+
+    @classmethod
+    def from_cairo_graph(cls, graph) -> 'TransitTimetable':
+        """Timetable of the bus routes and metro lines of a CairoTransportationGraph."""
+        def locate(sid):
+            node = graph.nodes.get(sid)
+            return (node.get('x'), node.get('y')) if node is not None else None
+
+        def stop_ids(value):
+            # The CSV loader turns numeric node IDs into integers, but not stop lists
+            ids = value.replace('"', '').split(',')
+            return [int(sid) if sid not in graph.nodes and sid.isdigit() else sid for sid in ids]
+
+        lines = [('bus', route_id, stop_ids(stops), bus_headway(buses))
+                 for route_id, stops, buses, _ in graph.bus_routes]
+        lines += [('metro', line_id, stop_ids(stations), METRO_HEADWAY)
+                  for line_id, _name, stations, _ in graph.metro_lines]
+        return cls.from_lines(lines, locate)
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[Tuple[str, str, Sequence[Hashable], float]],
+                   locate: Callable[[Hashable], Optional[Tuple[float, float]]]) -> 'TransitTimetable':
+        """
+        Timetable of (mode, route ID, stop IDs, headway) lines, both directions; locate
+        gives the (x, y) of a stop ID or None. Stops without coordinates split a route,
+        since the ride time to them is unknown.
+        """
+        index: Dict[Hashable, int] = {}
+        routes: List[TransitRoute] = []
+        for mode, route_id, stops, headway in lines:
+            for part in _located_runs(stops, locate):
+                for seq in (part, part[::-1]):
+                    offsets, km = [0.0], [0.0]
+                    for (_, xa, ya), (_, xb, yb) in zip(seq, seq[1:]):
+                        dist = haversine_km(xa, ya, xb, yb)
+                        if mode == 'bus':
+                            minutes = dist / BUS_SPEED * 60
+                        else:
+                            minutes = dist / METRO_SPEED * 60 + METRO_STOP_MINUTES
+                        offsets.append(offsets[-1] + minutes)
+                        km.append(km[-1] + dist)
+                    ints = [index.setdefault(sid, len(index)) for sid, _, _ in seq]
+                    routes.append(TransitRoute(route_id, mode, ints, offsets, km, headway))
+        stop_ids: List[Hashable] = [None] * len(index)
+        for sid, i in index.items():
+            stop_ids[i] = sid
+        return cls(stop_ids, routes)
+
+    def __repr__(self) -> str:
+        return f"TransitTimetable(stops={len(self.stop_ids)}, routes={len(self.routes)})"
+
+    def departure(self, route: int, pos: int, trip: int) -> float:
+        """Clock minutes at which trip of route calls at its stop pos."""
+        r = self.routes[route]
+        return trip * r.headway + r.offsets[pos]
+
+    def earliest_trip(self, route: int, pos: int, ready: float) -> int:
+        """First trip of route that calls at stop pos no earlier than ready."""
+        r = self.routes[route]
+        return max(0, math.ceil((ready - r.offsets[pos]) / r.headway - 1e-9))
+
+
+class RaptorRouter:
+    """Earliest-arrival journeys over a TransitTimetable. Safe to share between threads."""
+
+    def __init__(self, timetable: TransitTimetable):
+        self.timetable = timetable
+
+    def journey(self, origin: Hashable, dest: Hashable, depart: float,
+                max_rounds: int = MAX_ROUNDS) -> Optional[Journey]:
+        """
+        Journey leaving origin at depart (clock minutes) that arrives first, and uses the
+        fewest trips among those arriving then; None if dest cannot be reached.
+        """
+        tt = self.timetable
+        if origin not in tt.stop_index or dest not in tt.stop_index:
+            return None
+        source, target = tt.stop_index[origin], tt.stop_index[dest]
+        if source == target:
+            return Journey(depart, depart, [])
+        arrivals, labels = self.rounds(source, depart, target, max_rounds)
+        best = arrivals[-1][target]
+        if math.isinf(best):
+            return None
+        k = next(k for k, arrival in enumerate(arrivals) if arrival[target] == best)
+        return Journey(depart, best, self._legs(labels, k, source, target))
+
+    def pareto(self, origin: Hashable, dest: Hashable, depart: float,
+               max_rounds: int = MAX_ROUNDS) -> List[Journey]:
+        """
+        Pareto-optimal journeys over (arrival, trips) leaving origin at depart, fewest trips
+        first: one journey for every round that arrives strictly earlier than the rounds
+        before it. The rounds are the bags of McRAPTOR for these two criteria, so the whole
+        front costs the single search journey() runs.
+        """
+        tt = self.timetable
+        if origin not in tt.stop_index or dest not in tt.stop_index:
+            return []
+        source, target = tt.stop_index[origin], tt.stop_index[dest]
+        if source == target:
+            return [Journey(depart, depart, [])]
+        arrivals, labels = self.rounds(source, depart, target, max_rounds)
+        journeys = []
+        best = math.inf
+        for k, arrival in enumerate(arrivals):
+            if arrival[target] < best:
+                best = arrival[target]
+                journeys.append(Journey(depart, best, self._legs(labels, k, source, target)))
+        return journeys
+
+    def _legs(self, labels: List[List[Optional[Leg]]], k: int, source: int, target: int) -> List[Leg]:
+        """Legs of the journey to target with at most k trips, walking the round labels back."""
+        routes = self.timetable.routes
+        legs = []
+        stop = target
+        while stop != source:
+            while labels[k][stop] is None:
+                k -= 1
+            leg = labels[k][stop]
+            legs.append(leg)
+            stop = routes[leg.route].stops[leg.board]
+            k -= 1
+        legs.reverse()
+        return legs
+
+    def rounds(self, source: int, depart: float, target: int = -1,
+               max_rounds: int = MAX_ROUNDS) -> Tuple[List[List[float]], List[List[Optional[Leg]]]]:
+        """
+        Earliest arrival at every stop with at most k trips (arrivals[k]) and the leg that
+        set it in round k (labels[k], None where round k improved nothing).
+        With a target, stops reached no earlier than its best arrival are pruned.
+        """
+        tt = self.timetable
+        routes, serving = tt.routes, tt.serving
+        n = len(tt.stop_ids)
+        best = [math.inf] * n
+        best[source] = depart
+        arrivals = [best[:]]
+        labels: List[List[Optional[Leg]]] = [[None] * n]
+        marked = {source}
+        for _ in range(max_rounds):
+            # Earliest marked position of every route serving a marked stop
+            queue: Dict[int, int] = {}
+            for stop in marked:
+                for r, pos in serving[stop]:
+                    if pos < queue.get(r, math.inf):
+                        queue[r] = pos
+            previous = arrivals[-1]
+            current = previous[:]
+            label: List[Optional[Leg]] = [None] * n
+            marked = set()
+            for r, start in queue.items():
+                route = routes[r]
+                stops, offsets, headway = route.stops, route.offsets, route.headway
+                trip, board = -1, -1
+                for pos in range(start, len(stops)):
+                    stop = stops[pos]
+                    if trip >= 0:
+                        arrival = trip * headway + offsets[pos]
+                        bound = best[stop] if target < 0 else min(best[stop], best[target])
+                        if arrival < bound:
+                            best[stop] = current[stop] = arrival
+                            label[stop] = Leg(r, board, pos, trip)
+                            marked.add(stop)
+                    # Catch an earlier trip here if this stop was reached in time for one
+                    ready = previous[stop]
+                    if ready < math.inf and (trip < 0 or ready <= trip * headway + offsets[pos]):
+                        earliest = max(0, math.ceil((ready - offsets[pos]) / headway - 1e-9))
+                        if trip < 0 or earliest < trip:
+                            trip, board = earliest, pos
+            arrivals.append(current)
+            labels.append(label)
+            if not marked:
+                break
+        return arrivals, labels
+
+
+def _located_runs(stops: Sequence[Hashable], locate) -> List[List[Tuple[Hashable, float, float]]]:
+    """Maximal runs (of two or more stops) of consecutive stops that have coordinates."""
+    runs, run = [], []
+    for sid in stops:
+        xy = locate(sid)
+        if xy is not None and all(isinstance(c, (int, float)) and math.isfinite(c) for c in xy):
+            run.append((sid, float(xy[0]), float(xy[1])))
+            continue
+        if len(run) > 1:
+            runs.append(run)
+        run = []
+    if len(run) > 1:
+        runs.append(run)
+    return runs
@@ -0,0 +1,269 @@
+"""
+Bidirectional Dijkstra and A* over a CompiledGraph.
+Nodes are dense integers and the heaps hold (key, node) pairs, so a query
+never touches networkx dicts. Distance, parent and settled arrays are
+allocated once per thread and invalidated by bumping a generation counter,
+so a query costs only the nodes it visits instead of O(N) initialisation.
+"""
+import heapq
+import math
+import threading
+from typing import Hashable, List, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from ..graph.compiled import CompiledGraph
+
+EARTH_RADIUS_KM = 6371.0
+
+# Lower bounds astar_path() can be guided by
+HEURISTICS = ('landmarks', 'great_circle')
+
+
+class SearchSpace:
+    """
+    Per-direction scratch arrays reused across queries.
+    dist[v] and parent[v] are only valid while seen[v] == generation, and v
+    is settled while done[v] == generation; reset() just bumps the generation.
+    """
+
+    __slots__ = ('dist', 'parent', 'seen', 'done', 'generation')
+
+    def __init__(self, num_nodes: int):
+        self.dist: List[float] = [math.inf] * num_nodes
+        self.parent: List[int] = [-1] * num_nodes
+        self.seen: List[int] = [0] * num_nodes
+        self.done: List[int] = [0] * num_nodes
+        self.generation = 0
+
+    def reset(self) -> int:
+        self.generation += 1
+        return self.generation
+
+
+class RouteEngine:
+    """
+    Point-to-point shortest paths over one weight column of a CompiledGraph.
+
+    dijkstra_path() runs a bidirectional Dijkstra; astar_path() adds a symmetric
+    potential built from a lower bound on the remaining cost: the ALT bound of
+    landmarks (see landmarks.Landmarks) when given, otherwise the great-circle
+    distance scaled so it never overestimates the weights (the scale is 0 when
+    some edge is free, which makes it a Dijkstra). All of them return the same
+    cost; the engine is safe to share between threads.
+    """
+
+    def __init__(self, graph: CompiledGraph, weights: Optional[np.ndarray] = None,
+                 x: Optional[np.ndarray] = None, y: Optional[np.ndarray] = None, landmarks=None):
+        weights = graph.dist_km if weights is None else np.asarray(weights, dtype=np.float64)
+        if np.any(weights < 0):
+            raise ValueError("RouteEngine requires non-negative edge weights")
+        self.graph = graph
+        self.offsets, self.targets, self.weights = graph.adjacency(weights)
+        self._local = threading.local()
+        self.landmarks = landmarks
+        self.scale = 0.0
+        self._lon = self._lat = self._cos_lat = None
+        if x is not None and y is not None and graph.num_edges:
+            self._init_potential(weights, np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+
+    @classmethod
+    def from_network(cls, tn, profile: str = 'congestion', period: Optional[str] = None,
+                     landmarks=None) -> 'RouteEngine':
+        """Engine over the road graph of a TransportationNetwork for one profile and period."""
+        graph = tn.compiled_network()
+        table = tn.node_table
+        x = table.take('x', graph.nodes.ids)
+        y = table.take('y', graph.nodes.ids)
+        return cls(graph, tn.edge_weights(profile).column(period), x, y, landmarks)
+
+    def _init_potential(self, weights: np.ndarray, x: np.ndarray, y: np.ndarray) -> None:
+        if not (np.all(np.isfinite(x)) and np.all(np.isfinite(y))):
+            return
+        lon, lat = np.radians(x), np.radians(y)
+        g = self.graph
+        straight = _haversine(lon[g.edge_u], lat[g.edge_u], np.cos(lat[g.edge_u]),
+                              lon[g.edge_v], lat[g.edge_v], np.cos(lat[g.edge_v]))
+        # Largest factor for which scale * great-circle km is a lower bound on every edge
+        spans = straight > 0
+        if not np.any(spans):
+            return
+        scale = float(np.min(weights[spans] / straight[spans]))
+        if not np.isfinite(scale) or scale <= 0:
+            return
+        # Keep a small margin so rounding cannot make the potential inconsistent
+        self.scale = scale * (1 - 1e-9)
+        self._lon, self._lat, self._cos_lat = lon.tolist(), lat.tolist(), np.cos(lat).tolist()
+
+    # ------------------------------------------------------------------
+    # Public API (node IDs)
+    # ------------------------------------------------------------------
+
+    @property
+    def settled(self) -> int:
+        """Nodes settled by the last query of the calling thread."""
+        return getattr(self._local, 'settled', 0)
+
+    def node(self, nid: Hashable) -> int:
+        idx = self.graph.nodes.get(nid)
+        if idx < 0:
+            raise nx.NodeNotFound(f"Node {nid} not found in graph")
+        return idx
+
+    def dijkstra_path(self, origin: Hashable, dest: Hashable) -> List[Hashable]:
+        """Shortest path from origin to dest as node IDs; raises nx.NetworkXNoPath if there is none."""
+        return self.shortest_path(origin, dest, heuristic=False)[1]
+
+    def astar_path(self, origin: Hashable, dest: Hashable, heuristic: Union[bool, str] = True) -> List[Hashable]:
+        """
+        Same result as dijkstra_path(), guided by a lower bound: one of HEURISTICS,
+        or True for landmarks when the engine has them and great_circle otherwise.
+        """
+        return self.shortest_path(origin, dest, heuristic=heuristic)[1]
+
+    def shortest_path(self, origin: Hashable, dest: Hashable,
+                      heuristic: Union[bool, str] = True) -> Tuple[float, List[Hashable]]:
+        """(cost, path of node IDs) from origin to dest."""
+        source, target = self.node(origin), self.node(dest)
+        cost, path = self.search(source, target, heuristic)
+        if path is None:
+            raise nx.NetworkXNoPath(f"Node {dest} not reachable from {origin}")
+        ids = self.graph.nodes.ids
+        return cost, [ids[v] for v in path]
+
+    def distance(self, origin: Hashable, dest: Hashable) -> float:
+        """Shortest-path cost, or inf if dest cannot be reached."""
+        return self.search(self.node(origin), self.node(dest), heuristic=False)[0]
+
+    # ------------------------------------------------------------------
+    # Search (node integers)
+    # ------------------------------------------------------------------
+
+    def _spaces(self) -> Tuple[SearchSpace, SearchSpace]:
+        spaces = getattr(self._local, 'spaces', None)
+        if spaces is None:
+            n = self.graph.num_nodes
+            spaces = self._local.spaces = (SearchSpace(n), SearchSpace(n))
+        return spaces
+
+    def _potentials(self, source: int, target: int, heuristic: Union[bool, str]):
+        """
+        Forward potential pf(v) = (h_t(v) - h_s(v)) / 2 as a memoizing callable, or
+        None for a plain Dijkstra. The backward potential is -pf, so both searches
+        see non-negative reduced costs.
+        """
+        if heuristic is True:
+            heuristic = 'landmarks' if self.landmarks is not None else 'great_circle'
+        if not heuristic:
+            return None
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic: {heuristic}")
+        if heuristic == 'landmarks':
+            if self.landmarks is None:
+                raise ValueError("RouteEngine has no landmarks")
+            to_target, to_source = self.landmarks.bound_to(target), self.landmarks.bound_to(source)
+            cache = {}
+
+            def pf(v: int) -> float:
+                p = cache.get(v)
+                if p is None:
+                    p = cache[v] = (to_target(v) - to_source(v)) / 2
+                return p
+
+            return pf
+        if self.scale <= 0:
+            return None
+        lon, lat, cos_lat, scale = self._lon, self._lat, self._cos_lat, self.scale / 2
+        slon, slat, scos = lon[source], lat[source], cos_lat[source]
+        tlon, tlat, tcos = lon[target], lat[target], cos_lat[target]
+        cache = {}
+
+        def pf(v: int) -> float:
+            p = cache.get(v)
+            if p is None:
+                vlon, vlat, vcos = lon[v], lat[v], cos_lat[v]
+                p = cache[v] = scale * (_haversine(vlon, vlat, vcos, tlon, tlat, tcos)
+                                        - _haversine(vlon, vlat, vcos, slon, slat, scos))
+            return p
+
+        return pf
+
+    def search(self, source: int, target: int,
+               heuristic: Union[bool, str] = True) -> Tuple[float, Optional[List[int]]]:
+        """
+        Bidirectional search between two node integers.
+        Returns (cost, path) or (inf, None) if target is unreachable.
+        """
+        fwd, bwd = self._spaces()
+        self._local.settled = 0
+        if source == target:
+            return 0.0, [source]
+        pf = self._potentials(source, target, heuristic)
+        if pf is not None and math.isinf(pf(source)):
+            # The landmarks already show that source and target are not connected
+            return math.inf, None
+        gen_f, gen_b = fwd.reset(), bwd.reset()
+        for space, gen, start in ((fwd, gen_f, source), (bwd, gen_b, target)):
+            space.seen[start] = gen
+            space.dist[start] = 0.0
+            space.parent[start] = -1
+        # Heap keys are dist + potential; without a heuristic the potential is 0
+        heap_f = [(pf(source) if pf else 0.0, source)]
+        heap_b = [(-pf(target) if pf else 0.0, target)]
+        offsets, heads, weights = self.offsets, self.targets, self.weights
+        best, meet, settled = math.inf, -1, 0
+
+        while heap_f and heap_b:
+            # Stop once no s-t path through an unsettled node can beat the best one
+            if heap_f[0][0] + heap_b[0][0] >= best:
+                break
+            forward = heap_f[0][0] <= heap_b[0][0]
+            if forward:
+                heap, space, other, gen, other_gen, sign = heap_f, fwd, bwd, gen_f, gen_b, 1.0
+            else:
+                heap, space, other, gen, other_gen, sign = heap_b, bwd, fwd, gen_b, gen_f, -1.0
+            _key, u = heapq.heappop(heap)
+            done = space.done
+            if done[u] == gen:
+                continue
+            done[u] = gen
+            settled += 1
+            dist, parent, seen = space.dist, space.parent, space.seen
+            other_dist, other_seen = other.dist, other.seen
+            du = dist[u]
+            for k in range(offsets[u], offsets[u + 1]):
+                v = heads[k]
+                nd = du + weights[k]
+                if done[v] != gen and (seen[v] != gen or nd < dist[v]):
+                    seen[v] = gen
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd + sign * pf(v) if pf else nd, v))
+                if other_seen[v] == other_gen and nd + other_dist[v] < best:
+                    best = nd + other_dist[v]
+                    meet = v
+        self._local.settled = settled
+
+        if meet < 0:
+            return math.inf, None
+        path = []
+        v = meet
+        while v != -1:
+            path.append(v)
+            v = fwd.parent[v]
+        path.reverse()
+        v = bwd.parent[meet]
+        while v != -1:
+            path.append(v)
+            v = bwd.parent[v]
+        return best, path
+
+
+def _haversine(lon1, lat1, cos1, lon2, lat2, cos2):
+    """Great-circle km between points given in radians with precomputed cos(lat)."""
+    if isinstance(lon1, np.ndarray):
+        a = np.sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
@@ -0,0 +1,232 @@
+"""
+Time-dependent routing over a CompiledGraph.
+Every edge's travel time is a piecewise-linear function of the clock time
+at which it is entered: the per-period travel times are anchored at the
+clock times in PERIOD_CLOCK and interpolated linearly in between, wrapping
+around midnight. A query takes a departure time and runs a label-setting
+Dijkstra (or A*) on arrival times, so a trip that starts before a peak and
+runs into it pays the peak only on the edges it enters during the peak.
+"""
+import bisect
+import heapq
+import math
+import threading
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+from ..graph.compiled import CompiledGraph
+from ..graph.networks import PERIODS
+from .landmarks import Landmarks
+from .search import SearchSpace
+
+# Clock time (minutes after midnight) each traffic period's flow is taken to describe
+PERIOD_CLOCK: Dict[str, int] = {
+    'night': 3 * 60,
+    'morning': 8 * 60,
+    'afternoon': 14 * 60,
+    'evening': 18 * 60,
+}
+
+DAY_MINUTES = 24 * 60
+
+
+def parse_clock(value: str) -> float:
+    """Minutes after midnight of an 'HH:MM' string; raises ValueError if it is malformed."""
+    hours, _, minutes = value.partition(':')
+    hours, minutes = int(hours), int(minutes or 0)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid clock time: {value}")
+    return float(hours * 60 + minutes)
+
+
+def format_clock(minutes: float) -> str:
+    """'HH:MM' of a time in minutes, wrapped to one day."""
+    total = int(round(minutes)) % DAY_MINUTES
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+class TravelTimeFunctions:
+    """
+    Piecewise-linear travel times of every edge over one day.
+    minutes[e, i] is the travel time of edge e when entered at clock breakpoints[i];
+    the last breakpoint joins the first one of the next day.
+    Where a travel time falls faster than the clock advances, the earlier breakpoint is
+    lowered to the later one plus the wait until it, so the functions are FIFO.
+    """
+
+    def __init__(self, breakpoints: Sequence[float], minutes: np.ndarray):
+        order = np.argsort(breakpoints)
+        self.breakpoints = np.asarray(breakpoints, dtype=np.float64)[order]
+        minutes = np.array(minutes, dtype=np.float64)[:, order]
+        spans = np.diff(np.append(self.breakpoints, self.breakpoints[0] + DAY_MINUTES))
+        # Entering later must never mean arriving earlier (FIFO), or label setting fails.
+        # Two backward sweeps carry a lowered value around the wrap at midnight.
+        for _ in range(2):
+            for i in reversed(range(len(spans))):
+                np.minimum(minutes[:, i], minutes[:, (i + 1) % len(spans)] + spans[i], out=minutes[:, i])
+        self.minutes = minutes
+        with np.errstate(invalid='ignore'):
+            slopes = (np.roll(self.minutes, -1, axis=1) - self.minutes) / spans
+        # Impassable edges (inf minutes all day) stay inf at every clock time;
+        # rounding must not push a waiting segment below -1
+        self.slopes = np.maximum(np.where(np.isfinite(slopes), slopes, 0.0), -1.0)
+
+    @classmethod
+    def from_weights(cls, table, clock: Dict[str, int] = PERIOD_CLOCK) -> 'TravelTimeFunctions':
+        """Functions from the per-period columns of a graph.weights.WeightTable in minutes."""
+        periods = [p for p in PERIODS if p in clock]
+        return cls([clock[p] for p in periods], np.column_stack([table.column(p) for p in periods]))
+
+    def lower_bounds(self) -> np.ndarray:
+        """Fastest travel time of every edge over the day (a function's minimum is at a breakpoint)."""
+        return self.minutes.min(axis=1)
+
+    def at(self, edge: int, clock: float) -> float:
+        """Travel time of edge when entered at clock (minutes, any day)."""
+        i, offset = self.segment(clock)
+        return float(self.minutes[edge, i] + self.slopes[edge, i] * offset)
+
+    def segment(self, clock: float) -> Tuple[int, float]:
+        """(segment index, minutes since its breakpoint) of a clock time."""
+        clock = clock % DAY_MINUTES
+        if clock < self.breakpoints[0]:
+            clock += DAY_MINUTES
+        i = bisect.bisect_right(self.breakpoints.tolist(), clock) - 1
+        return i, clock - self.breakpoints[i]
+
+
+class TimeDependentEngine:
+    """
+    Point-to-point earliest-arrival queries over TravelTimeFunctions.
+    astar=True guides the search with the ALT bound of landmarks built on every
+    edge's fastest time of day, which never overestimates the remaining time.
+    Like RouteEngine, it is safe to share between threads.
+    """
+
+    def __init__(self, graph: CompiledGraph, functions: TravelTimeFunctions, landmarks: Optional[Landmarks] = None):
+        if np.any(functions.minutes < 0):
+            raise ValueError("TimeDependentEngine requires non-negative travel times")
+        self.graph = graph
+        self.functions = functions
+        self.landmarks = landmarks
+        self.offsets = graph.offsets.tolist()
+        self.targets = graph.targets.tolist()
+        self._breakpoints = functions.breakpoints.tolist()
+        # Segment i of arc a is at a * segments + i
+        self._segments = len(self._breakpoints)
+        self._values = functions.minutes[graph.arc_edge].ravel().tolist()
+        self._slopes = functions.slopes[graph.arc_edge].ravel().tolist()
+        self._local = threading.local()
+
+    @classmethod
+    def from_network(cls, tn, profile: str = 'timed_route', landmarks: Optional[Landmarks] = None) -> 'TimeDependentEngine':
+        """Engine over the road graph of a TransportationNetwork for a minutes profile."""
+        return cls(tn.compiled_network(), TravelTimeFunctions.from_weights(tn.edge_weights(profile)), landmarks)
+
+    @staticmethod
+    def build_landmarks(graph: CompiledGraph, functions: TravelTimeFunctions) -> Landmarks:
+        """ALT table on the fastest travel time of every edge, for astar queries."""
+        return Landmarks.build(graph, functions.lower_bounds())
+
+    # ------------------------------------------------------------------
+    # Public API (node IDs)
+    # ------------------------------------------------------------------
+
+    @property
+    def settled(self) -> int:
+        """Nodes settled by the last query of the calling thread."""
+        return getattr(self._local, 'settled', 0)
+
+    def node(self, nid: Hashable) -> int:
+        idx = self.graph.nodes.get(nid)
+        if idx < 0:
+            raise nx.NodeNotFound(f"Node {nid} not found in graph")
+        return idx
+
+    def route(self, origin: Hashable, dest: Hashable, depart: float,
+              astar: bool = True) -> Tuple[float, List[Hashable]]:
+        """
+        (arrival, path of node IDs) of the earliest arrival at dest when leaving origin
+        at depart (minutes after midnight); arrival may run past midnight (> DAY_MINUTES).
+        """
+        arrival, path = self.search(self.node(origin), self.node(dest), depart, astar)
+        if path is None:
+            raise nx.NetworkXNoPath(f"Node {dest} not reachable from {origin}")
+        ids = self.graph.nodes.ids
+        return arrival, [ids[v] for v in path]
+
+    def travel_time(self, path: Sequence[Hashable], depart: float) -> float:
+        """Minutes to drive path (node IDs) when leaving at depart."""
+        graph = self.graph
+        clock = depart
+        for u, v in zip(path[:-1], path[1:]):
+            clock += self.functions.at(graph.edge_between(self.node(u), self.node(v)), clock)
+        return clock - depart
+
+    # ------------------------------------------------------------------
+    # Search (node integers)
+    # ------------------------------------------------------------------
+
+    def _space(self) -> SearchSpace:
+        space = getattr(self._local, 'space', None)
+        if space is None:
+            space = self._local.space = SearchSpace(self.graph.num_nodes)
+        return space
+
+    def search(self, source: int, target: int, depart: float,
+               astar: bool = True) -> Tuple[float, Optional[List[int]]]:
+        """Label-setting search on arrival times; returns (arrival, path) or (inf, None)."""
+        space = self._space()
+        gen = space.reset()
+        arrival, parent, seen, done = space.dist, space.parent, space.seen, space.done
+        bound = self.landmarks.bound_to(target) if astar and self.landmarks is not None else None
+        seen[source] = gen
+        arrival[source] = depart
+        parent[source] = -1
+        heap = [(depart, depart, source)]
+        offsets, heads, values, slopes = self.offsets, self.targets, self._values, self._slopes
+        breakpoints, segments = self._breakpoints, self._segments
+        first = breakpoints[0]
+        settled = 0
+        found = False
+        while heap:
+            _, t, u = heapq.heappop(heap)
+            if done[u] == gen:
+                continue
+            done[u] = gen
+            settled += 1
+            if u == target:
+                found = True
+                break
+            # The clock, and so the segment of every arc's function, is shared by all arcs of u
+            clock = t % DAY_MINUTES
+            if clock < first:
+                clock += DAY_MINUTES
+            i = bisect.bisect_right(breakpoints, clock) - 1
+            offset = clock - breakpoints[i]
+            for a in range(offsets[u], offsets[u + 1]):
+                v = heads[a]
+                if done[v] == gen:
+                    continue
+                k = a * segments + i
+                nt = t + values[k] + slopes[k] * offset
+                if nt < math.inf and (seen[v] != gen or nt < arrival[v]):
+                    seen[v] = gen
+                    arrival[v] = nt
+                    parent[v] = u
+                    if bound is None:
+                        heapq.heappush(heap, (nt, nt, v))
+                    else:
+                        h = bound(v)
+                        if h < math.inf:
+                            heapq.heappush(heap, (nt + h, nt, v))
+        self._local.settled = settled
+        if not found:
+            return math.inf, None
+        path = [target]
+        while path[-1] != source:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return arrival[target], path
@@ -1,11 +1,13 @@
 from flask import Blueprint, request, jsonify
-from ..graph.networks import TransportationNetwork
-from ..algorithm.emergency_routing import EmergencyRouter
+from ..graph.snapshot import get_network
+from ..algorithm.alternatives import parse_alternatives
+from ..algorithm.emergency_routing import resolve_facility_type
+from ..graph.weights import emergency_vehicle
 
 emergency_bp = Blueprint('emergency', __name__)
 
-# Global transportation network
-tn = TransportationNetwork.from_json_folder('data')
+# Most facilities one /emergency/nearest-facility request may ask for
+MAX_FACILITIES = 10
 
 @emergency_bp.route('/route', methods=['GET'])
 def get_emergency_route():
@@ -17,27 +19,45 @@ def get_emergency_route():
     
     if not origin or not dest:
         return jsonify({"error": "Missing origin or destination"}), 400
-        
     try:
-        # Get traffic-aware road network
-        G = tn.build_road_network(period=period)
+        alternatives = parse_alternatives(request.args.get('alternatives'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
-        # Create emergency router
-        router = EmergencyRouter(G, emergency_type)
+    try:
+        # Routes and response times come from the precomputed weights of this vehicle type
+        tn = get_network()
+        router = tn.emergency_router(emergency_type, period)
         
-        # Find emergency route
-        path, response_time = router.find_emergency_route(origin, dest)
+        # Find emergency route; with alternatives it comes from the same two search
+        # trees of one via-node query as the alternatives
+        others = []
+        if alternatives:
+            finder = tn.alternative_routes(f"emergency:{emergency_vehicle(emergency_type)}", period)
+            (_, path), *others = finder.paths(origin, dest, alternatives + 1)
+            response_time = router.calculate_response_time(path)
+        else:
+            path, response_time = router.find_emergency_route(origin, dest)
         
         # Convert path to edge list for frontend
         edges = [{"from": path[i], "to": path[i + 1]} 
                 for i in range(len(path) - 1)]
         
-        return jsonify({
+        result = {
             "edges": edges,
             "estimated_response_time": response_time,
             "emergency_type": emergency_type,
             "path": path
-        })
+        }
+        
+        if alternatives:
+            result["alternatives"] = [{
+                "edges": [{"from": alt[i], "to": alt[i + 1]} for i in range(len(alt) - 1)],
+                "estimated_response_time": router.calculate_response_time(alt),
+                "path": alt
+            } for _, alt in others]
+        
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -47,33 +67,52 @@ def find_nearest_facility():
     """Find nearest emergency facility (hospital, fire station, etc.)"""
     location = request.args.get('location')
     facility_type = request.args.get('type', 'hospital')
+    emergency_type = request.args.get('emergency_type', 'ambulance')
     period = request.args.get('period', 'current')
     
     if not location:
         return jsonify({"error": "Missing location parameter"}), 400
+    try:
+        k = int(request.args.get('k', 1))
+    except ValueError:
+        return jsonify({"error": f"Invalid k: {request.args['k']}"}), 400
+    if not 1 <= k <= MAX_FACILITIES:
+        return jsonify({"error": f"k must be between 1 and {MAX_FACILITIES}"}), 400
         
     try:
-        # Get current network
-        G = tn.build_road_network(period=period)
+        tn = get_network()
+        type_name = resolve_facility_type(facility_type, tn.node_table.type_names)
+        facility_ids = tn.facilities_of_type(type_name) if type_name else []
         
-        # Find nearest facility
-        nearest = EmergencyRouter.find_nearest_facility(
-            G, location, facility_type, tn.facilities
-        )
+        if k == 1 and type_name:
+            # The precomputed catchment of the type already names every node's nearest facility
+            hit = tn.facility_catchment(type_name, emergency_type, period).nearest(location)
+            nearest = [(hit[0], round(hit[1], 2), hit[2])] if hit else []
+        else:
+            # One search from all facilities of the type over this period's response times
+            router = tn.emergency_router(emergency_type, period)
+            nearest = router.find_nearest_facilities(location, facility_ids, k)
         
         if nearest:
-            facility_data = tn.facilities[nearest]
-            return jsonify({
-                "facility_id": nearest,
-                "facility_name": facility_data.get('name'),
-                "facility_type": facility_data.get('type'),
-                "coordinates": {
-                    "x": facility_data.get('x'),
-                    "y": facility_data.get('y')
-                }
-            })
+            facilities = []
+            for fid, response_time, path in nearest:
+                facility_data = tn.facilities[fid]
+                facilities.append({
+                    "facility_id": fid,
+                    "facility_name": facility_data.get('name'),
+                    "facility_type": facility_data.get('type'),
+                    "coordinates": {
+                        "x": facility_data.get('x'),
+                        "y": facility_data.get('y')
+                    },
+                    "estimated_response_time": response_time,
+                    "path": path
+                })
+            return jsonify(dict(facilities[0], facilities=facilities))
+        elif facility_ids:
+            return jsonify({"error": f"No {facility_type} facility reachable from {location}"}), 404
         else:
             return jsonify({"error": f"No {facility_type} facility found"}), 404
             
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"error": str(e)}), 500
\ No newline at end of file
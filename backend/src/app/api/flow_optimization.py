@@ -1,27 +1,226 @@
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
-from typing import List, Dict, Tuple
+import numpy as np
+from typing import List, Dict, Optional, Tuple
 from ..graph.networks import TransportationNetwork
+from ..graph.snapshot import get_network
+from ..algorithm.od_matrix import shortest_path_tree
 from ..algorithm.path_finding import AStarAlgorithm, DijkstraAlgorithm
+from ..algorithm.time_dependent import format_clock
 
-# Global tn and G can remain for fallback or other uses, but core logic will use passed graph.
-# Renamed for clarity to avoid confusion with local graphs.
-tn_global = TransportationNetwork.from_json_folder('data')
-G_global = tn_global.build_road_network()  # Default global graph
+# Most origin/destination pairs accepted by one /flow/route/batch request
+MAX_BATCH_PAIRS = 1000
 
-def find_astar_route(origin: str, dest: str, period: str) -> Tuple[List[str], nx.Graph]:
-    """Find the best route using A* algorithm and return path and the graph used."""
-    tn_local = TransportationNetwork.from_json_folder('data')
-    G_local = tn_local.build_road_network(period)
-    path = AStarAlgorithm.find_route(G_local, origin, dest)
+# Threads answering the origin groups of a batch
+BATCH_WORKERS = min(8, os.cpu_count() or 1)
+
+# /flow/table profiles: (route cost profile, duration profile, include bus and metro edges).
+# 'road' gives the minutes of the /flow/route/* endpoints, 'traffic' those minutes slowed
+# by the period's congestion (as /flow/route/timed). Emergency profiles take the vehicle
+# type after the colon
+TABLE_PROFILES = {
+    'road': ('congestion', 'route_time', False),
+    'traffic': ('timed_route', 'timed_route', False),
+    'emergency': ('emergency:{}', 'emergency_response:{}', False),
+    'multimodal': ('multimodal', 'multimodal', True),
+}
+
+# Largest sources x destinations table one request may ask for
+MAX_TABLE_CELLS = 10_000_000
+
+# /flow/isochrone profiles: (edge minutes profile, include bus and metro edges).
+# The minutes of each profile are the durations of the same /flow/table profile
+ISOCHRONE_PROFILES = {
+    'road': ('route_time', False),
+    'traffic': ('timed_route', False),
+    'emergency': ('emergency_response:{}', False),
+    'multimodal': ('multimodal', True),
+}
+
+# Most time budgets one /flow/isochrone request may ask for
+MAX_ISOCHRONE_BUDGETS = 10
+
+def find_astar_route(origin: str, dest: str, period: str, heuristic: Optional[str] = None) -> Tuple[List[str], nx.Graph]:
+    """
+    Find the best route using A* algorithm and return path and the graph used.
+    By default the Contraction Hierarchy answers the query; heuristic ('landmarks' or
+    'great_circle') runs a bidirectional A* guided by that lower bound instead.
+    """
+    tn = get_network()
+    G_local = tn.road_network(period)
+    if heuristic:
+        path = tn.route_engine('congestion', period).astar_path(origin, dest, heuristic)
+    else:
+        path = AStarAlgorithm.find_route(tn.contraction_hierarchy('congestion', period), origin, dest)
     return path, G_local
 
 def find_dijkstra_route(origin: str, dest: str, period: str) -> Tuple[List[str], nx.Graph]:
-    """Find the best route using Dijkstra's algorithm and return path and the graph used."""
-    tn_local = TransportationNetwork.from_json_folder('data')
-    G_local = tn_local.build_road_network(period)
-    path = DijkstraAlgorithm.find_route(G_local, origin, dest)
+    """
+    Find the best route using Dijkstra's algorithm and return path and the graph used.
+    With precomputed OD matrices the path is read from the predecessor table instead.
+    """
+    tn = get_network()
+    G_local = tn.road_network(period)
+    matrix = tn.od_matrix('congestion', period)
+    if matrix is not None:
+        return matrix.path(origin, dest), G_local
+    path = DijkstraAlgorithm.find_route(tn.contraction_hierarchy('congestion', period), origin, dest)
     return path, G_local
 
+def find_alternative_routes(origin: str, dest: str, period: str,
+                            count: int) -> Tuple[List[str], nx.Graph, List[Dict]]:
+    """
+    Find the best route, the graph used and up to count routes that differ enough from
+    it, each with the fields of a /flow/route/dijkstra response. The best route and the
+    alternatives are read from the same two search trees of the via-node method
+    (see algorithm.alternatives), so no separate shortest-route query is run.
+    """
+    tn = get_network()
+    G_local = tn.road_network(period)
+    routes = tn.alternative_routes('congestion', period).paths(origin, dest, count + 1)
+    return routes[0][1], G_local, [{
+        "edges": path_to_edges(path),
+        "total_distance": calculate_total_distance(path, G_local),
+        "total_time": calculate_total_time(path, G_local),
+    } for _, path in routes[1:]]
+
+def find_timed_route(origin: str, dest: str, depart: float, astar: bool = True) -> Dict:
+    """
+    Earliest-arrival route leaving origin at depart (minutes after midnight).
+    Edge travel times follow the clock through the periods instead of one fixed period:
+    the route_time minutes of the other route endpoints, slowed by each period's congestion.
+    """
+    tn = get_network()
+    arrival, path = tn.time_dependent_engine().route(origin, dest, depart, astar)
+    G_local = tn.road_network()
+    return {
+        "edges": path_to_edges(path),
+        "total_distance": calculate_total_distance(path, G_local),
+        "total_time": round(arrival - depart, 2),
+        "free_flow_time": calculate_total_time(path, G_local),
+        "departure": format_clock(depart),
+        "arrival": format_clock(arrival),
+    }
+
+def find_route_totals(origin: str, dest: str, period: str) -> Tuple[float, float]:
+    """
+    Total distance (km) and time (minutes) of the best route, rounded as
+    calculate_total_distance / calculate_total_time round them.
+    Precomputed OD matrices answer with two lookups; otherwise the route is searched.
+    """
+    matrix = get_network().od_matrix('congestion', period)
+    if matrix is None:
+        path, graph = find_dijkstra_route(origin, dest, period)
+        return calculate_total_distance(path, graph), calculate_total_time(path, graph)
+    distance = matrix.route_distance(origin, dest)
+    if math.isinf(distance):
+        raise nx.NetworkXNoPath(f"Node {dest} not reachable from {origin}")
+    return round(distance, 1), round(matrix.route_time(origin, dest), 2)
+
+def find_batch_routes(pairs: List[Tuple[str, str]], period: str) -> List[Dict]:
+    """
+    Routes for many (origin, dest) pairs in one call, in the order given.
+    Each entry has the fields of a /flow/route/dijkstra response, or an "error".
+    Pairs are grouped by origin: each group grows one shortest-path tree that stops
+    once all of its destinations are settled, and groups run on a thread pool.
+    Precomputed OD matrices answer every pair with lookups instead.
+    """
+    tn = get_network()
+    matrix = tn.od_matrix('congestion', period)
+    compiled = tn.compiled_network()
+    nodes = compiled.nodes
+
+    groups = defaultdict(set)
+    for origin, dest in pairs:
+        if origin in nodes and dest in nodes:
+            groups[origin].add(nodes[dest])
+
+    trees = {}
+    if matrix is None and groups:
+        engine = tn.route_engine('congestion', period)
+        adjacency = (engine.offsets, engine.targets, engine.weights)
+        arc_km = compiled.dist_km[compiled.arc_edge].tolist()
+        arc_minutes = tn.edge_weights('route_time').column(period)[compiled.arc_edge].tolist()
+
+        def grow(origin):
+            return origin, shortest_path_tree(adjacency, arc_km, arc_minutes, nodes[origin], groups[origin])
+
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+            trees = dict(pool.map(grow, groups))
+
+    results = []
+    for origin, dest in pairs:
+        result = {"origin": origin, "dest": dest}
+        missing = next((nid for nid in (origin, dest) if nid not in nodes), None)
+        if missing is not None:
+            result["error"] = f"Node {missing} not in graph"
+        elif matrix is not None:
+            distance = matrix.route_distance(origin, dest)
+            if math.isinf(distance):
+                result["error"] = f"Node {dest} not reachable from {origin}"
+            else:
+                result.update(edges=path_to_edges(matrix.path(origin, dest)), total_distance=round(distance, 1),
+                              total_time=round(matrix.route_time(origin, dest), 2))
+        else:
+            km, minutes, pred = trees[origin]
+            target = nodes[dest]
+            if math.isinf(km[target]):
+                result["error"] = f"Node {dest} not reachable from {origin}"
+            else:
+                path = [target]
+                while pred[path[-1]] >= 0:
+                    path.append(pred[path[-1]])
+                result.update(edges=path_to_edges([nodes.id_of(v) for v in reversed(path)]),
+                              total_distance=round(km[target], 1), total_time=round(minutes[target], 2))
+        results.append(result)
+    return results
+
+def compute_table(sources: List[str], destinations: List[str], period: str, profile: str = 'road',
+                  emergency_type: str = 'ambulance') -> Dict:
+    """
+    Travel time (minutes) and distance (km) from every source to every destination, along
+    the least-cost route of a TABLE_PROFILES profile. Unreachable pairs are None.
+    The matrices come from one bucket many-to-many query on the profile's Contraction
+    Hierarchy, not from len(sources) x len(destinations) point queries.
+    """
+    tn = get_network()
+    cost_profile, time_profile, include_transit = TABLE_PROFILES[profile]
+    cost_profile, time_profile = cost_profile.format(emergency_type), time_profile.format(emergency_type)
+    compiled = tn.compiled_network(include_transit=include_transit)
+    nodes = compiled.nodes
+    for nid in sources + destinations:
+        if nid not in nodes:
+            raise nx.NodeNotFound(f"Node {nid} not in graph")
+    minutes = tn.edge_weights(time_profile, include_transit=include_transit).column(period)
+    hierarchy = tn.contraction_hierarchy(cost_profile, period, include_transit=include_transit)
+    _, (durations, distances) = hierarchy.table([nodes[nid] for nid in sources], [nodes[nid] for nid in destinations],
+                                                (minutes, compiled.dist_km))
+    return {
+        "sources": sources,
+        "destinations": destinations,
+        "durations": np.where(np.isnan(durations), None, durations.round(2)).tolist(),
+        "distances": np.where(np.isnan(distances), None, distances.round(1)).tolist(),
+    }
+
+def compute_isochrones(origin: str, budgets: List[float], period: str, profile: str = 'road',
+                       emergency_type: str = 'ambulance', hull: bool = False) -> Dict:
+    """
+    Nodes reachable from origin within each time budget (minutes) under an
+    ISOCHRONE_PROFILES profile, from one Dijkstra bounded by the largest budget.
+    With hull every budget also gets the convex hull of its nodes as [x, y] points.
+    """
+    minutes_profile, include_transit = ISOCHRONE_PROFILES[profile]
+    engine = get_network().isochrone_engine(minutes_profile.format(emergency_type), period, include_transit)
+    result = engine.isochrones(origin, budgets, hull)
+    return {
+        "origin": origin,
+        "times": {nid: round(t, 2) for nid, t in result["times"].items()},
+        "isochrones": result["isochrones"],
+    }
+
 def path_to_edges(path: List[str]) -> List[Dict[str, str]]:
     """Convert a path list to edge list format."""
     return [{"from": path[i], "to": path[i + 1]} for i in range(len(path) - 1)]
@@ -65,9 +264,9 @@ def calculate_total_time(path: List[str], graph: nx.Graph) -> float:
     return round(total_time, 2)
 
 def get_graph():
-    """Returns the default global graph."""
-    return G_global
+    """Returns the default road graph of the shared network snapshot."""
+    return get_network().road_network()
 
-def get_transport_network():
-    """Returns the default global transportation network."""
-    return tn_global
+def get_transport_network() -> TransportationNetwork:
+    """Returns the shared transportation network."""
+    return get_network()
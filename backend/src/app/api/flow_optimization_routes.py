@@ -1,7 +1,22 @@
 from flask import Blueprint, request, jsonify
+from ..algorithm.alternatives import parse_alternatives
+from ..algorithm.search import HEURISTICS
+from ..algorithm.time_dependent import parse_clock
+from ..graph.weights import EMERGENCY_PRIORITY
 from .flow_optimization import (
     find_astar_route,
     find_dijkstra_route,
+    find_route_totals,
+    find_alternative_routes,
+    find_timed_route,
+    find_batch_routes,
+    compute_table,
+    compute_isochrones,
+    MAX_BATCH_PAIRS,
+    MAX_TABLE_CELLS,
+    MAX_ISOCHRONE_BUDGETS,
+    ISOCHRONE_PROFILES,
+    TABLE_PROFILES,
     path_to_edges,
     calculate_total_distance,
     calculate_total_time
@@ -14,19 +29,35 @@ def astar_route():
     origin = request.args.get('origin')
     dest = request.args.get('dest')
     period = request.args.get('period')
+    heuristic = request.args.get('heuristic')
     if not origin or not dest:
         return jsonify({"error": "Missing origin or destination"}), 400
+    if heuristic and heuristic not in HEURISTICS:
+        return jsonify({"error": f"Unknown heuristic: {heuristic}"}), 400
     try:
-        path, graph = find_astar_route(origin, dest, period)
+        alternatives = parse_alternatives(request.args.get('alternatives'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Alternatives always come from the via-node search, which takes no heuristic
+    if heuristic and alternatives:
+        return jsonify({"error": "heuristic cannot be combined with alternatives"}), 400
+    try:
+        # With alternatives the route comes from the same search trees as the alternatives
+        if alternatives:
+            path, graph, others = find_alternative_routes(origin, dest, period, alternatives)
+        else:
+            path, graph = find_astar_route(origin, dest, period, heuristic)
         edges = path_to_edges(path)
         total_distance = calculate_total_distance(path, graph)
         total_time = calculate_total_time(path, graph)
-        
-        return jsonify({
+        result = {
             "edges": edges, 
             "total_distance": total_distance,
             "total_time": total_time
-        })
+        }
+        if alternatives:
+            result["alternatives"] = others
+        return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -38,15 +69,124 @@ def dijkstra_route():
     if not origin or not dest:
         return jsonify({"error": "Missing origin or destination"}), 400
     try:
-        path, graph = find_dijkstra_route(origin, dest, period)
+        alternatives = parse_alternatives(request.args.get('alternatives'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        # With alternatives the route comes from the same search trees as the alternatives
+        if alternatives:
+            path, graph, others = find_alternative_routes(origin, dest, period, alternatives)
+        else:
+            path, graph = find_dijkstra_route(origin, dest, period)
         edges = path_to_edges(path)
         total_distance = calculate_total_distance(path, graph)
         total_time = calculate_total_time(path, graph)
-        
-        return jsonify({
+        result = {
             "edges": edges, 
             "total_distance": total_distance,
             "total_time": total_time
+        }
+        if alternatives:
+            result["alternatives"] = others
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@flow_bp.route('/route/timed', methods=['GET'])
+def timed_route():
+    origin = request.args.get('origin')
+    dest = request.args.get('dest')
+    depart = request.args.get('depart')
+    astar = request.args.get('astar', '1') != '0'
+    if not origin or not dest or not depart:
+        return jsonify({"error": "Missing origin, destination or departure time"}), 400
+    try:
+        start = parse_clock(depart)
+    except ValueError:
+        return jsonify({"error": f"Invalid departure time: {depart}"}), 400
+    try:
+        return jsonify(find_timed_route(origin, dest, start, astar))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@flow_bp.route('/route/totals', methods=['GET'])
+def route_totals():
+    origin = request.args.get('origin')
+    dest = request.args.get('dest')
+    period = request.args.get('period')
+    if not origin or not dest:
+        return jsonify({"error": "Missing origin or destination"}), 400
+    try:
+        total_distance, total_time = find_route_totals(origin, dest, period)
+        return jsonify({
+            "total_distance": total_distance,
+            "total_time": total_time
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@flow_bp.route('/route/batch', methods=['POST'])
+def batch_route():
+    data = request.get_json(silent=True) or {}
+    period = data.get('period')
+    pairs = data.get('pairs')
+    if not isinstance(pairs, list) or not pairs:
+        return jsonify({"error": "Missing pairs"}), 400
+    if len(pairs) > MAX_BATCH_PAIRS:
+        return jsonify({"error": f"At most {MAX_BATCH_PAIRS} pairs per request"}), 400
+    if not all(isinstance(pair, dict) and pair.get('origin') and pair.get('dest') for pair in pairs):
+        return jsonify({"error": "Every pair needs an origin and a destination"}), 400
+    try:
+        routes = find_batch_routes([(str(pair['origin']), str(pair['dest'])) for pair in pairs], period)
+        return jsonify({"routes": routes})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@flow_bp.route('/table', methods=['POST'])
+def table():
+    data = request.get_json(silent=True) or {}
+    sources = data.get('sources')
+    destinations = data.get('destinations')
+    period = data.get('period')
+    profile = data.get('profile', 'road')
+    emergency_type = data.get('emergency_type', 'ambulance')
+    if not isinstance(sources, list) or not isinstance(destinations, list) or not sources or not destinations:
+        return jsonify({"error": "Missing sources or destinations"}), 400
+    if len(sources) * len(destinations) > MAX_TABLE_CELLS:
+        return jsonify({"error": f"At most {MAX_TABLE_CELLS} table cells per request"}), 400
+    if profile not in TABLE_PROFILES:
+        return jsonify({"error": f"Unknown profile: {profile}"}), 400
+    if profile == 'emergency' and emergency_type not in EMERGENCY_PRIORITY:
+        return jsonify({"error": f"Unknown emergency type: {emergency_type}"}), 400
+    try:
+        result = compute_table([str(nid) for nid in sources], [str(nid) for nid in destinations],
+                               period, profile, emergency_type)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@flow_bp.route('/isochrone', methods=['GET'])
+def isochrone():
+    origin = request.args.get('origin')
+    period = request.args.get('period')
+    profile = request.args.get('profile', 'road')
+    emergency_type = request.args.get('emergency_type', 'ambulance')
+    hull = request.args.get('hull', '0') != '0'
+    if not origin or not request.args.get('budgets'):
+        return jsonify({"error": "Missing origin or budgets"}), 400
+    try:
+        budgets = [float(b) for b in request.args['budgets'].split(',')]
+    except ValueError:
+        return jsonify({"error": f"Invalid budgets: {request.args['budgets']}"}), 400
+    if len(budgets) > MAX_ISOCHRONE_BUDGETS:
+        return jsonify({"error": f"At most {MAX_ISOCHRONE_BUDGETS} budgets per request"}), 400
+    if not all(0 <= b < float('inf') for b in budgets):
+        return jsonify({"error": "Budgets must be non-negative minutes"}), 400
+    if profile not in ISOCHRONE_PROFILES:
+        return jsonify({"error": f"Unknown profile: {profile}"}), 400
+    if profile == 'emergency' and emergency_type not in EMERGENCY_PRIORITY:
+        return jsonify({"error": f"Unknown emergency type: {emergency_type}"}), 400
+    try:
+        return jsonify(compute_isochrones(origin, budgets, period, profile, emergency_type, hull))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
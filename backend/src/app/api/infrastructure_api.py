@@ -8,7 +8,7 @@ class InfrastructurePlanner:
     def __init__(self, tn: TransportationNetwork, period: str = "morning"):
         self.tn = tn
         self.period = period
-        self.G = tn.build_combined_road_network(period=period)
+        self.G = tn.combined_road_network(period=period)
         self.mst = self._build_mst()
 
     def _build_mst(self) -> nx.Graph:
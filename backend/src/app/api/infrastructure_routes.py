@@ -1,13 +1,12 @@
 # routes.py
 from flask import Blueprint, jsonify, request
 from .infrastructure_api import InfrastructurePlanner
-from ..graph.networks import TransportationNetwork
+from ..graph.snapshot import get_network
 
 planner_bp = Blueprint("planner", __name__)
 
 def load_planner(period: str = "morning"):
-    tn = TransportationNetwork.from_json_folder("data")
-    return InfrastructurePlanner(tn, period=period)
+    return InfrastructurePlanner(get_network(), period=period)
 
 @planner_bp.route("/", methods=["GET"])
 def default_morning():
@@ -0,0 +1,41 @@
+import hmac
+
+from flask import Blueprint, current_app, request, jsonify
+from ..graph.snapshot import get_snapshot, registry
+
+network_bp = Blueprint('network', __name__)
+
+
+@network_bp.route('/snapshot', methods=['GET'])
+def snapshot_status():
+    """Return the version and content hash of the network snapshot in use."""
+    return jsonify(get_snapshot().to_dict())
+
+
+@network_bp.route('/reload', methods=['POST'])
+def reload_snapshot():
+    """
+    Rebuild the network snapshot from the data folder and swap it in.
+    ?async=1 returns immediately and reloads in the background; ?force=1 reloads even if nothing changed.
+    Disabled unless NETWORK_RELOAD_TOKEN is configured; callers send it as X-Reload-Token.
+    """
+    token = current_app.config.get("NETWORK_RELOAD_TOKEN")
+    if not token:
+        return jsonify({"error": "Reloading over HTTP is disabled"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Reload-Token", "").encode(), str(token).encode()):
+        return jsonify({"error": "Invalid reload token"}), 403
+
+    force = request.args.get('force', '0').lower() in ('1', 'true', 'yes')
+    if request.args.get('async', '0').lower() in ('1', 'true', 'yes'):
+        registry.reload_async(force=force)
+        return jsonify({"reloading": True, "current": get_snapshot().to_dict()}), 202
+
+    try:
+        previous = get_snapshot()
+        snapshot = registry.reload(force=force)
+        return jsonify({
+            "reloaded": snapshot.version != previous.version,
+            "current": snapshot.to_dict()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
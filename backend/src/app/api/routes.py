@@ -23,7 +23,7 @@ from utils.data_formatting import (
     get_bus_routes_json, get_population_density_map
 )
 from utils.visualization import get_graph_image_base64
-from services.pathfinding import find_shortest_path, compute_travel_time, emergency_route_astar, multimodal_route
+from services.pathfinding import find_shortest_path, compute_travel_time, emergency_route_astar, multimodal_route, multimodal_options
 from services.analysis import analyze_traffic_congestion, suggest_public_transport_improvements, get_network_statistics
 from services.optimization import optimize_road_network_with_mst, optimize_bus_routes_dp, optimize_metro_schedule_dp
 
@@ -215,6 +215,31 @@ def register_routes(app, graph):
             start_id = int(start_id)
         if isinstance(end_id, str) and end_id.isdigit():
             end_id = int(end_id)
+        
+        if data.get('pareto'):
+            # Trade-off options (fastest, fewest transfers, least road distance) from one search
+            options_result = multimodal_options(graph, start_id, end_id, time_of_day, max_transfers)
+            if not options_result.get('success', False):
+                return jsonify({
+                    'success': False,
+                    'message': options_result.get('message', 'No multimodal route found between these locations'),
+                    'details': options_result.get('details', ''),
+                    'max_transfers_exceeded': options_result.get('max_transfers_exceeded', False)
+                })
+            return jsonify({
+                'success': True,
+                'options': [{
+                    'path': option['path'],
+                    'path_names': option['path_names'],
+                    'distance': option['total_distance_km'],
+                    'road_distance': option['road_distance_km'],
+                    'time': option['total_time_minutes'],
+                    'transfers': option['transfers'],
+                    'route_summary': option['route_summary'],
+                    'edges': [f"{option['path'][i]}_{option['path'][i+1]}"
+                              for i in range(len(option['path'])-1)]
+                } for option in options_result['options']]
+            })
             
         multimodal_result = multimodal_route(
             graph, start_id, end_id, time_of_day, preferred_modes, max_transfers
@@ -239,7 +264,8 @@ def register_routes(app, graph):
             return jsonify({
                 'success': False,
                 'message': multimodal_result.get('message', 'No multimodal route found between these locations'),
-                'details': multimodal_result.get('details', '')
+                'details': multimodal_result.get('details', ''),
+                'max_transfers_exceeded': multimodal_result.get('max_transfers_exceeded', False)
             })
             
     @app.route('/api/optimize_road_network')
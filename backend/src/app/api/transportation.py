@@ -1,114 +1,140 @@
+import threading
 import networkx as nx
-from typing import List, Dict, Tuple
-from app.graph.networks import TransportationNetwork
-
-# Global objects initialized once
-tn = TransportationNetwork.from_json_folder('data')
-G = tn.build_public_transport_network()
-NODES = tn.nodes
+from typing import Dict
+from app.algorithm.time_dependent import PERIOD_CLOCK, format_clock
+from app.graph.snapshot import TRANSIT_FILES, NetworkSnapshot, get_snapshot
 
 # Memoization table to store computed routes
-# Structure: {(origin_id, dest_id): {"path": [...], "itinerary": [...], "total_time": float, "total_distance": float}}
+# Structure: {(origin_id, dest_id, departure): {"steps": [...], "departure": "HH:MM", "arrival": "HH:MM", ...}}
 ROUTE_CACHE = {}
 
-def calculate_metrics(G: nx.DiGraph, path: List[str]) -> Tuple[float, float]:
-    """Calculate total time (minutes) and distance (km) for a given path."""
-    total_time = 0.0
-    total_distance = 0.0
-    
-    for u, v in zip(path[:-1], path[1:]):
-        data = G[u][v]
-        # Default values based on transportation mode if exact values not available
-        mode = data["mode"]
-        
-        # Estimated time and distance factors by mode of transport
-        time_factor = {"walk": 5, "bus": 2, "metro": 1.5, "tram": 2}.get(mode, 3)
-        distance_factor = {"walk": 0.5, "bus": 1, "metro": 1.5, "tram": 1}.get(mode, 1)
-        
-        # Use actual values if available, otherwise estimate
-        edge_distance = data.get("distance", distance_factor)
-        edge_time = data.get("time", edge_distance * time_factor)
-        
-        total_time += edge_time
-        total_distance += edge_distance
-    
-    return total_time, total_distance
+# Departure (minutes after midnight) of itineraries requested without one: the morning peak
+DEFAULT_DEPARTURE = float(PERIOD_CLOCK['morning'])
 
-def summarise_path(G: nx.DiGraph, path: List[str]) -> List[Dict]:
-    legs = []
-    cur_mode, cur_route, segment = None, None, [path[0]]
+# Public-transport graph of the current snapshot, rebuilt only when the snapshot version changes.
+# "fingerprint" covers the transit files only, so a reload of traffic or road data keeps ROUTE_CACHE warm.
+_TRANSIT_GRAPH = {"version": None, "fingerprint": None, "graph": None}
+_TRANSIT_LOCK = threading.Lock()
 
-    for u, v in zip(path[:-1], path[1:]):
-        data = G[u][v]
-        mode, route = data["mode"], data["route"]
-        if (mode, route) != (cur_mode, cur_route):
-            if cur_mode is not None:
-                legs.append({"mode": cur_mode, "route": cur_route, "nodes": segment})
-            cur_mode, cur_route, segment = mode, route, [u]
-        segment.append(v)
-    legs.append({"mode": cur_mode, "route": cur_route, "nodes": segment})
-    return legs
 
+def get_public_transport_graph(snapshot: NetworkSnapshot = None) -> nx.DiGraph:
+    """Return the public-transport graph of snapshot (default: the current shared snapshot)."""
+    snapshot = snapshot or get_snapshot()
+    if _TRANSIT_GRAPH["version"] != snapshot.version:
+        with _TRANSIT_LOCK:
+            if (_TRANSIT_GRAPH["version"] or 0) > snapshot.version:
+                # Request that started before a reload: serve its own (memoized) graph
+                return snapshot.network.public_transport_network()
+            if _TRANSIT_GRAPH["version"] != snapshot.version:
+                fingerprint = snapshot.fingerprint(TRANSIT_FILES)
+                if _TRANSIT_GRAPH["fingerprint"] != fingerprint:
+                    # Cached itineraries belong to a different transit network
+                    ROUTE_CACHE.clear()
+                _TRANSIT_GRAPH["graph"] = snapshot.network.public_transport_network()
+                _TRANSIT_GRAPH["fingerprint"] = fingerprint
+                _TRANSIT_GRAPH["version"] = snapshot.version
+    return _TRANSIT_GRAPH["graph"]
 
-def name(nid: str) -> str:
-    return NODES[nid]["name"]
+def name(nid: str, nodes: Dict = None) -> str:
+    nodes = nodes if nodes is not None else get_snapshot().network.nodes
+    return nodes[nid]["name"]
 
 
-def get_itinerary(origin: str, dest: str) -> Dict:
+def get_itinerary(origin: str, dest: str, depart: float = DEFAULT_DEPARTURE) -> Dict:
     """
-    Get the itinerary between origin and destination using dynamic programming (memoization).
-    If the route has been computed before, retrieve it from the cache.
-    Otherwise, compute it and store in the cache for future use.
+    Get the itinerary between origin and destination leaving at depart (minutes after
+    midnight): the RAPTOR journey that arrives first, with the fewest trips among those
+    arriving then. Itineraries are memoized per (origin, destination, departure).
     """
+    # Bind one snapshot for the whole request so a concurrent reload cannot mix data
+    snapshot = get_snapshot()
+    G = get_public_transport_graph(snapshot)
+    nodes = snapshot.network.nodes
     if origin not in G or dest not in G:
         raise ValueError("Origin or destination not in the graph.")
     
     # Check if the route is already in the cache
-    cache_key = (origin, dest)
+    cache_key = (origin, dest, depart)
     if cache_key in ROUTE_CACHE:
         cached_result = ROUTE_CACHE[cache_key]
         return {
-            "origin": name(origin),
-            "destination": name(dest),
-            "steps": cached_result["steps"],
-            "total_time": cached_result["total_time"],
-            "total_distance": cached_result["total_distance"]
+            "origin": name(origin, nodes),
+            "destination": name(dest, nodes),
+            **cached_result
         }
     
     # If not in cache, compute the route
-    path = nx.shortest_path(G, origin, dest)
-    legs = summarise_path(G, path)
-    total_time, total_distance = calculate_metrics(G, path)
+    router = snapshot.network.transit_router()
+    journey = router.journey(origin, dest, depart)
+    if journey is None:
+        raise nx.NetworkXNoPath(f"No transit journey from {origin} to {dest}")
+    cached_result = format_journey(journey, router.timetable, nodes)
     
-    # Format itinerary
+    # Cache the computed result
+    ROUTE_CACHE[cache_key] = cached_result
+    
+    return {
+        "origin": name(origin, nodes),
+        "destination": name(dest, nodes),
+        **cached_result
+    }
+
+
+def get_itinerary_options(origin: str, dest: str, depart: float = DEFAULT_DEPARTURE) -> Dict:
+    """
+    Get the Pareto-optimal itineraries between origin and destination leaving at depart:
+    from the fewest trips to the earliest arrival, each option arriving strictly earlier
+    than the one before it. One RAPTOR search yields all of them.
+    """
+    snapshot = get_snapshot()
+    G = get_public_transport_graph(snapshot)
+    nodes = snapshot.network.nodes
+    if origin not in G or dest not in G:
+        raise ValueError("Origin or destination not in the graph.")
+    
+    cache_key = (origin, dest, depart, "options")
+    if cache_key not in ROUTE_CACHE:
+        router = snapshot.network.transit_router()
+        journeys = router.pareto(origin, dest, depart)
+        if not journeys:
+            raise nx.NetworkXNoPath(f"No transit journey from {origin} to {dest}")
+        ROUTE_CACHE[cache_key] = {
+            "options": [format_journey(journey, router.timetable, nodes) for journey in journeys]
+        }
+    
+    return {
+        "origin": name(origin, nodes),
+        "destination": name(dest, nodes),
+        **ROUTE_CACHE[cache_key]
+    }
+
+
+def format_journey(journey, timetable, nodes: Dict) -> Dict:
+    """Steps and totals of a RAPTOR journey, as returned by get_itinerary()."""
     itinerary = []
-    for leg in legs:
-        start, end = leg["nodes"][0], leg["nodes"][-1]
-        hops = len(leg["nodes"]) - 1
+    total_distance = 0.0
+    for leg in journey.legs:
+        route = timetable.routes[leg.route]
+        path = [timetable.stop_ids[stop] for stop in route.stops[leg.board:leg.alight + 1]]
+        total_distance += route.km[leg.alight] - route.km[leg.board]
         leg_info = {
-            "mode": leg["mode"],
-            "route": leg["route"],
-            "start": name(start),
-            "end": name(end),
-            "stops": hops,
-            "path": leg["nodes"]
+            "mode": route.mode,
+            "route": route.route_id,
+            "start": name(path[0], nodes),
+            "end": name(path[-1], nodes),
+            "stops": len(path) - 1,
+            "path": path,
+            "depart": format_clock(timetable.departure(leg.route, leg.board, leg.trip)),
+            "arrive": format_clock(timetable.departure(leg.route, leg.alight, leg.trip))
         }
         itinerary.append(leg_info)
     
-    # Create the complete result including total time and distance
-    result = {
-        "origin": name(origin),
-        "destination": name(dest),
+    # Total time runs from the requested departure, so it includes every wait
+    return {
         "steps": itinerary,
-        "total_time": round(total_time, 2),
+        "departure": format_clock(journey.departure),
+        "arrival": format_clock(journey.arrival),
+        "transfers": max(0, len(itinerary) - 1),
+        "total_time": round(journey.arrival - journey.departure, 2),
         "total_distance": round(total_distance, 2)
     }
-    
-    # Cache the computed result
-    ROUTE_CACHE[cache_key] = {
-        "steps": itinerary,
-        "total_time": result["total_time"],
-        "total_distance": result["total_distance"]
-    }
-    
-    return result
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from .transportation import get_itinerary, ROUTE_CACHE
+from ..algorithm.time_dependent import parse_clock
+from .transportation import get_itinerary, get_itinerary_options, ROUTE_CACHE, DEFAULT_DEPARTURE
 
 transportation_bp = Blueprint('transportation_bp', __name__)
 
@@ -9,11 +10,23 @@ def itinerary():
     origin = request.args.get('origin')
     dest = request.args.get('dest')
 
+    depart = request.args.get('depart')
+    options = request.args.get('options', 'best')
+
     if not origin or not dest:
         return jsonify({"error": "Missing origin or destination"}), 400
+    try:
+        start = parse_clock(depart) if depart else DEFAULT_DEPARTURE
+    except ValueError:
+        return jsonify({"error": f"Invalid departure time: {depart}"}), 400
+    if options not in ('best', 'pareto'):
+        return jsonify({"error": f"Invalid options: {options} (use 'best' or 'pareto')"}), 400
 
     try:
-        result = get_itinerary(origin, dest)
+        if options == 'pareto':
+            result = get_itinerary_options(origin, dest, start)
+        else:
+            result = get_itinerary(origin, dest, start)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -31,7 +44,8 @@ def cache_status():
 @transportation_bp.route('/cache/precompute', methods=['POST'])
 def precompute_routes():
     """Precompute routes between important nodes."""
-    from .transportation import G
+    from .transportation import get_public_transport_graph
+    G = get_public_transport_graph()
 
 # Find important nodes (hubs with many connections)
     important_nodes = [node for node in G.nodes() if G.degree(node) > 2][:20]
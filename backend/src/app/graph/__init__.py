@@ -3,4 +3,6 @@ Graph module for transportation networks.
 Provides graph-based representation and analysis capabilities.
 """
 
-from .networks import TransportationNetwork
\ No newline at end of file
+from .networks import TransportationNetwork
+from .snapshot import (NetworkSnapshot, SnapshotRegistry, SnapshotWatcher, get_network, get_snapshot,
+                       init_network, reload_network, watch_network)
\ No newline at end of file
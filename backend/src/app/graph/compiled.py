@@ -0,0 +1,478 @@
+"""
+Compact array-backed (CSR) representation of road and transit networks.
+Node IDs are interned to dense integers and edge attributes live in
+parallel NumPy arrays, so searches index arrays instead of walking
+networkx dict-of-dicts.
+"""
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .networks import PERIODS
+
+# Edge modes stored in CompiledGraph.mode
+ROAD, BUS, METRO = 0, 1, 2
+MODES = ('road', 'bus', 'metro')
+
+
+def haversine_km(x1: float, y1: float, x2: float, y2: float) -> float:
+    """Great-circle distance in km between two (lon=x, lat=y) points."""
+    phi1, phi2 = math.radians(y1), math.radians(y2)
+    dphi = math.radians(y2 - y1)
+    dlambda = math.radians(x2 - x1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+class NodeIndex:
+    """
+    Interns hashable node IDs ("3", "F1", 7) to dense integers 0..N-1.
+    """
+
+    __slots__ = ('ids', '_index')
+
+    def __init__(self, ids: Iterable[Hashable] = ()):
+        self.ids: List[Hashable] = []
+        self._index: Dict[Hashable, int] = {}
+        for nid in ids:
+            self.intern(nid)
+
+    def intern(self, nid: Hashable) -> int:
+        """Return the integer of nid, assigning the next free one if it is new."""
+        idx = self._index.get(nid)
+        if idx is None:
+            idx = len(self.ids)
+            self._index[nid] = idx
+            self.ids.append(nid)
+        return idx
+
+    def get(self, nid: Hashable, default: int = -1) -> int:
+        return self._index.get(nid, default)
+
+    def __getitem__(self, nid: Hashable) -> int:
+        return self._index[nid]
+
+    def __contains__(self, nid: Hashable) -> bool:
+        return nid in self._index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def id_of(self, idx: int) -> Hashable:
+        return self.ids[idx]
+
+
+class CompiledGraph:
+    """
+    Undirected multigraph stored in compressed sparse row (CSR) form.
+
+    Edges are numbered 0..E-1 and their attributes are parallel arrays:
+    dist_km, capacity, condition, mode, route, potential and flow (E x periods).
+    Each edge is stored as two arcs; for node i the arcs are
+    offsets[i]:offsets[i+1] in targets (neighbour) and arc_edge (edge id).
+    """
+
+    def __init__(
+        self,
+        nodes: NodeIndex,
+        edge_u: np.ndarray,
+        edge_v: np.ndarray,
+        dist_km: np.ndarray,
+        capacity: np.ndarray,
+        condition: np.ndarray,
+        flow: np.ndarray,
+        has_flow: np.ndarray,
+        mode: Optional[np.ndarray] = None,
+        route: Optional[np.ndarray] = None,
+        route_ids: Sequence[str] = (),
+        potential: Optional[np.ndarray] = None,
+        periods: Sequence[str] = PERIODS,
+    ):
+        num_edges = len(edge_u)
+        self.nodes = nodes
+        self.periods = tuple(periods)
+        self.edge_u = np.asarray(edge_u, dtype=np.int32)
+        self.edge_v = np.asarray(edge_v, dtype=np.int32)
+        self.dist_km = np.asarray(dist_km, dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.float32)
+        self.condition = np.asarray(condition, dtype=np.float32)
+        self.flow = np.asarray(flow, dtype=np.float32).reshape(num_edges, len(self.periods))
+        self.has_flow = np.asarray(has_flow, dtype=bool)
+        self.mode = np.zeros(num_edges, dtype=np.int8) if mode is None else np.asarray(mode, dtype=np.int8)
+        self.route = np.full(num_edges, -1, dtype=np.int32) if route is None else np.asarray(route, dtype=np.int32)
+        self.route_ids = tuple(route_ids)
+        self.potential = np.zeros(num_edges, dtype=bool) if potential is None else np.asarray(potential, dtype=bool)
+        self._build_csr()
+
+    def _build_csr(self) -> None:
+        num_nodes = len(self.nodes)
+        num_edges = len(self.edge_u)
+        src = np.concatenate((self.edge_u, self.edge_v))
+        dst = np.concatenate((self.edge_v, self.edge_u))
+        eid = np.concatenate((np.arange(num_edges, dtype=np.int32),) * 2)
+        order = np.argsort(src, kind='stable')
+        self.targets = dst[order].astype(np.int32)
+        self.arc_edge = eid[order].astype(np.int32)
+        self.offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=self.offsets[1:])
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_edge_records(
+        cls,
+        nodes: NodeIndex,
+        records: Iterable[Tuple],
+        route_ids: Sequence[str] = (),
+        periods: Sequence[str] = PERIODS,
+    ) -> 'CompiledGraph':
+        """
+        Build from (u, v, dist_km, capacity, condition, flows, mode, route, potential)
+        records, where u/v are already interned and flows is a per-period
+        sequence or None. Like nx.Graph, a repeated (u, v) pair of the same mode
+        and route keeps the last record.
+        """
+        latest: Dict[Tuple[int, int, int, int], Tuple] = {}
+        for rec in records:
+            u, v = rec[0], rec[1]
+            key = (min(u, v), max(u, v), rec[6], rec[7])
+            latest.pop(key, None)
+            latest[key] = rec
+        rows = list(latest.values())
+        num_edges = len(rows)
+        flow = np.zeros((num_edges, len(periods)), dtype=np.float32)
+        has_flow = np.zeros(num_edges, dtype=bool)
+        for i, rec in enumerate(rows):
+            if rec[5] is not None:
+                flow[i] = rec[5]
+                has_flow[i] = True
+        column = lambda j, dtype: np.fromiter((rec[j] for rec in rows), dtype=dtype, count=num_edges)
+        return cls(
+            nodes,
+            column(0, np.int32), column(1, np.int32),
+            column(2, np.float64), column(3, np.float32), column(4, np.float32),
+            flow, has_flow,
+            mode=column(6, np.int8), route=column(7, np.int32),
+            route_ids=route_ids, potential=column(8, bool), periods=periods,
+        )
+
+    @classmethod
+    def from_edge_columns(
+        cls,
+        nodes: NodeIndex,
+        edge_u: np.ndarray,
+        edge_v: np.ndarray,
+        dist_km: np.ndarray,
+        capacity: np.ndarray,
+        condition: np.ndarray,
+        flow: np.ndarray,
+        has_flow: np.ndarray,
+        potential: Optional[np.ndarray] = None,
+        periods: Sequence[str] = PERIODS,
+    ) -> 'CompiledGraph':
+        """
+        Build a road graph from parallel edge columns, e.g. buffers filled while
+        streaming a data file. Repeated (u, v) pairs are dropped as in from_edge_records().
+        """
+        edge_u = np.asarray(edge_u, dtype=np.int32)
+        edge_v = np.asarray(edge_v, dtype=np.int32)
+        num_edges = len(edge_u)
+        key = np.stack((np.minimum(edge_u, edge_v), np.maximum(edge_u, edge_v)), axis=1)
+        # First occurrence in the reversed columns = last record of each pair
+        _, first = np.unique(key[::-1], axis=0, return_index=True)
+        keep = np.sort(num_edges - 1 - first)
+        flow = np.asarray(flow, dtype=np.float32).reshape(num_edges, len(periods))
+        if potential is None:
+            potential = np.zeros(num_edges, dtype=bool)
+        return cls(
+            nodes, edge_u[keep], edge_v[keep],
+            np.asarray(dist_km)[keep], np.asarray(capacity)[keep], np.asarray(condition)[keep],
+            flow[keep], np.asarray(has_flow)[keep],
+            potential=np.asarray(potential)[keep], periods=periods,
+        )
+
+    @classmethod
+    def from_network(cls, tn, include_potential: bool = False, include_transit: bool = False) -> 'CompiledGraph':
+        """
+        Compile a TransportationNetwork.
+
+        Road edges mirror build_road_network(); potential roads mirror
+        build_combined_road_network(). Transit edges take the great-circle
+        distance between consecutive stops.
+        """
+        nodes = NodeIndex(tn.nodes.keys())
+        records = []
+        for r in tn.roads:
+            u, v = r['from'], r['to']
+            rec = tn.flow.get((u, v))
+            flows = None if rec is None else [rec.get(p, 0) for p in PERIODS]
+            records.append((nodes.intern(u), nodes.intern(v), r['dist_km'], r['cap'], r['cond'],
+                            flows, ROAD, -1, False))
+        if include_potential:
+            potential_roads = tn.potential_roads
+            if potential_roads is None:
+                potential_roads = tn._load_bundled_potential_roads()
+            for r in potential_roads:
+                records.append((nodes.intern(r['from']), nodes.intern(r['to']), r['dist_km'], r['cap'],
+                                r['cond'], None, ROAD, -1, True))
+        route_ids: List[str] = []
+        if include_transit:
+            table = tn.node_table
+            for mode, lines, stops_key in ((BUS, tn.bus_routes, 'stops'), (METRO, tn.metro_lines, 'stations')):
+                for line in lines:
+                    route_idx = len(route_ids)
+                    route_ids.append(line['id'])
+                    if mode == BUS:
+                        capacity, condition = line.get('buses', 0) * 50, 8
+                    else:
+                        capacity, condition = 3000, 10
+                    for a, b in zip(line[stops_key], line[stops_key][1:]):
+                        ra, rb = table.row(a), table.row(b)
+                        if ra < 0 or rb < 0:
+                            continue
+                        dist = haversine_km(table.x[ra], table.y[ra], table.x[rb], table.y[rb])
+                        records.append((nodes.intern(a), nodes.intern(b), dist, capacity, condition,
+                                        None, mode, route_idx, False))
+        return cls.from_edge_records(nodes, records, route_ids)
+
+    @classmethod
+    def from_cairo_graph(cls, graph, include_potential: bool = False, include_transit: bool = True) -> 'CompiledGraph':
+        """
+        Compile a CairoTransportationGraph.
+
+        Road attributes mirror build_networkx_graph(); traffic volumes come
+        from graph.traffic_data. Transit edges use the straight-line distance
+        between consecutive stops, as _add_metro_connections() does.
+        """
+        nodes = NodeIndex(graph.nodes.keys())
+        records = []
+
+        def traffic_for(u, v):
+            rec = graph.traffic_data.get((u, v))
+            if rec is None:
+                rec = graph.traffic_data.get((str(u), str(v)))
+            return None if rec is None else [rec.get(p, 0) for p in PERIODS]
+
+        for from_id, to_id, distance, capacity, condition in graph.existing_roads:
+            if from_id not in nodes or to_id not in nodes:
+                continue
+            records.append((nodes[from_id], nodes[to_id], distance, capacity, condition,
+                            traffic_for(from_id, to_id), ROAD, -1, False))
+        if include_potential:
+            for from_id, to_id, distance, capacity, _cost in graph.potential_roads:
+                if from_id not in nodes or to_id not in nodes:
+                    continue
+                records.append((nodes[from_id], nodes[to_id], distance, capacity, np.nan,
+                                None, ROAD, -1, True))
+        route_ids: List[str] = []
+        if include_transit:
+            lines = [(METRO, line_id, stations, 3000, 10) for line_id, _name, stations, _p in graph.metro_lines]
+            lines += [(BUS, route_id, stops, buses * 50, 8) for route_id, stops, buses, _p in graph.bus_routes]
+            for mode, line_id, stops_str, capacity, condition in lines:
+                route_idx = len(route_ids)
+                route_ids.append(line_id)
+                stops = stops_str.replace('"', '').split(',')
+                for a, b in zip(stops, stops[1:]):
+                    if a not in nodes or b not in nodes:
+                        continue
+                    try:
+                        x1, y1 = graph.nodes[a]['x'], graph.nodes[a]['y']
+                        x2, y2 = graph.nodes[b]['x'], graph.nodes[b]['y']
+                        distance = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+                    except (KeyError, TypeError):
+                        distance = 5.0 if mode == METRO else 4.0
+                    records.append((nodes[a], nodes[b], distance, capacity, condition,
+                                    None, mode, route_idx, False))
+        return cls.from_edge_records(nodes, records, route_ids)
+
+    # Names of the arrays that fully describe a compiled graph
+    ARRAY_FIELDS = ('edge_u', 'edge_v', 'dist_km', 'capacity', 'condition', 'flow', 'has_flow',
+                    'mode', 'route', 'potential', 'offsets', 'targets', 'arc_edge')
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays of the graph keyed by ARRAY_FIELDS, for serialisation."""
+        return {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+
+    @classmethod
+    def from_arrays(cls, nodes: NodeIndex, arrays: Dict[str, np.ndarray],
+                    route_ids: Sequence[str] = (), periods: Sequence[str] = PERIODS) -> 'CompiledGraph':
+        """
+        Wrap previously compiled arrays (e.g. memory-mapped from a snapshot file)
+        without copying them or rebuilding the CSR index.
+        """
+        graph = cls.__new__(cls)
+        graph.nodes = nodes
+        graph.periods = tuple(periods)
+        graph.route_ids = tuple(route_ids)
+        for name in cls.ARRAY_FIELDS:
+            setattr(graph, name, arrays[name])
+        return graph
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_u)
+
+    def period_index(self, period: Optional[str]) -> int:
+        """Column of period in flow, or -1 for periods without traffic data."""
+        try:
+            return self.periods.index(period)
+        except ValueError:
+            return -1
+
+    def arcs(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbour, edge id) arrays of the arcs leaving node."""
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return self.targets[start:end], self.arc_edge[start:end]
+
+    def degree(self, node: int) -> int:
+        return int(self.offsets[node + 1] - self.offsets[node])
+
+    def edge_between(self, u: int, v: int) -> int:
+        """Id of an edge joining u and v, or -1 if there is none."""
+        targets, edges = self.arcs(u)
+        hits = np.flatnonzero(targets == v)
+        return int(edges[hits[-1]]) if len(hits) else -1
+
+    def adjacency(self, weights: Optional[np.ndarray] = None) -> Tuple[List[int], List[int], List[float]]:
+        """
+        (offsets, neighbours, arc weights) as plain lists for pure-Python searches.
+        weights is an array over edge ids and defaults to dist_km.
+        """
+        weights = self.dist_km if weights is None else weights
+        return self.offsets.tolist(), self.targets.tolist(), weights[self.arc_edge].tolist()
+
+    def path_edges(self, path: Sequence[int]) -> List[int]:
+        """Edge ids along a path of node integers."""
+        return [self.edge_between(u, v) for u, v in zip(path[:-1], path[1:])]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the array payload, excluding the node ID table."""
+        arrays = (self.edge_u, self.edge_v, self.dist_km, self.capacity, self.condition, self.flow,
+                  self.has_flow, self.mode, self.route, self.potential, self.targets, self.arc_edge,
+                  self.offsets)
+        return sum(a.nbytes for a in arrays)
+
+    def __repr__(self) -> str:
+        return f"CompiledGraph(nodes={self.num_nodes}, edges={self.num_edges})"
+
+
+def multi_target_distances(adjacency: Tuple[List[int], List[int], List[float]], source: int,
+                           targets: Iterable[int], cutoff: float = math.inf) -> Dict[int, float]:
+    """
+    Dijkstra from source over an adjacency() triple that stops as soon as every
+    target is settled or the frontier passes cutoff. Unreached targets are left out.
+    """
+    offsets, heads, weights = adjacency
+    remaining = set(targets)
+    found: Dict[int, float] = {}
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > cutoff:
+            break
+        if u in remaining:
+            remaining.discard(u)
+            found[u] = d
+        for k in range(offsets[u], offsets[u + 1]):
+            v = heads[k]
+            nd = d + weights[k]
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return found
+
+
+def nearest_sources(adjacency: Tuple[List[int], List[int], List[float]], sources: Iterable[int],
+                    target: int, k: int = 1, cutoff: float = math.inf) -> List[Tuple[float, List[int]]]:
+    """
+    The k sources closest to target over an adjacency() triple, nearest first, as
+    (distance, path from the source to target). One Dijkstra is seeded with every
+    source at once; each node keeps the labels of at most k distinct sources, and the
+    search stops once target holds k of them or the frontier passes cutoff.
+    """
+    offsets, heads, weights = adjacency
+    # Settled labels: node and parent label, plus the label of each source settled at a node
+    label_node: List[int] = []
+    label_parent: List[int] = []
+    settled: Dict[int, Dict[int, int]] = {}
+    found: List[Tuple[float, int]] = []
+    heap = [(0.0, s, s, -1) for s in set(sources)]
+    heapq.heapify(heap)
+    while heap and len(found) < k:
+        d, u, s, parent = heapq.heappop(heap)
+        if d > cutoff:
+            break
+        here = settled.setdefault(u, {})
+        if s in here or len(here) >= k:
+            continue
+        label = here[s] = len(label_node)
+        label_node.append(u)
+        label_parent.append(parent)
+        if u == target:
+            found.append((d, label))
+            continue
+        for a in range(offsets[u], offsets[u + 1]):
+            v = heads[a]
+            there = settled.get(v)
+            if there is None or (s not in there and len(there) < k):
+                heapq.heappush(heap, (d + weights[a], v, s, label))
+    result = []
+    for d, label in found:
+        path = []
+        while label >= 0:
+            path.append(label_node[label])
+            label = label_parent[label]
+        result.append((d, path[::-1]))
+    return result
+
+
+class DistanceResolver:
+    """
+    Memoized shortest distances between pairs of node IDs of a CompiledGraph.
+    Pairs are batched by origin so each origin costs one bounded search,
+    however many destinations it has.
+    """
+
+    def __init__(self, graph: CompiledGraph, weights: Optional[np.ndarray] = None, cutoff: float = math.inf):
+        self.graph = graph
+        self.cutoff = cutoff
+        self._adjacency = graph.adjacency(weights)
+        self._cache: Dict[Tuple[Hashable, Hashable], Optional[float]] = {}
+
+    def distances(self, pairs: Iterable[Tuple[Hashable, Hashable]]) -> Dict[Tuple[Hashable, Hashable], Optional[float]]:
+        """Distance of every (origin, destination) pair; None if unreachable within cutoff."""
+        pairs = list(pairs)
+        nodes = self.graph.nodes
+        pending = defaultdict(set)
+        for a, b in pairs:
+            if (a, b) not in self._cache and (b, a) not in self._cache:
+                pending[a].add(b)
+        for a, dests in pending.items():
+            source = nodes.get(a)
+            wanted = {nodes.get(b) for b in dests} - {-1}
+            found = multi_target_distances(self._adjacency, source, wanted, self.cutoff) if source >= 0 else {}
+            for b in dests:
+                # The graph is undirected, so the reverse pair shares the result
+                self._cache[(a, b)] = found.get(nodes.get(b))
+        return {(a, b): self._cache[(a, b)] if (a, b) in self._cache else self._cache[(b, a)]
+                for a, b in pairs}
+
+    def distance(self, a: Hashable, b: Hashable) -> Optional[float]:
+        return self.distances([(a, b)])[(a, b)]
@@ -0,0 +1,124 @@
+"""
+Incremental reader for the JSON data files.
+Every data file is a top-level array of flat records; iter_json_array() yields
+the records one at a time from fixed-size reads, so peak memory is one chunk
+plus one record instead of the whole document and its parsed list.
+"""
+import json
+import re
+from typing import Any, Iterator
+
+# Characters read per chunk
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Characters that may legally follow an array element
+_TERMINATORS = frozenset(' \t\n\r,]')
+
+
+class _Buffer:
+    """Sliding text window over a file; consumed text is dropped as parsing advances."""
+
+    __slots__ = ('_file', '_chunk_size', 'text', 'pos', 'eof')
+
+    def __init__(self, f, chunk_size: int):
+        self._file = f
+        self._chunk_size = chunk_size
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read one more chunk; returns False at end of file."""
+        if self.eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of file)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+
+def iter_json_array(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of the top-level JSON array stored in path.
+    Raises ValueError if the file is not a well-formed array.
+    """
+    decode = json.JSONDecoder().raw_decode
+    skip = _WHITESPACE.match
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = _Buffer(f, chunk_size)
+        if buf.peek() != '[':
+            raise ValueError(f"{path}: expected a JSON array")
+        buf.pos += 1
+        if buf.peek() == ']':
+            buf.pos += 1
+            _expect_end(buf, path)
+            return
+
+        text, pos = buf.text, buf.pos
+        while True:
+            # Fast path: element and separator both lie inside the current chunk.
+            # An element only counts as complete once the character after it is
+            # visible, otherwise a number split across chunks would be cut short.
+            try:
+                value, end = decode(text, pos)
+                sep_pos = skip(text, end).end()
+                complete = sep_pos < len(text) and text[sep_pos] in ',]'
+            except json.JSONDecodeError:
+                complete = False
+            if not complete:
+                buf.pos = pos
+                value, end = _decode_across_chunks(buf, decode, path)
+                buf.pos = end
+                if buf.peek() == '':
+                    raise ValueError(f"{path}: expected ',' or ']' after array element, got 'end of file'")
+                text, sep_pos = buf.text, buf.pos
+            yield value
+
+            sep = text[sep_pos]
+            if sep == ',':
+                pos = skip(text, sep_pos + 1).end()
+                if pos == len(text):
+                    buf.pos = pos
+                    if buf.peek() == '':
+                        raise ValueError(f"{path}: unexpected end of file")
+                    text, pos = buf.text, buf.pos
+            elif sep == ']':
+                buf.pos = sep_pos + 1
+                _expect_end(buf, path)
+                return
+            else:
+                raise ValueError(f"{path}: expected ',' or ']' after array element, got {sep!r}")
+
+
+def _expect_end(buf: _Buffer, path: str) -> None:
+    """Raise ValueError unless only whitespace follows the closing bracket."""
+    char = buf.peek()
+    if char:
+        raise ValueError(f"{path}: extra data after the JSON array, got {char!r}")
+
+
+def _decode_across_chunks(buf: _Buffer, decode, path: str):
+    """Decode the element at buf.pos, reading more chunks until it is complete."""
+    while True:
+        try:
+            value, end = decode(buf.text, buf.pos)
+            if buf.eof or (end < len(buf.text) and buf.text[end] in _TERMINATORS):
+                return value, end
+        except json.JSONDecodeError as e:
+            if buf.eof:
+                raise ValueError(f"{path}: {e.msg}") from None
+        buf.fill()
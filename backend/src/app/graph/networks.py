@@ -4,8 +4,72 @@ Centralizes all network-related functionality in a dedicated graph module.
 """
 import os
 import json
+import threading
+from array import array
 import networkx as nx
-from typing import Dict, List, Tuple
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Traffic periods available in traffic_flow_patterns.json
+PERIODS = ('morning', 'afternoon', 'evening', 'night')
+
+# JSON files that make up a network data folder
+DATA_FILES = (
+    'neighbourhoods.json',
+    'important_facilities.json',
+    'bus_routes.json',
+    'current_metro_lines.json',
+    'roads_existing.json',
+    'roads_potential.json',
+    'traffic_flow_patterns.json',
+)
+
+
+def resolve_data_file(data_dir: str, fname: str) -> str:
+    """
+    Return the path of a data file, falling back to the bundled app/data
+    folder when it is missing from data_dir.
+    """
+    path = os.path.join(data_dir, fname)
+    if not os.path.exists(path):
+        # Try to find the file in the app/data directory
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        # Go up one level since we're now in the graph folder
+        app_dir = os.path.dirname(current_dir)
+        app_data_path = os.path.join(app_dir, 'data', fname)
+        if os.path.exists(app_data_path):
+            path = app_data_path
+    return path
+
+
+def _match_flow(num_nodes: int, edge_u: np.ndarray, edge_v: np.ndarray,
+                flow_u: np.ndarray, flow_v: np.ndarray, flow_vph: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-period flow rows and has-flow mask of the roads (edge_u, edge_v) from
+    traffic records (flow_u, flow_v, flow_vph), with the lookup rules of
+    TransportationNetwork.flow: a record applies to both directions, the last
+    record of a pair wins, and of the two directions the pair seen later wins.
+    """
+    flow = np.zeros((len(edge_u), len(PERIODS)), dtype=np.float32)
+    if not len(flow_u):
+        return flow, np.zeros(len(edge_u), dtype=bool)
+    keys = flow_u.astype(np.int64) * num_nodes + flow_v
+    pairs, first = np.unique(keys, return_index=True)
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last
+
+    def lookup(u, v):
+        k = u.astype(np.int64) * num_nodes + v
+        pos = np.minimum(np.searchsorted(pairs, k), len(pairs) - 1)
+        hit = pairs[pos] == k
+        return np.where(hit, first[pos], -1), last[pos]
+
+    first_uv, last_uv = lookup(edge_u, edge_v)
+    first_vu, last_vu = lookup(edge_v, edge_u)
+    row = np.where(first_vu > first_uv, last_vu, last_uv)
+    has_flow = (first_uv >= 0) | (first_vu >= 0)
+    flow[has_flow] = flow_vph[row[has_flow]]
+    return flow, has_flow
 
 
 class TransportationNetwork:
@@ -22,13 +86,42 @@ class TransportationNetwork:
         metro_lines:   List[Dict],
         roads:         List[Dict],
         flow:          Dict[Tuple[str,str], Dict[str,int]],
+        potential_roads: Optional[List[Dict]] = None,
     ):
-        self.neighbourhoods = neighbourhoods
-        self.facilities    = facilities
+        # One interned node table backs nodes, neighbourhoods and facilities
+        self.node_table    = self._node_table(neighbourhoods, facilities)
+        self.neighbourhoods = self.node_table.group_view(0)
+        self.facilities    = self.node_table.group_view(1)
         self.bus_routes    = bus_routes
         self.metro_lines   = metro_lines
         self.roads         = roads
         self.flow          = self._symmetrise_flow(flow)
+        self.potential_roads = potential_roads
+
+        # Compiled graphs keyed by (kind, period) -> (data_version, frozen graph)
+        self._data_version = 0
+        self._graph_cache: Dict[Tuple[str, Optional[str]], Tuple[int, nx.Graph]] = {}
+        self._graph_cache_lock = threading.Lock()
+
+        # Folder of precomputed origin-destination matrices; None leaves them disabled
+        self.od_matrix_dir: Optional[str] = None
+
+        # Facility catchments of the network this one replaces, repaired on first use
+        self._catchment_seeds: Dict[Tuple[str, Optional[str]], object] = {}
+
+        # Set by stop_warming() so a replaced network stops contracting hierarchies
+        self._warm_stop = threading.Event()
+
+    @staticmethod
+    def _node_table(neighbourhoods, facilities):
+        from .nodes import NodeGroup, NodeTable
+
+        # Views of one table (e.g. from a snapshot file) are reused as they are
+        if (isinstance(neighbourhoods, NodeGroup) and isinstance(facilities, NodeGroup)
+                and neighbourhoods.table is facilities.table
+                and (neighbourhoods.group_id, facilities.group_id) == (0, 1)):
+            return neighbourhoods.table
+        return NodeTable.from_groups(neighbourhoods, facilities)
 
     @staticmethod
     def _symmetrise_flow(raw: Dict[Tuple[str,str], dict]) -> Dict[Tuple[str,str], dict]:
@@ -38,64 +131,531 @@ class TransportationNetwork:
             out[(v, u)] = rec
         return out
 
+    def __getattr__(self, name: str):
+        # Attributes deferred by from_snapshot() are materialised on first access
+        loaders = self.__dict__.get('_deferred')
+        if loaders and name in loaders:
+            value = loaders.pop(name)()
+            setattr(self, name, value)
+            return value
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def data_version(self) -> int:
+        """Version of the loaded data; bumped by invalidate_graph_cache()."""
+        return self._data_version
+
+    def invalidate_graph_cache(self) -> None:
+        """
+        Mark the underlying data as changed.
+        Cached graphs built for an older version are rebuilt on next access.
+        """
+        with self._graph_cache_lock:
+            self._data_version += 1
+            self._graph_cache.clear()
+
     @property
-    def nodes(self) -> Dict[str, dict]:
-        merged = {}
-        merged.update(self.neighbourhoods)
-        merged.update(self.facilities)
-        return merged
+    def nodes(self):
+        """Read-only mapping of node ID -> attributes over neighbourhoods and facilities."""
+        return self.node_table
+
+    def facilities_of_type(self, type_name: str) -> List[str]:
+        """IDs of the facilities whose 'type' is type_name."""
+        return [fid for fid, data in self.facilities.items() if data.get('type') == type_name]
 
     @classmethod
     def from_json_folder(cls, data_dir: str):
+        from .compiled import CompiledGraph, NodeIndex
+        from .json_stream import iter_json_array
+        from .nodes import FACILITY_KEYS, NEIGHBOURHOOD_KEYS, NodeTable
+
         def load_json(fname: str):
-            path = os.path.join(data_dir, fname)
-            if not os.path.exists(path):
-                # Try to find the file in the app/data directory
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                # Go up one level since we're now in the graph folder
-                app_dir = os.path.dirname(current_dir)
-                app_data_path = os.path.join(app_dir, 'data', fname)
-                if os.path.exists(app_data_path):
-                    path = app_data_path
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-
-        # Load raw JSON
-        nb = load_json('neighbourhoods.json')
-        fac= load_json('important_facilities.json')
-        br = load_json('bus_routes.json')
-        ml = load_json('current_metro_lines.json')
-        re = load_json('roads_existing.json')
-        rp = load_json('roads_potential.json')
-        tf = load_json('traffic_flow_patterns.json')
-
-        # Parse neighbourhoods
-        neighbourhoods = {
-            str(r['id']): {'name': r['name'], 'population': r['population'], 'type': r['type'], 'x': r['x'], 'y': r['y']}
-            for r in nb
-        }
-        # Parse facilities
-        facilities = {
-            r['id']: {'name': r['name'], 'type': r['type'], 'x': r['x'], 'y': r['y']}
-            for r in fac
-        }
+            # Records are streamed one at a time straight into the column buffers
+            # below, so neither the raw document nor per-row dicts are kept
+            return iter_json_array(resolve_data_file(data_dir, fname))
+
+        # Nodes: neighbourhoods (group 0), then facilities (group 1); as in
+        # NodeTable.from_groups a repeated ID keeps its row and takes the later record
+        index = NodeIndex()
+        names: List = []
+        types: List = []
+        population: List = []
+        xs, ys, group = array('d'), array('d'), array('b')
+        for g, fname in enumerate(('neighbourhoods.json', 'important_facilities.json')):
+            for r in load_json(fname):
+                row = index.intern(str(r['id']) if g == 0 else r['id'])
+                values = (r['name'], r['type'], r['population'] if g == 0 else 0, r['x'], r['y'], g)
+                if row == len(names):
+                    for column, value in zip((names, types, population, xs, ys, group), values):
+                        column.append(value)
+                else:
+                    for column, value in zip((names, types, population, xs, ys, group), values):
+                        column[row] = value
+        all_int = all(isinstance(p, int) for p in population)
+        table = NodeTable.from_columns(
+            index.ids, names, types,
+            np.array(population, dtype=np.int64 if all_int else np.float64),
+            np.frombuffer(xs, dtype=np.float64), np.frombuffer(ys, dtype=np.float64),
+            np.frombuffer(group, dtype=np.int8), (NEIGHBOURHOOD_KEYS, FACILITY_KEYS))
+
         # Parse bus routes
-        bus_routes = [{'id': r['route_id'], 'stops': r['stops']} for r in br]
+        bus_routes = [{'id': r['route_id'], 'stops': r['stops'], 'buses': r.get('buses_assigned', 0)}
+                      for r in load_json('bus_routes.json')]
         # Parse metro lines
-        metro_lines = [{'id': r['line_id'], 'stations': r['stations']} for r in ml]
-        # Parse roads (distance_m to km)
+        metro_lines = [{'id': r['line_id'], 'name': r.get('name', r['line_id']), 'stations': r['stations']}
+                       for r in load_json('current_metro_lines.json')]
+
+        # Roads (distance_m to km) go into one set of edge columns; potential roads
+        # (no condition score yet, default to 5) are appended after them
+        nodes = NodeIndex(table.index.ids)
+        edge_u, edge_v = array('i'), array('i')
+        dist_km, capacity, condition = array('d'), array('d'), array('d')
+        for r in load_json('roads_existing.json'):
+            edge_u.append(nodes.intern(r['from_id']))
+            edge_v.append(nodes.intern(r['to_id']))
+            dist_km.append(r['distance_m'] / 1000.0)
+            capacity.append(r['capacity_vph'])
+            condition.append(r['condition_1_10'])
+        num_roads = len(edge_u)
+        road_nodes = NodeIndex(nodes.ids)
+        for r in load_json('roads_potential.json'):
+            edge_u.append(nodes.intern(r['from_id']))
+            edge_v.append(nodes.intern(r['to_id']))
+            dist_km.append(r['distance_m'] / 1000.0)
+            capacity.append(r['capacity_vph'])
+            condition.append(r.get('condition_1_10', 5))
+
+        # Flow records of pairs that are not nodes of a road cannot match one
+        flow_u, flow_v, flow_vph = array('i'), array('i'), array('d')
+        for rec in load_json('traffic_flow_patterns.json'):
+            u, v = road_nodes.get(rec['from_id']), road_nodes.get(rec['to_id'])
+            if u >= 0 and v >= 0:
+                flow_u.append(u)
+                flow_v.append(v)
+                flow_vph.extend((rec['morning_vph'], rec['afternoon_vph'],
+                                 rec['evening_vph'], rec['night_vph']))
+
+        column = lambda buf, dtype: np.frombuffer(buf, dtype=dtype) if len(buf) else np.zeros(0, dtype=dtype)
+        edge_u, edge_v = column(edge_u, np.int32), column(edge_v, np.int32)
+        dist_km, capacity, condition = column(dist_km, np.float64), column(capacity, np.float64), column(condition, np.float64)
+        flow, has_flow = _match_flow(
+            len(road_nodes), edge_u[:num_roads], edge_v[:num_roads],
+            column(flow_u, np.int32), column(flow_v, np.int32),
+            column(flow_vph, np.float64).reshape(-1, len(PERIODS)))
+        road = CompiledGraph.from_edge_columns(
+            road_nodes, edge_u[:num_roads], edge_v[:num_roads], dist_km[:num_roads],
+            capacity[:num_roads], condition[:num_roads], flow, has_flow)
+        num_potential = len(edge_u) - num_roads
+        combined = CompiledGraph.from_edge_columns(
+            nodes, edge_u, edge_v, dist_km, capacity, condition,
+            np.concatenate((flow, np.zeros((num_potential, len(PERIODS)), dtype=np.float32))),
+            np.concatenate((has_flow, np.zeros(num_potential, dtype=bool))),
+            potential=np.arange(len(edge_u)) >= num_roads)
+
+        tn = cls(table.group_view(0), table.group_view(1), bus_routes, metro_lines,
+                 roads=[], flow={}, potential_roads=[])
+        tn._adopt_compiled(road, combined)
+        return tn
+
+    def _adopt_compiled(self, road, combined) -> None:
+        """
+        Seed the cache with prebuilt road and road+potential compiled graphs.
+        The roads, flow and potential_roads lists are derived from them on first access.
+        """
+        from .snapshot_file import _flow_from_graph, _roads_from_graph
+
+        del self.roads, self.flow, self.potential_roads
+        self._deferred = {
+            'roads': lambda: _roads_from_graph(road, potential=False),
+            'flow': lambda: _flow_from_graph(road),
+            'potential_roads': lambda: _roads_from_graph(combined, potential=True),
+        }
+        self._seed_cache(self._compiled_key(), road)
+        self._seed_cache(self._compiled_key(include_potential=True), combined)
+
+    @classmethod
+    def from_cairo_graph(cls, graph):
+        """
+        Convert a CairoTransportationGraph filled by utils.data_loader.load_data_from_csv.
+        """
+        neighbourhoods, facilities = {}, {}
+        for nid, d in graph.nodes.items():
+            if d.get('is_facility'):
+                facilities[nid] = {'name': d['name'], 'type': d['type'], 'x': d['x'], 'y': d['y']}
+            else:
+                neighbourhoods[nid] = {'name': d['name'], 'population': d['population'], 'type': d['type'], 'x': d['x'], 'y': d['y']}
+        bus_routes = [
+            {'id': route_id, 'stops': stops.replace('"', '').split(','), 'buses': buses}
+            for route_id, stops, buses, _ in graph.bus_routes
+        ]
+        metro_lines = [
+            {'id': line_id, 'name': name, 'stations': stations.replace('"', '').split(',')}
+            for line_id, name, stations, _ in graph.metro_lines
+        ]
         roads = [
-            {'from': r['from_id'], 'to': r['to_id'], 'dist_km': r['distance_m']/1000.0, 'cap': r['capacity_vph'], 'cond': r['condition_1_10']}
-            for r in re
+            {'from': u, 'to': v, 'dist_km': dist, 'cap': cap, 'cond': cond}
+            for u, v, dist, cap, cond in graph.existing_roads
         ]
-        # Parse flow
-        flow: Dict[Tuple[str,str], dict] = {}
-        for rec in tf:
-            flow[(rec['from_id'], rec['to_id'])] = {
-                'morning': rec['morning_vph'], 'afternoon': rec['afternoon_vph'],
-                'evening': rec['evening_vph'], 'night': rec['night_vph']
-            }
-        return cls(neighbourhoods, facilities, bus_routes, metro_lines, roads, flow)
+        potential_roads = [
+            {'from': u, 'to': v, 'dist_km': dist, 'cap': cap, 'cond': 5}
+            for u, v, dist, cap, _cost in graph.potential_roads
+        ]
+        flow = {key: dict(rec) for key, rec in graph.traffic_data.items() if isinstance(key, tuple)}
+        return cls(neighbourhoods, facilities, bus_routes, metro_lines, roads, flow, potential_roads)
+
+    @classmethod
+    def from_snapshot(cls, path: str):
+        """
+        Load a binary snapshot written by graph.snapshot_file.compile_snapshot().
+        Compiled graphs and weight tables are memory-mapped; the dict-based
+        roads/flow attributes are only rebuilt if legacy code asks for them.
+        """
+        from .snapshot_file import load_network
+
+        return load_network(path, cls)
+
+    def _seed_cache(self, key: Tuple[str, Optional[str]], value) -> None:
+        """Store a prebuilt entry (e.g. from a snapshot file) in the graph cache."""
+        with self._graph_cache_lock:
+            self._graph_cache[key] = (self._data_version, value)
+
+    def _is_cached(self, key: Tuple[str, Optional[str]]) -> bool:
+        entry = self._graph_cache.get(key)
+        return entry is not None and entry[0] == self._data_version
+
+    def _cache_off_lock(self, key: Tuple[str, Optional[str]], factory: Callable[[], object]) -> None:
+        """
+        Build a missing entry without holding the cache lock, so requests for other entries
+        are not blocked meanwhile; an entry cached in the meantime is kept.
+        """
+        version = self._data_version
+        if self._is_cached(key):
+            return
+        value = factory()
+        with self._graph_cache_lock:
+            if self._data_version == version and not self._is_cached(key):
+                self._graph_cache[key] = (version, value)
+
+    def _cached(self, key: Tuple[str, Optional[str]], factory: Callable[[], object]):
+        entry = self._graph_cache.get(key)
+        if entry is None or entry[0] != self._data_version:
+            with self._graph_cache_lock:
+                entry = self._graph_cache.get(key)
+                if entry is None or entry[0] != self._data_version:
+                    entry = (self._data_version, factory())
+                    self._graph_cache[key] = entry
+        return entry[1]
+
+    def _cached_graph(self, kind: str, period: Optional[str], builder: Callable[..., nx.Graph]) -> nx.Graph:
+        # Unknown periods carry no flow, so they all share a single entry
+        key = (kind, period if period in PERIODS else None)
+        if kind == 'public':
+            return self._cached(key, lambda: nx.freeze(builder()))
+        return self._cached(key, lambda: nx.freeze(builder(period=key[1])))
+
+    def public_transport_network(self) -> nx.DiGraph:
+        """Cached, read-only variant of build_public_transport_network()."""
+        return self._cached_graph('public', None, self.build_public_transport_network)
+
+    def road_network(self, period: str = 'morning') -> nx.Graph:
+        """
+        Cached, read-only variant of build_road_network().
+        The graph is shared between requests; copy it before changing edge attributes.
+        """
+        return self._cached_graph('road', period, self.build_road_network)
+
+    def combined_road_network(self, period: str = 'morning') -> nx.Graph:
+        """
+        Cached, read-only variant of build_combined_road_network().
+        The graph is shared between requests; copy it before changing edge attributes.
+        """
+        return self._cached_graph('combined', period, self.build_combined_road_network)
+
+    def compiled_network(self, include_potential: bool = False, include_transit: bool = False):
+        """
+        Cached array-backed (CSR) form of the network, see graph.compiled.CompiledGraph.
+        Per-period flows are columns of the compiled graph, so one instance serves all periods.
+        """
+        from .compiled import CompiledGraph
+
+        return self._cached(self._compiled_key(include_potential, include_transit), lambda: CompiledGraph.from_network(
+            self, include_potential=include_potential, include_transit=include_transit))
+
+    def edge_weights(self, profile: str, include_potential: bool = False, include_transit: bool = False):
+        """
+        Cached edges x periods weight matrix (graph.weights.WeightTable) of a cost
+        profile over compiled_network(include_potential, include_transit).
+        """
+        from .weights import compute_weights
+
+        compiled = self.compiled_network(include_potential=include_potential, include_transit=include_transit)
+        return self._cached(self._weights_key(profile, include_potential, include_transit),
+                            lambda: compute_weights(compiled, profile))
+
+    def route_engine(self, profile: str = 'congestion', period: Optional[str] = None):
+        """
+        Cached point-to-point search engine (algorithm.search.RouteEngine) over the
+        road graph, weighted by one period column of a cost profile.
+        """
+        from ..algorithm.search import RouteEngine
+
+        # Build the dependencies first: the cache lock is not reentrant
+        landmarks = self.landmarks(profile, period)
+        key = ('engine:' + profile, period if period in PERIODS else None)
+        return self._cached(key, lambda: RouteEngine.from_network(self, profile, key[1], landmarks))
+
+    def alternative_routes(self, profile: str = 'congestion', period: Optional[str] = None):
+        """
+        Cached alternative-route finder (algorithm.alternatives.AlternativeRoutes) over
+        route_engine(profile, period).
+        """
+        from ..algorithm.alternatives import AlternativeRoutes
+
+        # Build the dependencies first: the cache lock is not reentrant
+        engine = self.route_engine(profile, period)
+        key = ('alternatives:' + profile, period if period in PERIODS else None)
+        return self._cached(key, lambda: AlternativeRoutes(engine))
+
+    def emergency_router(self, emergency_type: str = 'ambulance', period: Optional[str] = None):
+        """
+        Cached EmergencyRouter (algorithm.emergency_routing) over the precomputed emergency
+        weights of one vehicle type and period. Types without a priority factor share one.
+        """
+        from ..algorithm.emergency_routing import EmergencyRouter
+        from .weights import emergency_vehicle
+
+        vehicle = emergency_vehicle(emergency_type)
+        key = ('emergency_router:' + vehicle, period if period in PERIODS else None)
+        # Build the dependencies first: the cache lock is not reentrant
+        engine = self.contraction_hierarchy('emergency:' + vehicle, period)
+        compiled = self.compiled_network()
+        response = self.edge_weights('emergency_response:' + vehicle).column(key[1])
+        return self._cached(key, lambda: EmergencyRouter(None, vehicle, key[1], engine=engine, compiled=compiled,
+                                                         response_minutes=response))
+
+    def facility_catchment(self, facility_type: str, emergency_type: str = 'ambulance',
+                           period: Optional[str] = None):
+        """
+        Cached FacilityCatchment (algorithm.catchment) of the facilities whose 'type' is
+        facility_type, over the emergency response minutes of one vehicle type and period.
+        An index inherited from the previous network is repaired instead of rebuilt when
+        only the weights changed.
+        """
+        from ..algorithm.catchment import FacilityCatchment
+        from .weights import emergency_vehicle
+
+        vehicle = emergency_vehicle(emergency_type)
+        key = ('catchment:' + facility_type + ':' + vehicle, period if period in PERIODS else None)
+        # Build the dependencies first: the cache lock is not reentrant
+        compiled = self.compiled_network()
+        minutes = self.edge_weights('emergency_response:' + vehicle).column(key[1])
+        facilities = self.facilities_of_type(facility_type)
+        seed = self._catchment_seeds.pop(key, None)
+
+        def build():
+            if seed is not None and seed.compatible(compiled, facilities):
+                return seed.updated(compiled, minutes)
+            return FacilityCatchment.build(compiled, minutes, facilities)
+
+        return self._cached(key, build)
+
+    def inherit_catchments(self, previous: 'TransportationNetwork') -> None:
+        """
+        Take over the facility catchments of previous, the network this one replaces,
+        so that a traffic update only repairs them around the edges whose weights changed.
+        """
+        with previous._graph_cache_lock:
+            entries = list(previous._graph_cache.items())
+        self._catchment_seeds = {key: value for key, (version, value) in entries
+                                 if key[0].startswith('catchment:') and version == previous.data_version}
+
+    def isochrone_engine(self, profile: str = 'travel_time', period: Optional[str] = None,
+                         include_transit: bool = False):
+        """
+        Cached reachability engine (algorithm.isochrone.IsochroneEngine) of the road graph
+        (plus bus and metro edges with include_transit) for one minutes profile and period.
+        """
+        from ..algorithm.isochrone import IsochroneEngine
+
+        # Build the dependencies first: the cache lock is not reentrant
+        self.edge_weights(profile, include_transit=include_transit)
+        key = ('isochrone:' + profile + (':transit' if include_transit else ''), period if period in PERIODS else None)
+        return self._cached(key, lambda: IsochroneEngine.from_network(self, profile, key[1], include_transit))
+
+    def landmarks(self, profile: str = 'congestion', period: Optional[str] = None):
+        """
+        Cached ALT landmark table (algorithm.landmarks.Landmarks) of the road graph for
+        one cost profile and period. Snapshot files store them precomputed.
+        """
+        from ..algorithm.landmarks import Landmarks
+
+        compiled = self.compiled_network()
+        table = self.edge_weights(profile)
+        key = self._landmarks_key(profile, period)
+        return self._cached(key, lambda: Landmarks.build(compiled, table.column(key[1])))
+
+    @staticmethod
+    def _landmarks_key(profile: str, period: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        return ('alt:' + profile, period if period in PERIODS else None)
+
+    def time_dependent_engine(self, profile: str = 'timed_route'):
+        """
+        Cached time-dependent engine (algorithm.time_dependent.TimeDependentEngine) of the
+        road graph: each edge's minutes under profile are interpolated between the periods,
+        with ALT landmarks on the fastest time of day for A*.
+        """
+        from ..algorithm.time_dependent import TimeDependentEngine, TravelTimeFunctions
+
+        # Build the dependencies first: the cache lock is not reentrant
+        compiled = self.compiled_network()
+        table = self.edge_weights(profile)
+
+        def build():
+            functions = TravelTimeFunctions.from_weights(table)
+            return TimeDependentEngine(compiled, functions, TimeDependentEngine.build_landmarks(compiled, functions))
+
+        return self._cached(('td:' + profile, None), build)
+
+    def transit_router(self):
+        """
+        Cached RAPTOR router (algorithm.raptor.RaptorRouter) over the periodic timetable
+        of the bus routes and metro lines.
+        """
+        from ..algorithm.raptor import RaptorRouter, TransitTimetable
+
+        return self._cached(('raptor', None), lambda: RaptorRouter(TransitTimetable.from_network(self)))
+
+    def contraction_hierarchy(self, profile: str = 'congestion', period: Optional[str] = None,
+                              include_transit: bool = False):
+        """
+        Cached Contraction Hierarchy (algorithm.contraction.ContractionHierarchy) of the
+        road graph (plus bus and metro edges with include_transit) for one cost profile and
+        period. Snapshot files store the road hierarchies precomputed.
+        """
+        from ..algorithm.contraction import ContractionHierarchy
+
+        # Build the dependencies first: the cache lock is not reentrant
+        compiled = self.compiled_network(include_transit=include_transit)
+        table = self.edge_weights(profile, include_transit=include_transit)
+        key = self._hierarchy_key(profile, period, include_transit)
+        return self._cached(key, lambda: ContractionHierarchy.build(compiled, table.column(key[1])))
+
+    @staticmethod
+    def _hierarchy_key(profile: str, period: Optional[str] = None,
+                       include_transit: bool = False) -> Tuple[str, Optional[str]]:
+        return ('ch:' + profile + (':transit' if include_transit else ''), period if period in PERIODS else None)
+
+    def od_matrix(self, profile: str = 'congestion', period: Optional[str] = None):
+        """
+        Cached all-pairs route table (algorithm.od_matrix.ODMatrix) of the road graph, or
+        None unless od_matrix_dir is set. Routes follow the cost profile; distance and time
+        are the dist_km and 'route_time' totals along them. Tables already in od_matrix_dir
+        are memory-mapped instead of recomputed; after invalidate_graph_cache() the tables
+        are rebuilt in memory and the files are left alone.
+        """
+        from ..algorithm.od_matrix import ODMatrix
+
+        if self.od_matrix_dir is None:
+            return None
+        # Build the dependencies first: the cache lock is not reentrant
+        compiled = self.compiled_network()
+        table = self.edge_weights(profile)
+        minutes = self.edge_weights('route_time')
+        key = ('od:' + profile, period if period in PERIODS else None)
+        directory = os.path.join(self.od_matrix_dir, f"{profile}.{key[1] or 'none'}")
+
+        def load_or_build():
+            # Files on disk describe the loaded data; after in-place edits the tables are
+            # built in memory so the files of the unedited data are never overwritten
+            if self._data_version > 0:
+                return ODMatrix.build(compiled, table.column(key[1]), minutes.column(key[1]))
+            matrix = ODMatrix.load(compiled.nodes, directory)
+            return matrix or ODMatrix.build(compiled, table.column(key[1]), minutes.column(key[1]), directory)
+
+        return self._cached(key, load_or_build)
+
+    @staticmethod
+    def _compiled_key(include_potential: bool = False, include_transit: bool = False) -> Tuple[str, None]:
+        kind = 'compiled' + ('+potential' if include_potential else '') + ('+transit' if include_transit else '')
+        return (kind, None)
+
+    @staticmethod
+    def _weights_key(profile: str, include_potential: bool = False, include_transit: bool = False) -> Tuple[str, None]:
+        kind = 'weights:' + profile + (':potential' if include_potential else '') + (':transit' if include_transit else '')
+        return (kind, None)
+
+    def warm_graph_cache(self, include_networkx: bool = True) -> None:
+        """
+        Build the compiled graph, default weight tables, OD matrices (when od_matrix_dir
+        is set), the catchments of the facilities each vehicle type is dispatched from,
+        the transit router and (unless include_networkx is False) the road and combined
+        graphs of every period ahead of the first request. Contraction Hierarchies and
+        ALT landmarks are only contracted by compile_snapshot(): emergency routers are
+        built here over the ones a snapshot file supplies, and warm_hierarchies() builds
+        the rest in the background. The time-dependent engine is built on first use,
+        so only /flow/route/timed waits for it.
+        """
+        from ..algorithm.emergency_routing import DISPATCH_FACILITIES, resolve_facility_type
+        from .weights import DEFAULT_PROFILES, EMERGENCY_PRIORITY
+
+        self.compiled_network()
+        for profile in DEFAULT_PROFILES:
+            self.edge_weights(profile)
+        for period in PERIODS + (None,):
+            self.od_matrix('congestion', period)
+            for vehicle in EMERGENCY_PRIORITY:
+                if self._is_cached(self._hierarchy_key('emergency:' + vehicle, period)):
+                    self.emergency_router(vehicle, period)
+            for vehicle, name in DISPATCH_FACILITIES.items():
+                facility_type = resolve_facility_type(name, self.node_table.type_names)
+                if facility_type:
+                    self.facility_catchment(facility_type, vehicle, period)
+        # Inherited catchments that were not needed would only pin the old graph
+        self._catchment_seeds = {}
+        self.transit_router()
+        if not include_networkx:
+            return
+        self.public_transport_network()
+        for period in PERIODS:
+            self.road_network(period)
+            self.combined_road_network(period)
+
+    def warm_hierarchies(self) -> None:
+        """
+        Contract the missing Contraction Hierarchies and ALT landmarks of the four periods,
+        then build the emergency routers over them. Each table is built off the cache lock,
+        so requests meanwhile are not blocked; the flow-free column is left to first use.
+        Returns early once stop_warming() is called.
+        """
+        from ..algorithm.contraction import HIERARCHY_PROFILES, ContractionHierarchy
+        from ..algorithm.landmarks import LANDMARK_PROFILES, Landmarks
+        from .weights import EMERGENCY_PRIORITY
+
+        compiled = self.compiled_network()
+        for period in PERIODS:
+            for profile in HIERARCHY_PROFILES:
+                if self._warm_stop.is_set():
+                    return
+                column = self.edge_weights(profile).column(period)
+                self._cache_off_lock(self._hierarchy_key(profile, period),
+                                     lambda: ContractionHierarchy.build(compiled, column))
+            for profile in LANDMARK_PROFILES:
+                if self._warm_stop.is_set():
+                    return
+                column = self.edge_weights(profile).column(period)
+                self._cache_off_lock(self._landmarks_key(profile, period), lambda: Landmarks.build(compiled, column))
+            for vehicle in EMERGENCY_PRIORITY:
+                self.emergency_router(vehicle, period)
+
+    def warm_hierarchies_async(self) -> threading.Thread:
+        """Run warm_hierarchies() on a background thread."""
+        thread = threading.Thread(target=self.warm_hierarchies, name='network-hierarchies', daemon=True)
+        thread.start()
+        return thread
+
+    def stop_warming(self) -> None:
+        """Make a running warm_hierarchies() return after the table it is building."""
+        self._warm_stop.set()
 
     def build_public_transport_network(self) -> nx.DiGraph:
         G = nx.DiGraph()
@@ -142,33 +702,41 @@ class TransportationNetwork:
             weight = dist * (1 + flow / cap) if cap > 0 else dist
             G.add_edge(u, v, weight=weight, dist_km=dist, capacity=cap, flow=flow, condition=cond, potential=False)
 
-        # Load and add potential roads from file
+        # Add potential roads, loading them from file if they were not passed in
+        potential_roads = self.potential_roads
+        if potential_roads is None:
+            potential_roads = self._load_bundled_potential_roads()
+
+        for r in potential_roads:
+            u, v = r['from'], r['to']
+            dist, cap, cond = r['dist_km'], r['cap'], r['cond']
+            weight = dist * (1 + 0 / cap) if cap > 0 else dist  # Assume no flow yet
+            G.add_edge(
+                u, v,
+                weight=weight,
+                dist_km=dist,
+                capacity=cap,
+                flow=0,
+                condition=f"{cond}(p)",
+                potential=True
+            )
+
+        return G
+
+    @staticmethod
+    def _load_bundled_potential_roads() -> List[Dict]:
         # Updated path to handle being in the graph subfolder
         current_dir = os.path.dirname(os.path.abspath(__file__))
         app_dir = os.path.dirname(current_dir)
         potential_path = os.path.join(app_dir, 'data', 'roads_potential.json')
-        
-        if os.path.exists(potential_path):
-            with open(potential_path, 'r', encoding='utf-8') as f:
-                potential_roads = json.load(f)
-
-            for r in potential_roads:
-                u, v = r['from_id'], r['to_id']
-                dist = r['distance_m'] / 1000.0
-                cap = r['capacity_vph']
-                cond = r.get('condition_1_10', 5)
-                weight = dist * (1 + 0 / cap) if cap > 0 else dist  # Assume no flow yet
-                G.add_edge(
-                    u, v,
-                    weight=weight,
-                    dist_km=dist,
-                    capacity=cap,
-                    flow=0,
-                    condition=f"{cond}(p)",
-                    potential=True
-                )
-
-        return G
+        if not os.path.exists(potential_path):
+            return []
+        with open(potential_path, 'r', encoding='utf-8') as f:
+            return [
+                {'from': r['from_id'], 'to': r['to_id'], 'dist_km': r['distance_m'] / 1000.0,
+                 'cap': r['capacity_vph'], 'cond': r.get('condition_1_10', 5)}
+                for r in json.load(f)
+            ]
 
 
 if __name__ == '__main__':
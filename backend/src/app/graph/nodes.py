@@ -0,0 +1,307 @@
+"""
+Interned node table with one column per attribute.
+Node IDs ("3", "F1", 7) are interned to dense row numbers by a NodeIndex;
+coordinates, populations, facility flags and type codes are NumPy arrays,
+so heuristics and analytics can work on whole columns. NodeTable and its
+row views are read-only Mappings, so code written against the old
+dict-of-dicts (nodes[nid]['name'], nodes.items(), G.add_node(nid, **attrs))
+keeps working unchanged.
+"""
+from collections.abc import Mapping
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .compiled import NodeIndex
+
+# Key order of the node records built by TransportationNetwork.from_json_folder
+NEIGHBOURHOOD_KEYS = ('name', 'population', 'type', 'x', 'y')
+FACILITY_KEYS = ('name', 'type', 'x', 'y')
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+class NodeTable(Mapping):
+    """
+    Read-only mapping of node ID -> NodeView backed by attribute columns.
+
+    Rows keep the key set (and order) of the record they were built from,
+    which is stored once per distinct key set in `schemas`. `group` tags each
+    row with the group it came from, e.g. 0 for neighbourhoods, 1 for facilities.
+    """
+
+    __slots__ = ('index', 'names', 'type_names', 'type_codes', 'population', 'x', 'y',
+                 'is_facility', 'group', 'schemas', 'schema_codes', 'extras')
+
+    def __init__(self, index: NodeIndex, names: List, type_names: Sequence, type_codes: np.ndarray,
+                 population: np.ndarray, x: np.ndarray, y: np.ndarray, is_facility: np.ndarray,
+                 group: np.ndarray, schemas: Sequence[Tuple[str, ...]], schema_codes: np.ndarray,
+                 extras: Optional[Dict[int, dict]] = None):
+        self.index = index
+        self.names = names
+        self.type_names = tuple(type_names)
+        self.type_codes = type_codes
+        self.population = population
+        self.x = x
+        self.y = y
+        self.is_facility = is_facility
+        self.group = group
+        self.schemas = [tuple(s) for s in schemas]
+        self.schema_codes = schema_codes
+        self.extras = extras or {}
+        for column in (type_codes, population, x, y, is_facility, group, schema_codes):
+            column.setflags(write=False)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_groups(cls, *groups: Mapping) -> 'NodeTable':
+        """
+        Build a table from several ID -> attribute-dict mappings.
+        Row i of the result belongs to the group it was taken from; as with
+        dict.update(), a later group overrides an ID seen in an earlier one.
+        """
+        index = NodeIndex()
+        records: List[Optional[Mapping]] = []
+        group_of: List[int] = []
+        for g, mapping in enumerate(groups):
+            for nid, attrs in mapping.items():
+                row = index.intern(nid)
+                if row == len(records):
+                    records.append(attrs)
+                    group_of.append(g)
+                else:
+                    records[row] = attrs
+                    group_of[row] = g
+        return cls._from_records(index, records, group_of)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[Hashable, Mapping]]) -> 'NodeTable':
+        """Build a single-group table from (ID, attribute dict) pairs."""
+        return cls.from_groups(dict(items))
+
+    @classmethod
+    def from_columns(cls, ids: Sequence[Hashable], names: List, types: Sequence[Optional[str]],
+                     population: np.ndarray, x: np.ndarray, y: np.ndarray, group: np.ndarray,
+                     schemas: Sequence[Tuple[str, ...]], is_facility: Optional[np.ndarray] = None) -> 'NodeTable':
+        """
+        Wrap existing columns (e.g. memory-mapped snapshot arrays) without per-node objects.
+        Row i uses schemas[group[i]] as its key set.
+        """
+        type_index = NodeIndex(t for t in types if t is not None)
+        type_codes = np.fromiter((type_index.get(t) if t is not None else -1 for t in types),
+                                 dtype=np.int32, count=len(types))
+        group = np.asarray(group, dtype=np.int8)
+        if is_facility is None:
+            is_facility = np.zeros(len(ids), dtype=bool)
+        return cls(NodeIndex(ids), list(names), type_index.ids, type_codes, population, x, y,
+                   is_facility, group, schemas, group.astype(np.int32))
+
+    @classmethod
+    def _from_records(cls, index: NodeIndex, records: Sequence[Mapping], group_of: Sequence[int]) -> 'NodeTable':
+        n = len(records)
+        names: List = [None] * n
+        population: List = [0] * n
+        x = np.full(n, np.nan)
+        y = np.full(n, np.nan)
+        is_facility = np.zeros(n, dtype=bool)
+        type_index = NodeIndex()
+        type_codes = np.full(n, -1, dtype=np.int32)
+        schema_index = NodeIndex()
+        schema_codes = np.zeros(n, dtype=np.int32)
+        extras: Dict[int, dict] = {}
+
+        # Attributes with a column are stored there; anything else goes to the per-row extras
+        for row, (nid, attrs) in enumerate(zip(index.ids, records)):
+            schema_codes[row] = schema_index.intern(tuple(attrs.keys()))
+            extra = {}
+            for key, value in attrs.items():
+                if key == 'id' and value == nid:
+                    continue
+                if key == 'name' and (value is None or isinstance(value, str)):
+                    names[row] = value
+                elif key == 'type' and isinstance(value, str):
+                    type_codes[row] = type_index.intern(value)
+                elif key == 'population' and _is_number(value):
+                    population[row] = value
+                elif key in ('x', 'y') and _is_number(value):
+                    (x if key == 'x' else y)[row] = value
+                elif key == 'is_facility' and isinstance(value, (bool, np.bool_)):
+                    is_facility[row] = value
+                else:
+                    extra[key] = value
+            if extra:
+                extras[row] = extra
+
+        all_int = all(isinstance(p, (int, np.integer)) for p in population)
+        return cls(index, names, type_index.ids, type_codes,
+                   np.array(population, dtype=np.int64 if all_int else np.float64),
+                   x, y, is_facility, np.asarray(group_of, dtype=np.int8), schema_index.ids, schema_codes, extras)
+
+    # ------------------------------------------------------------------
+    # Mapping interface
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, nid: Hashable) -> 'NodeView':
+        return NodeView(self, self.index[nid])
+
+    def get(self, nid: Hashable, default=None):
+        row = self.index.get(nid)
+        return default if row < 0 else NodeView(self, row)
+
+    def __contains__(self, nid) -> bool:
+        try:
+            return nid in self.index
+        except TypeError:
+            return False
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.index.ids)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __repr__(self) -> str:
+        return f"NodeTable(nodes={len(self)}, groups={int(self.group.max()) + 1 if len(self) else 0})"
+
+    # ------------------------------------------------------------------
+    # Column access
+    # ------------------------------------------------------------------
+
+    def row(self, nid: Hashable) -> int:
+        """Row number of nid, or -1 if it is not in the table."""
+        return self.index.get(nid)
+
+    def rows(self, ids: Iterable[Hashable]) -> np.ndarray:
+        """Row numbers of ids as an int array; unknown IDs map to -1."""
+        get = self.index.get
+        return np.fromiter((get(nid) for nid in ids), dtype=np.int64)
+
+    def take(self, column: str, ids: Iterable[Hashable], fill=np.nan) -> np.ndarray:
+        """Values of a numeric column for ids, with fill for unknown IDs."""
+        values = getattr(self, column)
+        rows = self.rows(ids)
+        out = np.full(len(rows), fill, dtype=np.result_type(values, fill))
+        known = rows >= 0
+        out[known] = values[rows[known]]
+        return out
+
+    def type_of(self, row: int) -> Optional[str]:
+        code = self.type_codes[row]
+        return self.type_names[code] if code >= 0 else None
+
+    def type_mask(self, type_name: str) -> np.ndarray:
+        """Boolean mask of the rows whose 'type' is type_name."""
+        try:
+            code = self.type_names.index(type_name)
+        except ValueError:
+            return np.zeros(len(self), dtype=bool)
+        return self.type_codes == code
+
+    def group_view(self, group: int) -> 'NodeGroup':
+        """Read-only mapping over the rows of one group."""
+        return NodeGroup(self, group)
+
+    def to_dict(self) -> Dict[Hashable, dict]:
+        """Plain dict-of-dicts copy, e.g. to mutate the nodes again."""
+        return {nid: dict(NodeView(self, row)) for row, nid in enumerate(self.index.ids)}
+
+    def value(self, row: int, key: str):
+        """Value of attribute key on row, as a plain Python object."""
+        if key == 'name':
+            return self.names[row]
+        if key == 'type':
+            return self.type_of(row)
+        if key == 'population':
+            return self.population[row].item()
+        if key == 'x':
+            return self.x[row].item()
+        if key == 'y':
+            return self.y[row].item()
+        if key == 'is_facility':
+            return bool(self.is_facility[row])
+        if key == 'id':
+            return self.index.ids[row]
+        raise KeyError(key)
+
+
+class NodeView(Mapping):
+    """Read-only attribute mapping of one node (one row of a NodeTable)."""
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: NodeTable, row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    def _keys(self) -> Tuple[str, ...]:
+        return self._table.schemas[self._table.schema_codes[self._row]]
+
+    def __getitem__(self, key: str):
+        extra = self._table.extras.get(self._row)
+        if extra is not None and key in extra:
+            return extra[key]
+        if key not in self._keys():
+            raise KeyError(key)
+        return self._table.value(self._row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys()
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class NodeGroup(Mapping):
+    """Read-only mapping over the rows of a NodeTable that belong to one group."""
+
+    __slots__ = ('table', 'group_id', '_ids')
+
+    def __init__(self, table: NodeTable, group_id: int):
+        self.table = table
+        self.group_id = group_id
+        ids = table.index.ids
+        self._ids = [ids[row] for row in np.flatnonzero(table.group == group_id)]
+
+    def _row(self, nid: Hashable) -> int:
+        try:
+            row = self.table.index.get(nid)
+        except TypeError:
+            return -1
+        return row if row >= 0 and self.table.group[row] == self.group_id else -1
+
+    def __getitem__(self, nid: Hashable) -> NodeView:
+        row = self._row(nid)
+        if row < 0:
+            raise KeyError(nid)
+        return NodeView(self.table, row)
+
+    def get(self, nid: Hashable, default=None):
+        row = self._row(nid)
+        return default if row < 0 else NodeView(self.table, row)
+
+    def __contains__(self, nid) -> bool:
+        return self._row(nid) >= 0
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __repr__(self) -> str:
+        return f"NodeGroup(group={self.group_id}, nodes={len(self)})"
@@ -0,0 +1,354 @@
+"""
+Process-wide registry of versioned network snapshots.
+The data folder is loaded once and every blueprint borrows the same
+read-only TransportationNetwork instead of reloading the JSON files.
+"""
+import hashlib
+import os
+import threading
+import time
+import traceback
+from types import MappingProxyType
+from typing import Dict, Iterable, Optional, Tuple
+
+from .networks import DATA_FILES, TransportationNetwork, resolve_data_file
+
+# Files the public-transport graph and its itineraries are derived from
+TRANSIT_FILES = ('neighbourhoods.json', 'important_facilities.json', 'bus_routes.json', 'current_metro_lines.json')
+
+
+def update_digest(digest, path: str, chunk_size: int = 1 << 20) -> None:
+    """Feed a file into digest in fixed-size chunks so large files are never read whole."""
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+
+def hash_data_files(data_dir: str) -> Dict[str, str]:
+    """Return the sha256 of every JSON file of a data folder; missing files are left out."""
+    hashes = {}
+    for fname in DATA_FILES:
+        digest = hashlib.sha256()
+        try:
+            update_digest(digest, resolve_data_file(data_dir, fname))
+        except OSError:
+            continue
+        hashes[fname] = digest.hexdigest()
+    return hashes
+
+
+def hash_data_folder(data_dir: str) -> str:
+    """
+    Compute a content hash over all JSON files of a data folder.
+    Missing files are hashed by name only so the result stays stable.
+    """
+    digest = hashlib.sha256()
+    for fname in DATA_FILES:
+        digest.update(fname.encode('utf-8'))
+        try:
+            update_digest(digest, resolve_data_file(data_dir, fname))
+        except OSError:
+            continue
+    return digest.hexdigest()
+
+
+def _source_hash(data_dir: str) -> str:
+    """Content hash of a data folder or of a binary snapshot file."""
+    from .snapshot_file import SnapshotFile, is_snapshot_file
+
+    if is_snapshot_file(data_dir):
+        return SnapshotFile(data_dir).content_hash
+    return hash_data_folder(data_dir)
+
+
+def _source_signature(data_dir: str) -> Tuple:
+    """(mtime, size) of every source file; cheap enough to poll."""
+    from .snapshot_file import is_snapshot_file
+
+    paths = [data_dir] if is_snapshot_file(data_dir) else [resolve_data_file(data_dir, f) for f in DATA_FILES]
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+class NetworkSnapshot:
+    """
+    Immutable, versioned view of a loaded TransportationNetwork.
+    A new snapshot is created for every (re)load; published snapshots are never mutated.
+    """
+
+    __slots__ = ('_network', '_version', '_data_dir', '_content_hash', '_file_hashes', '_created_at')
+
+    def __init__(self, network: TransportationNetwork, version: int, data_dir: str, content_hash: str,
+                 file_hashes: Optional[Dict[str, str]] = None):
+        object.__setattr__(self, '_network', network)
+        object.__setattr__(self, '_version', version)
+        object.__setattr__(self, '_data_dir', data_dir)
+        object.__setattr__(self, '_content_hash', content_hash)
+        object.__setattr__(self, '_file_hashes', MappingProxyType(dict(file_hashes or {})))
+        object.__setattr__(self, '_created_at', time.time())
+
+    def __setattr__(self, key, value):
+        raise AttributeError("NetworkSnapshot is immutable")
+
+    @property
+    def network(self) -> TransportationNetwork:
+        return self._network
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def data_dir(self) -> str:
+        return self._data_dir
+
+    @property
+    def content_hash(self) -> str:
+        return self._content_hash
+
+    @property
+    def file_hashes(self) -> MappingProxyType:
+        return self._file_hashes
+
+    @property
+    def created_at(self) -> float:
+        return self._created_at
+
+    def fingerprint(self, files: Iterable[str]) -> str:
+        """
+        Hash of a subset of the data files, used to keep derived caches across reloads
+        that did not touch them. Falls back to the full content hash for snapshot files.
+        """
+        if not self._file_hashes:
+            return self._content_hash
+        digest = hashlib.sha256()
+        for fname in files:
+            digest.update(fname.encode('utf-8'))
+            digest.update(self._file_hashes.get(fname, '').encode('utf-8'))
+        return digest.hexdigest()
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self._version,
+            "data_dir": self._data_dir,
+            "content_hash": self._content_hash,
+            "created_at": self._created_at,
+        }
+
+    def __repr__(self) -> str:
+        return f"NetworkSnapshot(version={self._version}, hash={self._content_hash[:12]})"
+
+
+class SnapshotRegistry:
+    """
+    Holds the current NetworkSnapshot for the process.
+    create_app() loads it once; request handlers only read it.
+    reload() builds a replacement off to the side and swaps it in with a single
+    reference assignment, so in-flight requests finish on the snapshot they started with.
+    """
+
+    def __init__(self, data_dir: str = 'data', od_matrix_dir: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        # Background reload that has not started yet: [data_dir, force, thread]
+        self._pending: Optional[list] = None
+        self._snapshot: Optional[NetworkSnapshot] = None
+        self._version = 0
+        self._data_dir = data_dir
+        # Root folder for precomputed OD matrices, one subfolder per content hash
+        self.od_matrix_dir = od_matrix_dir
+
+    @property
+    def data_dir(self) -> str:
+        return self._data_dir
+
+    def build(self, data_dir: Optional[str] = None) -> NetworkSnapshot:
+        """Load the data folder into a new (unpublished) snapshot."""
+        from .snapshot_file import is_snapshot_file
+
+        data_dir = data_dir or self._data_dir
+        file_hashes = None
+        from_file = is_snapshot_file(data_dir)
+        if from_file:
+            # Precompiled binary snapshot: arrays are memory-mapped, nothing is parsed
+            network = TransportationNetwork.from_snapshot(data_dir)
+            content_hash = network.snapshot_file.content_hash
+        else:
+            file_hashes = hash_data_files(data_dir)
+            content_hash = hash_data_folder(data_dir)
+            network = TransportationNetwork.from_json_folder(data_dir)
+        if self.od_matrix_dir:
+            network.od_matrix_dir = os.path.join(self.od_matrix_dir, content_hash[:16])
+        current = self._snapshot
+        if current is not None:
+            # A traffic update only repairs the facility catchments around the changed roads
+            network.inherit_catchments(current.network)
+        network.warm_graph_cache(include_networkx=not from_file)
+        with self._lock:
+            self._version += 1
+            version = self._version
+        return NetworkSnapshot(network, version, data_dir, content_hash, file_hashes)
+
+    def publish(self, snapshot: NetworkSnapshot) -> None:
+        """
+        Make snapshot the current one for all subsequent requests, and contract its
+        missing hierarchies in the background instead of the replaced network's.
+        """
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self._data_dir = snapshot.data_dir
+        if previous is not None and previous.network is not snapshot.network:
+            previous.network.stop_warming()
+        snapshot.network.warm_hierarchies_async()
+
+    def load(self, data_dir: Optional[str] = None) -> NetworkSnapshot:
+        """Build and publish a snapshot of data_dir."""
+        snapshot = self.build(data_dir)
+        self.publish(snapshot)
+        return snapshot
+
+    def reload(self, data_dir: Optional[str] = None, force: bool = False) -> NetworkSnapshot:
+        """
+        Rebuild the snapshot from data_dir (default: the current source) and publish it.
+        Unless force is set, the current snapshot is kept when the content hash is unchanged.
+        Concurrent reloads are serialised; readers are never blocked.
+        """
+        with self._reload_lock:
+            return self._reload(data_dir, force)
+
+    def _reload(self, data_dir: Optional[str], force: bool) -> NetworkSnapshot:
+        data_dir = data_dir or self._data_dir
+        current = self._snapshot
+        if (not force and current is not None and current.data_dir == data_dir
+                and current.content_hash == _source_hash(data_dir)):
+            return current
+        return self.load(data_dir)
+
+    def reload_async(self, data_dir: Optional[str] = None, force: bool = False) -> threading.Thread:
+        """
+        Run reload() on a background thread; failures keep the current snapshot.
+        Requests made while a background reload is still waiting to start join it
+        instead of queueing another one, so at most one runs and one waits.
+        """
+        with self._lock:
+            pending = self._pending
+            if pending is not None and pending[0] == data_dir:
+                pending[1] = pending[1] or force
+                return pending[2]
+            pending = self._pending = [data_dir, force, None]
+
+        def run():
+            with self._reload_lock:
+                # From here on, new requests start a reload that sees later changes
+                with self._lock:
+                    if self._pending is pending:
+                        self._pending = None
+                try:
+                    self._reload(pending[0], pending[1])
+                except Exception:
+                    traceback.print_exc()
+
+        thread = pending[2] = threading.Thread(target=run, name='network-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def current(self) -> NetworkSnapshot:
+        """Return the current snapshot, loading the default folder on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._init_lock:
+                if self._snapshot is None:
+                    self.load()
+                snapshot = self._snapshot
+        return snapshot
+
+
+class SnapshotWatcher:
+    """
+    Polls the source of a SnapshotRegistry and reloads it when a file changes.
+    Only file metadata is polled; the content hash decides whether a new snapshot is published.
+    """
+
+    def __init__(self, registry: SnapshotRegistry, interval: float = 2.0):
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'SnapshotWatcher':
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='network-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        data_dir = self.registry.data_dir
+        signature = _source_signature(data_dir)
+        while not self._stop.wait(self.interval):
+            if self.registry.data_dir != data_dir:
+                data_dir = self.registry.data_dir
+                signature = _source_signature(data_dir)
+                continue
+            latest = _source_signature(data_dir)
+            if latest == signature:
+                continue
+            signature = latest
+            try:
+                self.registry.reload(data_dir)
+            except Exception:
+                # A half-written file fails to parse; keep serving the old snapshot
+                # and retry on the next change
+                traceback.print_exc()
+
+
+# Shared registry used by create_app() and every blueprint
+registry = SnapshotRegistry()
+
+
+def init_network(data_dir: str = 'data', od_matrix_dir: Optional[str] = None) -> NetworkSnapshot:
+    """
+    Load the network once at application start-up.
+    data_dir may be a JSON data folder or a binary snapshot file (see graph.snapshot_file).
+    With od_matrix_dir, all-pairs OD matrices are precomputed (or reopened) under it.
+    """
+    registry.od_matrix_dir = od_matrix_dir
+    return registry.load(data_dir)
+
+
+def reload_network(data_dir: Optional[str] = None, force: bool = False) -> NetworkSnapshot:
+    """Rebuild the shared snapshot and swap it in atomically."""
+    return registry.reload(data_dir, force)
+
+
+def watch_network(interval: float = 2.0) -> SnapshotWatcher:
+    """Start a background watcher that reloads the shared snapshot when its files change."""
+    return SnapshotWatcher(registry, interval).start()
+
+
+def get_snapshot() -> NetworkSnapshot:
+    """Return the current network snapshot."""
+    return registry.current()
+
+
+def get_network() -> TransportationNetwork:
+    """Return the TransportationNetwork of the current snapshot."""
+    return registry.current().network
@@ -0,0 +1,323 @@
+"""
+Binary, memory-mappable network snapshots.
+
+A snapshot file holds everything a worker needs to serve routes: the node
+table, CSR adjacency of the road and combined (road + potential) graphs,
+per-period weight tables, Contraction Hierarchies, ALT landmark tables, transit
+line tables and the content hash of the source data. Workers map the file instead of parsing JSON or CSV.
+
+Layout:
+    MAGIC (8 bytes) | header length (uint64, little endian) | JSON header
+    | array payload, every array aligned to ALIGNMENT bytes
+
+The JSON header lists every array as {"dtype", "shape", "offset"} with the
+offset counted from the start of the payload.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..algorithm.contraction import HIERARCHY_PROFILES, ContractionHierarchy
+from ..algorithm.landmarks import LANDMARK_PROFILES, Landmarks
+from .compiled import BUS, METRO, CompiledGraph, NodeIndex
+from .networks import PERIODS, TransportationNetwork
+from .nodes import FACILITY_KEYS, NEIGHBOURHOOD_KEYS, NodeTable
+from .weights import DEFAULT_PROFILES, WeightTable, compute_weights
+
+MAGIC = b'ABSNAP01'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+
+# Weight profiles stored for the combined (road + potential) graph
+COMBINED_PROFILES = ('combined',)
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def hash_files(paths: Iterable[str]) -> str:
+    """Content hash over a list of input files (e.g. the CSV inputs)."""
+    from .snapshot import update_digest
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        update_digest(digest, path)
+    return digest.hexdigest()
+
+
+def write_snapshot(path: str, header: dict, arrays: Dict[str, np.ndarray]) -> None:
+    """Write header and arrays in the snapshot layout; the file is replaced atomically."""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        offset = _align(offset)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = dict(header, format=FORMAT_VERSION, arrays=layout)
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    payload_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (payload_start - f.tell()))
+        for name, array in arrays.items():
+            f.write(b'\0' * (payload_start + layout[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+class SnapshotFile:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+    Arrays returned by array() share memory with the mapping and are never copied.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a network snapshot file")
+        (header_len,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[header_start:header_start + header_len].decode('utf-8'))
+        if self.header.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {self.header.get('format')} in {path}")
+        self._payload = _align(header_start + header_len)
+
+    @property
+    def content_hash(self) -> str:
+        return self.header['content_hash']
+
+    def array(self, name: str) -> np.ndarray:
+        spec = self.header['arrays'][name]
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        data = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=self._payload + spec['offset'])
+        return data.reshape(spec['shape'])
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """All arrays whose name starts with prefix, keyed by the remainder of the name."""
+        return {name[len(prefix):]: self.array(name) for name in self.header['arrays'] if name.startswith(prefix)}
+
+    def compiled_graph(self, kind: str, nodes: NodeIndex) -> CompiledGraph:
+        return CompiledGraph.from_arrays(nodes, self.arrays(kind + '.'), self.header['route_ids'], self.header['periods'])
+
+    def weight_tables(self, kind: str) -> Dict[str, WeightTable]:
+        prefix = kind + '.weights.'
+        return {profile: WeightTable(profile, self.header['periods'], matrix.T)
+                for profile, matrix in self.arrays(prefix).items()}
+
+
+# ----------------------------------------------------------------------
+# Compilation
+# ----------------------------------------------------------------------
+
+def _graph_arrays(kind: str, compiled: CompiledGraph, profiles: Iterable[str]) -> Dict[str, np.ndarray]:
+    arrays = {f'{kind}.{name}': array for name, array in compiled.to_arrays().items()}
+    for profile in profiles:
+        # Stored transposed so that the loaded matrix is Fortran-ordered without a copy
+        arrays[f'{kind}.weights.{profile}'] = compute_weights(compiled, profile).matrix.T
+    return arrays
+
+
+def _hierarchy_prefix(profile: str, period: Optional[str]) -> str:
+    return f"road.ch.{profile}.{period or 'none'}."
+
+
+def _landmarks_prefix(profile: str, period: Optional[str]) -> str:
+    return f"road.alt.{profile}.{period or 'none'}."
+
+
+def compile_snapshot(tn: TransportationNetwork, path: str, content_hash: str,
+                     profiles: Iterable[str] = DEFAULT_PROFILES) -> None:
+    """Compile a loaded TransportationNetwork into a snapshot file at path."""
+    road = tn.compiled_network()
+    combined = tn.compiled_network(include_potential=True)
+    nodes = road.nodes
+
+    table = tn.node_table
+    rows = table.rows(nodes.ids)
+    # -1 marks road endpoints that are neither a neighbourhood nor a facility
+    group = np.where(rows >= 0, table.group[np.maximum(rows, 0)], -1).astype(np.int8)
+    arrays = {
+        'nodes.x': table.take('x', nodes.ids),
+        'nodes.y': table.take('y', nodes.ids),
+        'nodes.population': table.take('population', nodes.ids, 0).astype(np.int64),
+        'nodes.is_facility': (rows >= 0) & table.is_facility[np.maximum(rows, 0)],
+        'nodes.group': group,
+    }
+
+    lines = [(BUS, r['id'], r.get('id'), r['stops'], r.get('buses', 0)) for r in tn.bus_routes]
+    lines += [(METRO, r['id'], r.get('name', r['id']), r['stations'], 0) for r in tn.metro_lines]
+    # Stops missing from the node table cannot be stored and are dropped
+    line_stops = [[nodes[s] for s in stops if s in nodes] for _, _, _, stops, _ in lines]
+    arrays['lines.mode'] = np.array([line[0] for line in lines], dtype=np.int8)
+    arrays['lines.buses'] = np.array([line[4] for line in lines], dtype=np.int32)
+    arrays['lines.offsets'] = np.concatenate(([0], np.cumsum([len(s) for s in line_stops]))).astype(np.int64)
+    arrays['lines.stops'] = np.array([i for stops in line_stops for i in stops], dtype=np.int32)
+
+    arrays.update(_graph_arrays('road', road, profiles))
+    arrays.update(_graph_arrays('combined', combined, COMBINED_PROFILES))
+
+    hierarchies = [(profile, period) for profile in HIERARCHY_PROFILES for period in PERIODS + (None,)]
+    for profile, period in hierarchies:
+        ch = tn.contraction_hierarchy(profile, period)
+        arrays.update({_hierarchy_prefix(profile, period) + name: array for name, array in ch.to_arrays().items()})
+    landmarks = [(profile, period) for profile in LANDMARK_PROFILES for period in PERIODS + (None,)]
+    for profile, period in landmarks:
+        alt = tn.landmarks(profile, period)
+        arrays.update({_landmarks_prefix(profile, period) + name: array for name, array in alt.to_arrays().items()})
+
+    header = {
+        'content_hash': content_hash,
+        'periods': list(PERIODS),
+        'node_ids': nodes.ids,
+        'node_names': [table.names[r] if r >= 0 else None for r in rows.tolist()],
+        'node_types': [table.type_of(r) if r >= 0 else None for r in rows.tolist()],
+        'route_ids': list(road.route_ids),
+        'line_ids': [line[1] for line in lines],
+        'line_names': [line[2] for line in lines],
+        'combined_node_ids': combined.nodes.ids,
+        'hierarchies': [list(key) for key in hierarchies],
+        'landmarks': [list(key) for key in landmarks],
+    }
+    write_snapshot(path, header, arrays)
+
+
+def compile_json_folder(data_dir: str, path: str) -> str:
+    """Compile the JSON files of data_dir into a snapshot file; returns its content hash."""
+    from .snapshot import hash_data_folder
+
+    content_hash = hash_data_folder(data_dir)
+    compile_snapshot(TransportationNetwork.from_json_folder(data_dir), path, content_hash)
+    return content_hash
+
+
+def compile_csv_files(path: str, neighborhoods_file: str, facilities_file: str, existing_roads_file: str,
+                      potential_roads_file: str, traffic_file: str, metro_file: str, bus_file: str,
+                      demand_file: str) -> str:
+    """Compile the CSV inputs of utils.data_loader.load_data_from_csv into a snapshot file."""
+    from ..models.graph import CairoTransportationGraph
+    from ..utils.data_loader import load_data_from_csv
+
+    files = [neighborhoods_file, facilities_file, existing_roads_file, potential_roads_file,
+             traffic_file, metro_file, bus_file, demand_file]
+    graph = CairoTransportationGraph()
+    load_data_from_csv(graph, *files)
+    content_hash = hash_files(files)
+    compile_snapshot(TransportationNetwork.from_cairo_graph(graph), path, content_hash)
+    return content_hash
+
+
+# ----------------------------------------------------------------------
+# Loading
+# ----------------------------------------------------------------------
+
+def load_network(path: str, cls=TransportationNetwork) -> TransportationNetwork:
+    """
+    Build a TransportationNetwork from a snapshot file.
+    Only the small node and line tables are turned into Python objects up front.
+    """
+    snap = SnapshotFile(path)
+    header = snap.header
+    nodes = NodeIndex(header['node_ids'])
+
+    # The node table wraps the mapped columns; no per-node dicts are created
+    group = snap.array('nodes.group')
+    known = np.flatnonzero(group >= 0)
+    subset = slice(None) if len(known) == len(group) else known
+    table = NodeTable.from_columns(
+        [nodes.ids[i] for i in known.tolist()],
+        [header['node_names'][i] for i in known.tolist()],
+        [header['node_types'][i] for i in known.tolist()],
+        snap.array('nodes.population')[subset], snap.array('nodes.x')[subset], snap.array('nodes.y')[subset],
+        group[subset], (NEIGHBOURHOOD_KEYS, FACILITY_KEYS), snap.array('nodes.is_facility')[subset])
+
+    offsets, stops = snap.array('lines.offsets'), snap.array('lines.stops')
+    modes, buses = snap.array('lines.mode'), snap.array('lines.buses')
+    bus_routes, metro_lines = [], []
+    for i, line_id in enumerate(header['line_ids']):
+        line_stops = [nodes.ids[s] for s in stops[offsets[i]:offsets[i + 1]]]
+        if modes[i] == BUS:
+            bus_routes.append({'id': line_id, 'stops': line_stops, 'buses': int(buses[i])})
+        else:
+            metro_lines.append({'id': line_id, 'name': header['line_names'][i], 'stations': line_stops})
+
+    tn = cls(table.group_view(0), table.group_view(1), bus_routes, metro_lines, roads=[], flow={}, potential_roads=[])
+    road = snap.compiled_graph('road', nodes)
+    combined = snap.compiled_graph('combined', NodeIndex(header['combined_node_ids']))
+    tn._adopt_compiled(road, combined)
+    tn.snapshot_file = snap
+
+    for profile, table in snap.weight_tables('road').items():
+        tn._seed_cache(tn._weights_key(profile), table)
+    for profile, table in snap.weight_tables('combined').items():
+        tn._seed_cache(tn._weights_key(profile, include_potential=True), table)
+    # Hierarchies and landmarks are optional; files written without them build them on first use
+    for profile, period in header.get('hierarchies', []):
+        ch = ContractionHierarchy.from_arrays(nodes, snap.arrays(_hierarchy_prefix(profile, period)))
+        tn._seed_cache(tn._hierarchy_key(profile, period), ch)
+    for profile, period in header.get('landmarks', []):
+        landmarks = Landmarks.from_arrays(nodes, snap.arrays(_landmarks_prefix(profile, period)))
+        tn._seed_cache(tn._landmarks_key(profile, period), landmarks)
+    return tn
+
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() else value
+
+
+def _roads_from_graph(g: CompiledGraph, potential: bool) -> List[Dict]:
+    ids = g.nodes.ids
+    mask = g.potential if potential else ~g.potential
+    rows = zip(g.edge_u[mask].tolist(), g.edge_v[mask].tolist(), g.dist_km[mask].tolist(),
+               g.capacity[mask].tolist(), g.condition[mask].tolist())
+    return [{'from': ids[u], 'to': ids[v], 'dist_km': d, 'cap': _number(c), 'cond': _number(k)}
+            for u, v, d, c, k in rows]
+
+
+def _flow_from_graph(g: CompiledGraph) -> Dict:
+    ids = g.nodes.ids
+    flow = {}
+    for e in np.flatnonzero(g.has_flow).tolist():
+        rec = {p: _number(x) for p, x in zip(g.periods, g.flow[e].tolist())}
+        u, v = ids[g.edge_u[e]], ids[g.edge_v[e]]
+        flow[(u, v)] = rec
+        flow[(v, u)] = rec
+    return flow
+
+
+def is_snapshot_file(path: Optional[str]) -> bool:
+    """True if path is an existing file that starts with the snapshot magic."""
+    if not path or not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+if __name__ == '__main__':
+    # python -m app.graph.snapshot_file <data_dir> <out.snap>
+    # python -m app.graph.snapshot_file --csv <out.snap> <eight CSV files in load_data_from_csv order>
+    args = sys.argv[1:]
+    if args and args[0] == '--csv':
+        digest = compile_csv_files(*args[1:])
+        out = args[1]
+    else:
+        data_dir = args[0] if len(args) > 0 else 'data'
+        out = args[1] if len(args) > 1 else 'network.snap'
+        digest = compile_json_folder(data_dir, out)
+    print(f'Wrote {out} (content hash {digest[:12]})')
@@ -0,0 +1,209 @@
+"""
+Vectorized edge weights for every traffic period.
+Each cost profile turns the arrays of a CompiledGraph into an
+edges x periods matrix in one NumPy pass, so routing code indexes a
+column instead of re-evaluating the formula edge by edge.
+"""
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from .compiled import BUS, METRO, CompiledGraph
+
+# Priority factors of EmergencyRouter.calculate_emergency_weight
+EMERGENCY_PRIORITY = {
+    "ambulance": 1.5,
+    "fire_truck": 1.3,
+    "police": 1.2,
+}
+
+# Emergency profile argument of vehicle types without a priority factor (they get 1.0)
+UNPRIORITISED = 'other'
+
+# (base speed km/h, priority factor) of services.pathfinding.emergency_route_astar
+EMERGENCY_SPEEDS = {
+    "ambulance": (60, 0.8),
+    "fire": (55, 0.85),
+    "police": (70, 0.9),
+}
+
+# Profiles precomputed when a snapshot is built
+DEFAULT_PROFILES = (
+    'congestion',
+    'combined',
+    'travel_time',
+    'route_time',
+    'emergency:ambulance',
+    'emergency:fire_truck',
+    'emergency:police',
+    'emergency_response:ambulance',
+    'emergency_response:fire_truck',
+    'emergency_response:police',
+)
+
+
+class WeightTable:
+    """
+    Edge weights of one cost profile for every period.
+    Column j holds period j of the compiled graph; the last column is used
+    for periods without traffic data (all flows zero).
+    """
+
+    __slots__ = ('profile', 'periods', 'matrix')
+
+    def __init__(self, profile: str, periods: Sequence[str], matrix: np.ndarray):
+        self.profile = profile
+        self.periods = tuple(periods)
+        # Fortran order keeps every period column contiguous
+        self.matrix = np.asfortranarray(matrix, dtype=np.float64)
+
+    def column_index(self, period: Optional[str]) -> int:
+        try:
+            return self.periods.index(period)
+        except ValueError:
+            return len(self.periods)
+
+    def column(self, period: Optional[str]) -> np.ndarray:
+        """Weights of all edges for period."""
+        return self.matrix[:, self.column_index(period)]
+
+    def __repr__(self) -> str:
+        return f"WeightTable({self.profile!r}, shape={self.matrix.shape})"
+
+
+def _flow_ratio(g: CompiledGraph) -> np.ndarray:
+    """flow / capacity as an edges x (periods + 1) matrix, zero where capacity is zero."""
+    flow = np.zeros((g.num_edges, len(g.periods) + 1), dtype=np.float64)
+    flow[:, :-1] = g.flow
+    cap = g.capacity.astype(np.float64)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(cap > 0, flow / cap, 0.0)
+    return ratio
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = numerator / denominator
+    return np.where(np.isfinite(out), out, np.inf)
+
+
+def _dist(g: CompiledGraph) -> np.ndarray:
+    return g.dist_km[:, None]
+
+
+def congestion_weights(g: CompiledGraph) -> np.ndarray:
+    """dist * flow / capacity, as in TransportationNetwork.build_road_network."""
+    return _dist(g) * _flow_ratio(g)
+
+
+def combined_weights(g: CompiledGraph) -> np.ndarray:
+    """dist * (1 + flow / capacity), as in TransportationNetwork.build_combined_road_network."""
+    return _dist(g) * (1 + _flow_ratio(g))
+
+
+def travel_time_weights(g: CompiledGraph, base_speed: float = 50, speed_factor: float = 1.0) -> np.ndarray:
+    """
+    Minutes at base_speed scaled by road condition and congestion,
+    as in services.pathfinding.compute_travel_time.
+    """
+    traffic_factor = np.where(g.has_flow[:, None], np.maximum(0.2, 1 - _flow_ratio(g)), 0.8)
+    speed = (base_speed * g.condition.astype(np.float64) / 10)[:, None]
+    return _safe_divide(_dist(g), speed * traffic_factor * speed_factor) * 60
+
+
+def route_time_weights(g: CompiledGraph) -> np.ndarray:
+    """
+    Minutes reported by api.flow_optimization.calculate_total_time.
+    Road graphs carry no 'traffic' attribute, so it assumes 90 km/h at a 0.8 traffic factor.
+    """
+    minutes = g.dist_km / (90 * 0.8) * 60
+    return np.repeat(minutes[:, None], len(g.periods) + 1, axis=1)
+
+
+def timed_route_weights(g: CompiledGraph) -> np.ndarray:
+    """
+    route_time minutes slowed by each period's congestion as compute_travel_time slows
+    them, so the flow-free column and roads without traffic data equal route_time.
+    """
+    slowdown = np.where(g.has_flow[:, None], 1 / np.maximum(0.2, 1 - _flow_ratio(g)), 1.0)
+    return route_time_weights(g) * slowdown
+
+
+def emergency_weights(g: CompiledGraph, emergency_type: str = 'ambulance') -> np.ndarray:
+    """
+    dist / (traffic impact * priority), as in EmergencyRouter.calculate_emergency_weight.
+    Emergency vehicles keep at least 30% of their speed in full congestion.
+    """
+    impact = np.maximum(0.3, 1.0 - _flow_ratio(g) * 0.7)
+    priority = EMERGENCY_PRIORITY.get(emergency_type, 1.0)
+    return _dist(g) / (impact * priority)
+
+
+def emergency_vehicle(emergency_type: str) -> str:
+    """Argument of the emergency profiles for a vehicle type, so unknown types share one profile."""
+    return emergency_type if emergency_type in EMERGENCY_PRIORITY else UNPRIORITISED
+
+
+def emergency_response_weights(g: CompiledGraph, emergency_type: str = 'ambulance') -> np.ndarray:
+    """Response minutes at 80 km/h, as in EmergencyRouter.calculate_response_time."""
+    impact = np.maximum(0.3, 1.0 - _flow_ratio(g) * 0.7)
+    priority = EMERGENCY_PRIORITY.get(emergency_type, 1.0)
+    return _dist(g) / (80 * impact * priority) * 60
+
+
+def emergency_time_weights(g: CompiledGraph, emergency_type: str = 'ambulance') -> np.ndarray:
+    """Minutes of the emergency vehicle model in services.pathfinding.emergency_route_astar."""
+    base, priority = EMERGENCY_SPEEDS.get(emergency_type, EMERGENCY_SPEEDS['police'])
+    speed = (base * g.condition.astype(np.float64) / 10)[:, None]
+    traffic_factor = np.where(g.has_flow[:, None], np.maximum(0.4, 1 - _flow_ratio(g) * 0.6), 0.9)
+    return _safe_divide(_dist(g), speed * traffic_factor) * 60 * priority
+
+
+def multimodal_weights(g: CompiledGraph) -> np.ndarray:
+    """
+    Minutes of services.pathfinding.multimodal_route: roads at 40 km/h scaled by
+    condition and congestion, metro at 60 km/h plus 2 minutes per stop, buses at 25 km/h.
+    """
+    weights = travel_time_weights(g, base_speed=40)
+    metro = g.mode == METRO
+    bus = g.mode == BUS
+    weights[metro] = (g.dist_km[metro] / 60 * 60 + 2)[:, None]
+    weights[bus] = (g.dist_km[bus] / 25 * 60)[:, None]
+    return weights
+
+
+def distance_weights(g: CompiledGraph) -> np.ndarray:
+    """Plain dist_km for every period."""
+    return np.repeat(g.dist_km[:, None], len(g.periods) + 1, axis=1)
+
+
+PROFILES: Dict[str, Callable[..., np.ndarray]] = {
+    'distance': distance_weights,
+    'congestion': congestion_weights,
+    'combined': combined_weights,
+    'travel_time': travel_time_weights,
+    'route_time': route_time_weights,
+    'timed_route': timed_route_weights,
+    'emergency': emergency_weights,
+    'emergency_response': emergency_response_weights,
+    'emergency_time': emergency_time_weights,
+    'multimodal': multimodal_weights,
+}
+
+
+def compute_weights(g: CompiledGraph, profile: str) -> WeightTable:
+    """
+    Compute the edges x periods matrix of profile.
+    Parametrised profiles take their argument after a colon, e.g. 'emergency:police'.
+    """
+    name, _, arg = profile.partition(':')
+    if name not in PROFILES:
+        raise ValueError(f"Unknown weight profile: {profile}")
+    func = PROFILES[name]
+    matrix = func(g, arg) if arg else func(g)
+    return WeightTable(profile, g.periods, matrix)
+
+
+def compute_all(g: CompiledGraph, profiles: Iterable[str] = DEFAULT_PROFILES) -> Dict[str, WeightTable]:
+    """Compute several profiles at once, keyed by profile name."""
+    return {profile: compute_weights(g, profile) for profile in profiles}
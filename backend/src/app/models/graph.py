@@ -9,6 +9,11 @@ class CairoTransportationGraph:
         self.bus_routes = []
         self.traffic_data = {}
         self.transport_demand = {}
+        # Bumped by invalidate_caches(); derived data is rebuilt for a new version
+        self.data_version = 0
+        self._road_distances = None
+        self._multimodal_routers = {}
+        self._road_engines = {}
         
     def build_networkx_graph(self, include_potential=False, include_transit=True):
         """
@@ -99,6 +104,103 @@ class CairoTransportationGraph:
             
         return G
     
+    def build_compiled_graph(self, include_potential=False, include_transit=True):
+        """
+        Create the array-backed (CSR) form of the loaded data.
+        See app.graph.compiled.CompiledGraph for the layout.
+        
+        Args:
+            include_potential: If True, include potential roads in the graph
+            include_transit: If True, include metro and bus connections
+        """
+        from ..graph.compiled import CompiledGraph
+        return CompiledGraph.from_cairo_graph(self, include_potential, include_transit)
+    
+    def compact_nodes(self):
+        """
+        Replace the node dicts with an interned, column-backed NodeTable.
+        The table is a read-only mapping, so call this once loading is finished.
+        """
+        from ..graph.nodes import NodeTable
+        if isinstance(self.nodes, NodeTable):
+            return self.nodes
+        self.nodes = NodeTable.from_items(self.nodes.items())
+        return self.nodes
+    
+    def invalidate_caches(self):
+        """
+        Drop derived data (e.g. bus-stop road distances) after changing the loaded data.
+        Every change to nodes, roads, traffic_data, bus_routes or metro_lines, whether in
+        place or by reassignment, must be followed by a call; the caches below are keyed
+        on data_version alone and do not notice edits on their own.
+        """
+        self.data_version += 1
+        self._road_distances = None
+        self._multimodal_routers = {}
+        self._road_engines = {}
+    
+    def road_distance_resolver(self):
+        """
+        Road-only shortest distances between node pairs, cached per data version
+        (see invalidate_caches()).
+        """
+        from ..graph.compiled import DistanceResolver
+        if self._road_distances is None or self._road_distances[0] != self.data_version:
+            roads = self.build_compiled_graph(include_potential=False, include_transit=False)
+            self._road_distances = (self.data_version, DistanceResolver(roads))
+        return self._road_distances[1]
+    
+    def multimodal_router(self, time_of_day='morning'):
+        """
+        Layered road + transit router of services.pathfinding.multimodal_route for one
+        time of day, cached per data version like road_distance_resolver().
+        """
+        from ..algorithm.multimodal import MultimodalRouter
+        cached = self._multimodal_routers.get(time_of_day)
+        if cached is None or cached[0] != self.data_version:
+            cached = self._multimodal_routers[time_of_day] = (
+                self.data_version, MultimodalRouter.from_cairo_graph(self, time_of_day))
+        return cached[1]
+    
+    def road_weights(self, profile):
+        """
+        (compiled existing roads, graph.weights WeightTable of profile over them), cached
+        per data version like road_distance_resolver().
+        """
+        from ..graph.weights import compute_weights
+        roads = self._road_engines.get('roads')
+        if roads is None or roads[0] != self.data_version:
+            compiled = self.build_compiled_graph(include_potential=False, include_transit=False)
+            roads = self._road_engines['roads'] = (self.data_version, compiled)
+        table = self._road_engines.get(profile)
+        if table is None or table[0] != self.data_version:
+            table = self._road_engines[profile] = (self.data_version, compute_weights(roads[1], profile))
+        return roads[1], table[1]
+    
+    def road_engine(self, profile, time_of_day=None, landmarks=False):
+        """
+        RouteEngine (algorithm.search) over the existing roads with the road_weights() of
+        one profile and time of day, cached per data version like road_distance_resolver().
+        With landmarks the engine also gets an ALT table (algorithm.landmarks) of the same
+        weights, built on first request, so astar_path() is guided by it.
+        """
+        from ..algorithm.landmarks import Landmarks
+        from ..algorithm.search import RouteEngine
+        from ..graph.networks import PERIODS
+        period = time_of_day if time_of_day in PERIODS else None
+        cached = self._road_engines.get((profile, period))
+        if cached is None or cached[0] != self.data_version:
+            compiled, table = self.road_weights(profile)
+            # Nodes without coordinates leave the engine without a great-circle bound
+            x = [self.nodes[n].get('x', float('nan')) for n in compiled.nodes.ids]
+            y = [self.nodes[n].get('y', float('nan')) for n in compiled.nodes.ids]
+            engine = RouteEngine(compiled, table.column(period), x, y)
+            cached = self._road_engines[(profile, period)] = (self.data_version, engine)
+        engine = cached[1]
+        if landmarks and engine.landmarks is None:
+            engine.landmarks = Landmarks.build(engine.graph, self.road_weights(profile)[1].column(period))
+        return engine
+    
     def _add_metro_connections(self, G):
         """Add metro connections to the graph"""
         connections_added = 0
@@ -152,6 +254,16 @@ class CairoTransportationGraph:
         """Add bus connections to the graph"""
         connections_added = 0
         
+        # Resolve the road distance of every stop pair up front, one bounded search per origin
+        stop_pairs = []
+        for route_id, stops_str, buses_assigned, passengers in self.bus_routes:
+            try:
+                stops = stops_str.replace('"', '').split(',')
+            except AttributeError:
+                continue
+            stop_pairs.extend((a, b) for a, b in zip(stops, stops[1:]) if a in G and b in G)
+        road_distances = self.road_distance_resolver().distances(stop_pairs)
+        
         for route_id, stops_str, buses_assigned, passengers in self.bus_routes:
             try:
                 # Parse stop IDs
@@ -168,14 +280,8 @@ class CairoTransportationGraph:
                     # Calculate distance (either using the road network or straight-line)
                     distance = 0
                     
-                    # First try to find a road path
-                    try:
-                        path = nx.shortest_path(G, source=from_id, target=to_id, weight='distance')
-                        # Only use if the path exists and only contains road edges
-                        if all(G[path[j]][path[j+1]].get('type') == 'road' for j in range(len(path)-1)):
-                            distance = sum(G[path[j]][path[j+1]]['distance'] for j in range(len(path)-1))
-                    except (nx.NetworkXNoPath, KeyError):
-                        pass
+                    # First try the shortest path over existing roads only
+                    distance = road_distances.get((from_id, to_id)) or 0
                     
                     # If road path not found, use straight-line distance
                     if distance == 0:
@@ -1,5 +1,20 @@
 import networkx as nx
-import math  # For Haversine calculations
+
+def _no_path_result(G, start_id, end_id):
+    """
+    Failure result for two nodes without a path between them.
+    Components are only computed here, after the search itself has failed,
+    so successful queries no longer pay for a separate nx.has_path() pass.
+    """
+    components = list(nx.connected_components(G))
+    start_component = next((i for i, comp in enumerate(components) if start_id in comp), None)
+    end_component = next((i for i, comp in enumerate(components) if end_id in comp), None)
+    
+    return {
+        'success': False,
+        'message': f"No path exists between {start_id} and {end_id} - they are in disconnected parts of the network",
+        'details': f"Node {start_id} is in component {start_component+1}, Node {end_id} is in component {end_component+1}"
+    }
 
 def find_shortest_path(graph, start_id, end_id, weight='distance'):
     """Find shortest path between two nodes based on specified weight."""
@@ -18,22 +33,9 @@ def find_shortest_path(graph, start_id, end_id, weight='distance'):
             'message': f"End node {end_id} not found in the transportation network"
         }
     
-    # Check if nodes are in the same connected component
-    if not nx.has_path(G, start_id, end_id):
-        # Get the connected components
-        components = list(nx.connected_components(G))
-        start_component = next((i for i, comp in enumerate(components) if start_id in comp), None)
-        end_component = next((i for i, comp in enumerate(components) if end_id in comp), None)
-        
-        return {
-            'success': False,
-            'message': f"No path exists between {start_id} and {end_id} - they are in disconnected parts of the network",
-            'details': f"Node {start_id} is in component {start_component+1}, Node {end_id} is in component {end_component+1}"
-        }
-    
     try:
         path = nx.shortest_path(G, source=start_id, target=end_id, weight=weight)
-        distance = nx.shortest_path_length(G, source=start_id, target=end_id, weight=weight)
+        distance = nx.path_weight(G, path, weight)
         
         # Get the names of locations in the path
         path_names = [graph.nodes[node_id]['name'] for node_id in path]
@@ -45,83 +47,47 @@ def find_shortest_path(graph, start_id, end_id, weight='distance'):
             'distance': distance
         }
     except nx.NetworkXNoPath:
-        return {
-            'success': False,
-            'message': f"No path found between {start_id} and {end_id}"
-        }
+        return _no_path_result(G, start_id, end_id)
 
 def compute_travel_time(graph, start_id, end_id, time_of_day='morning', speed_factor=1.0):
-    """Compute estimated travel time between two points based on distance and traffic."""
-    G = graph.build_networkx_graph()
-    
+    """
+    Compute estimated travel time between two points based on distance and traffic.
+    Roads are weighed by the cached 'travel_time' column of graph.road_engine().
+    """
     # First check if both nodes exist
-    if start_id not in G:
+    if start_id not in graph.nodes:
         return {
             'success': False,
             'message': f"Start node {start_id} not found in the transportation network"
         }
     
-    if end_id not in G:
+    if end_id not in graph.nodes:
         return {
             'success': False,
             'message': f"End node {end_id} not found in the transportation network"
         }
     
-    # Check if nodes are in the same connected component
-    if not nx.has_path(G, start_id, end_id):
-        # Get the connected components
-        components = list(nx.connected_components(G))
-        start_component = next((i for i, comp in enumerate(components) if start_id in comp), None)
-        end_component = next((i for i, comp in enumerate(components) if end_id in comp), None)
-        
-        return {
-            'success': False,
-            'message': f"No path exists between {start_id} and {end_id} - they are in disconnected parts of the network",
-            'details': f"Node {start_id} is in component {start_component+1}, Node {end_id} is in component {end_component+1}"
-        }
-    
-    # Set travel time as edge weight based on distance and traffic
-    for u, v, data in G.edges(data=True):
-        distance = data['distance']
-        # Base speed in km/h - adjust based on road condition
-        base_speed = 50 * (data['condition'] / 10)
-        
-        # Check if we have traffic data for this road
-        road_id = (str(u), str(v))
-        if road_id in graph.traffic_data:
-            traffic = graph.traffic_data[road_id][time_of_day]
-            capacity = data['capacity']
-            # Traffic factor: reduces speed when congested
-            traffic_factor = max(0.2, 1 - (traffic / capacity))
-        else:
-            # Default traffic factor if no data
-            traffic_factor = 0.8
-            
-        # Calculate time in minutes
-        time = (distance / (base_speed * traffic_factor * speed_factor)) * 60
-        G[u][v]['time'] = time
-    
     # Find path with lowest travel time
+    engine = graph.road_engine('travel_time', time_of_day)
     try:
-        path = nx.shortest_path(G, source=start_id, target=end_id, weight='time')
-        total_time = sum(G[path[i]][path[i+1]]['time'] for i in range(len(path)-1))
-        
-        return {
-            'success': True,
-            'path': path,
-            'path_names': [graph.nodes[node_id]['name'] for node_id in path],
-            'total_time_minutes': total_time,
-            'total_distance_km': sum(G[path[i]][path[i+1]]['distance'] for i in range(len(path)-1))
-        }
+        total_time, path = engine.shortest_path(start_id, end_id, heuristic=False)
     except nx.NetworkXNoPath:
-        return {
-            'success': False,
-            'message': f"No path found between {start_id} and {end_id}"
-        }
+        return _no_path_result(graph.build_networkx_graph(include_transit=False), start_id, end_id)
+    
+    roads = engine.graph
+    edges = roads.path_edges([roads.nodes[node_id] for node_id in path])
+    return {
+        'success': True,
+        'path': path,
+        'path_names': [graph.nodes[node_id]['name'] for node_id in path],
+        'total_time_minutes': total_time / speed_factor,
+        'total_distance_km': float(roads.dist_km[edges].sum())
+    }
 
 def emergency_route_astar(graph, start_id, end_id, time_of_day='morning', emergency_type='ambulance'):
     """
     Use A* search algorithm to find optimal emergency vehicle routes.
+    Roads are weighed by the cached 'emergency_time' column of graph.road_engine().
     
     Args:
         start_id: Starting location ID
@@ -132,160 +98,97 @@ def emergency_route_astar(graph, start_id, end_id, time_of_day='morning', emerge
     Returns:
         Dictionary containing the optimal route and related information
     """
-    G = graph.build_networkx_graph()
-    
     # Check if both nodes exist in the graph
-    if start_id not in G:
+    if start_id not in graph.nodes:
         return {
             'success': False,
             'message': f"Start node {start_id} not found in the transportation network"
         }
     
-    if end_id not in G:
+    if end_id not in graph.nodes:
         return {
             'success': False,
             'message': f"End node {end_id} not found in the transportation network"
         }
     
-    # Check if nodes are in the same connected component
-    if not nx.has_path(G, start_id, end_id):
-        # Get the connected components
-        components = list(nx.connected_components(G))
-        start_component = next((i for i, comp in enumerate(components) if start_id in comp), None)
-        end_component = next((i for i, comp in enumerate(components) if end_id in comp), None)
-        
-        return {
-            'success': False,
-            'message': f"No path exists between {start_id} and {end_id} - they are in disconnected parts of the network",
-            'details': f"Node {start_id} is in component {start_component+1}, Node {end_id} is in component {end_component+1}"
-        }
+    # Types other than ambulance and fire are routed as police cars (graph.weights.EMERGENCY_SPEEDS)
+    vehicle = emergency_type if emergency_type in ('ambulance', 'fire') else 'police'
+    profile = f'emergency_time:{vehicle}'
+    engine = graph.road_engine(profile, time_of_day, landmarks=True)
+    roads, table = graph.road_weights(profile)
+    minutes = table.column(time_of_day)
     
-    # Set travel time as edge weight, considering emergency vehicle advantages
-    for u, v, data in G.edges(data=True):
-        distance = data['distance']
-        condition = data.get('condition', 7)  # Default condition if not specified
-        
-        # Base speed in km/h - emergency vehicles can go faster
-        # Different emergency types might have different speed capabilities
-        if emergency_type == 'ambulance':
-            base_speed = 60 * (condition / 10)
-            priority_factor = 0.8  # Ambulances get highest priority
-        elif emergency_type == 'fire':
-            base_speed = 55 * (condition / 10)
-            priority_factor = 0.85  # Fire trucks slightly slower due to size
-        else:  # police
-            base_speed = 70 * (condition / 10)
-            priority_factor = 0.9  # Police cars can go fastest
-        
-        # Check if we have traffic data for this road
+    try:
+        # A* guided by the ALT landmark bound on the remaining minutes
+        total_time, path = engine.shortest_path(start_id, end_id)
+    except nx.NetworkXNoPath:
+        return _no_path_result(graph.build_networkx_graph(include_transit=False), start_id, end_id)
+    
+    nodes = [roads.nodes[node_id] for node_id in path]
+    edges = roads.path_edges(nodes)
+    total_distance = float(roads.dist_km[edges].sum())
+    
+    # Get path details including critical intersections
+    path_details = []
+    for i, e in enumerate(edges):
+        u, v = path[i], path[i+1]
         road_id = (str(u), str(v))
+        traffic_level = "Unknown"
+        
         if road_id in graph.traffic_data:
             traffic = graph.traffic_data[road_id][time_of_day]
-            capacity = data['capacity']
-            # Traffic impact is reduced for emergency vehicles
-            traffic_factor = max(0.4, 1 - (traffic / capacity) * 0.6)
-        else:
-            # Default traffic factor if no data
-            traffic_factor = 0.9
-            
-        # Calculate time in minutes - emergency vehicles get priority lanes and signals
-        time = (distance / (base_speed * traffic_factor)) * 60 * priority_factor
-        G[u][v]['time'] = time
+            capacity = roads.capacity[e]
+            congestion = traffic / capacity
+            if congestion > 0.8:
+                traffic_level = "High"
+            elif congestion > 0.5:
+                traffic_level = "Medium"
+            else:
+                traffic_level = "Low"
+        
+        # Identify if this is a critical intersection (more than two roads meet)
+        is_critical_intersection = bool(roads.offsets[nodes[i+1] + 1] - roads.offsets[nodes[i+1]] > 2)
+        
+        path_details.append({
+            'from_id': u,
+            'to_id': v,
+            'from_name': graph.nodes[u]['name'],
+            'to_name': graph.nodes[v]['name'],
+            'distance': float(roads.dist_km[e]),
+            'time': float(minutes[e]),
+            'traffic_level': traffic_level,
+            'is_critical_intersection': is_critical_intersection,
+            'is_facility': graph.nodes[v]['is_facility'],
+            'facility_type': graph.nodes[v]['type'] if graph.nodes[v]['is_facility'] else None
+        })
     
-    # Define heuristic function for A* (Haversine distance)
-    def heuristic(n1, n2):
-        # Use coordinates to calculate Haversine distance
-        x1, y1 = graph.nodes[n1]['x'], graph.nodes[n1]['y']
-        x2, y2 = graph.nodes[n2]['x'], graph.nodes[n2]['y']
-        
-        # Use Haversine for more accurate distance
-        # Convert decimal degrees to radians
-        lon1, lat1 = math.radians(x1), math.radians(y1)
-        lon2, lat2 = math.radians(x2), math.radians(y2)
-        
-        # Haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Radius of earth in kilometers
-        distance = c * r
-        
-        # Convert to minutes at emergency speed (90 km/h)
-        return (distance / 90) * 60  # Convert to minutes
+    # Compare with normal route (dijkstra) over the same minutes, without priority lanes
+    normal_time = engine.distance(start_id, end_id) / 0.8
     
-    try:
-        # Use NetworkX's A* search algorithm with our custom heuristic
-        path = nx.astar_path(G, source=start_id, target=end_id, 
-                             heuristic=lambda n1, n2: heuristic(n1, n2),
-                             weight='time')
-        
-        # Calculate total time and distance
-        total_time = sum(G[path[i]][path[i+1]]['time'] for i in range(len(path)-1))
-        total_distance = sum(G[path[i]][path[i+1]]['distance'] for i in range(len(path)-1))
-        
-        # Get path details including critical intersections
-        path_details = []
-        for i in range(len(path)-1):
-            u, v = path[i], path[i+1]
-            road_id = (str(u), str(v))
-            traffic_level = "Unknown"
-            
-            if road_id in graph.traffic_data:
-                traffic = graph.traffic_data[road_id][time_of_day]
-                capacity = G[u][v]['capacity']
-                congestion = traffic / capacity
-                if congestion > 0.8:
-                    traffic_level = "High"
-                elif congestion > 0.5:
-                    traffic_level = "Medium"
-                else:
-                    traffic_level = "Low"
-            
-            # Identify if this is a critical intersection (multiple connections)
-            is_critical_intersection = G.degree[v] > 2
-            
-            path_details.append({
-                'from_id': u,
-                'to_id': v,
-                'from_name': graph.nodes[u]['name'],
-                'to_name': graph.nodes[v]['name'],
-                'distance': G[u][v]['distance'],
-                'time': G[u][v]['time'],
-                'traffic_level': traffic_level,
-                'is_critical_intersection': is_critical_intersection,
-                'is_facility': graph.nodes[v]['is_facility'],
-                'facility_type': graph.nodes[v]['type'] if graph.nodes[v]['is_facility'] else None
-            })
-        
-        # Compare with normal route (dijkstra)
-        normal_path = nx.shortest_path(G, source=start_id, target=end_id, weight='time')
-        normal_time = sum(G[normal_path[i]][normal_path[i+1]]['time'] / 0.8 for i in range(len(normal_path)-1))
-        
-        time_saved = normal_time - total_time
-        
-        return {
-            'success': True,
-            'path': path,
-            'path_names': [graph.nodes[node_id]['name'] for node_id in path],
-            'path_details': path_details,
-            'total_time_minutes': total_time,
-            'total_distance_km': total_distance,
-            'emergency_type': emergency_type,
-            'time_of_day': time_of_day,
-            'time_saved_vs_normal': time_saved,
-            'percent_improvement': (time_saved / normal_time) * 100 if normal_time > 0 else 0
-        }
-    except nx.NetworkXNoPath:
-        return {
-            'success': False,
-            'message': f"No path found between {start_id} and {end_id}"
-        }
+    time_saved = normal_time - total_time
+    
+    return {
+        'success': True,
+        'path': path,
+        'path_names': [graph.nodes[node_id]['name'] for node_id in path],
+        'path_details': path_details,
+        'total_time_minutes': total_time,
+        'total_distance_km': total_distance,
+        'emergency_type': emergency_type,
+        'time_of_day': time_of_day,
+        'time_saved_vs_normal': time_saved,
+        'percent_improvement': (time_saved / normal_time) * 100 if normal_time > 0 else 0
+    }
 
 def multimodal_route(graph, start_id, end_id, time_of_day='morning', preferred_modes=None, max_transfers=None):
     """
     Find the optimal route using all available transportation modes.
     
+    The search runs on the layered road + transit graph of graph.multimodal_router(),
+    where boarding a bus or metro costs the average wait and every change between
+    legs (road, or one bus route or metro line) counts as a transfer. With
+    max_transfers the result is the fastest route within that many transfers.
+    
     Args:
         graph: The transportation graph object
         start_id: Starting location ID
@@ -297,411 +200,212 @@ def multimodal_route(graph, start_id, end_id, time_of_day='morning', preferred_m
                       If None, no limit is imposed
                       
     Returns:
-        Dictionary containing the optimal route and related information
+        Dictionary containing the optimal route and related information. When routes
+        exist but none within max_transfers, success is False and max_transfers_exceeded
+        is True.
     """
-    # First, make sure we're using a complete graph with all transportation modes
-    G = graph.build_networkx_graph(include_potential=False)
-    
     # Check if both nodes exist in the graph
-    if start_id not in G:
+    if start_id not in graph.nodes:
         return {
             'success': False,
             'message': f"Start node {start_id} not found in the transportation network"
         }
     
-    if end_id not in G:
+    if end_id not in graph.nodes:
         return {
             'success': False,
             'message': f"End node {end_id} not found in the transportation network"
         }
     
-    # Check if nodes are in the same connected component
-    if not nx.has_path(G, start_id, end_id):
-        # Get the connected components
-        components = list(nx.connected_components(G))
-        start_component = next((i for i, comp in enumerate(components) if start_id in comp), None)
-        end_component = next((i for i, comp in enumerate(components) if end_id in comp), None)
-        
-        return {
-            'success': False,
-            'message': f"No path exists between {start_id} and {end_id} - they are in disconnected parts of the network",
-            'details': f"Node {start_id} is in component {start_component+1}, Node {end_id} is in component {end_component+1}"
-        }
-    
-    # Add metro and bus connections to the graph
-    for u, v, data in list(G.edges(data=True)):
-        data['mode'] = 'road'
-    
-    # Add metro connections
-    metro_edges_added = 0
-    for line_id, name, stations_str, _ in graph.metro_lines:
-        stations = stations_str.replace('"', '').split(',')
-        
-        for i in range(len(stations) - 1):
-            from_id, to_id = stations[i], stations[i+1]
-            
-            # Skip if either node doesn't exist
-            if from_id not in G.nodes or to_id not in G.nodes:
-                continue
-                
-            # Calculate straight-line distance if coordinates are available
-            x1, y1 = G.nodes[from_id]['x'], G.nodes[from_id]['y']
-            x2, y2 = G.nodes[to_id]['x'], G.nodes[to_id]['y']
-            
-            # Use Haversine for more accurate distance if coordinates are geographic
-            if (abs(x1) < 180 and abs(y1) < 90 and abs(x2) < 180 and abs(y2) < 90):
-                # Convert decimal degrees to radians
-                lon1, lat1 = math.radians(x1), math.radians(y1)
-                lon2, lat2 = math.radians(x2), math.radians(y2)
-                
-                # Haversine formula
-                dlon = lon2 - lon1
-                dlat = lat2 - lat1
-                a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-                c = 2 * math.asin(math.sqrt(a))
-                r = 6371  # Radius of earth in kilometers
-                distance = c * r
-            else:
-                # Euclidean distance if not geographic
-                distance = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
-            
-            # Metro is faster than roads - average speed 60 km/h
-            # Add fixed time for metro stops (2 minutes per stop)
-            metro_speed = 60  # km/h
-            travel_time = (distance / metro_speed) * 60  # minutes
-            travel_time += 2  # 2 minutes per station for stopping
-            
-            # Add edge if it doesn't exist, or update if this is faster
-            if not G.has_edge(from_id, to_id) or travel_time < G[from_id][to_id].get('time', float('inf')):
-                G.add_edge(from_id, to_id,
-                          distance=distance,
-                          time=travel_time,
-                          mode='metro',
-                          line=name,
-                          line_id=line_id,
-                          type='metro')
-                metro_edges_added += 1
-                
-    # Add bus connections
-    bus_edges_added = 0
-    for route_id, stops_str, buses_assigned, _ in graph.bus_routes:
-        stops = stops_str.replace('"', '').split(',')
-        
-        for i in range(len(stops) - 1):
-            from_id, to_id = stops[i], stops[i+1]
-            
-            # Skip if either node doesn't exist
-            if from_id not in G.nodes or to_id not in G.nodes:
-                continue
-                
-            # Calculate straight-line distance if coordinates are available
-            x1, y1 = G.nodes[from_id]['x'], G.nodes[from_id]['y']
-            x2, y2 = G.nodes[to_id]['x'], G.nodes[to_id]['y']
-            
-            # Use Haversine for more accurate distance if coordinates are geographic
-            if (abs(x1) < 180 and abs(y1) < 90 and abs(x2) < 180 and abs(y2) < 90):
-                # Convert decimal degrees to radians
-                lon1, lat1 = math.radians(x1), math.radians(y1)
-                lon2, lat2 = math.radians(x2), math.radians(y2)
-                
-                # Haversine formula
-                dlon = lon2 - lon1
-                dlat = lat2 - lat1
-                a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-                c = 2 * math.asin(math.sqrt(a))
-                r = 6371  # Radius of earth in kilometers
-                distance = c * r
-            else:
-                # Euclidean distance if not geographic
-                distance = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
-            
-            # Bus is slower than cars due to stops - average speed 25 km/h
-            # Add waiting time based on frequency
-            bus_speed = 25  # km/h
-            travel_time = (distance / bus_speed) * 60  # minutes
-            
-            # Calculate average waiting time based on frequency
-            frequency = max(5, 60 / max(1, buses_assigned))  # minutes between buses
-            waiting_time = frequency / 2  # average wait is half the frequency
-            
-            # Don't add waiting time to the edge weight directly
-            # Instead store it as a separate attribute
-            
-            # Add edge if it doesn't exist, or update if this is faster
-            if not G.has_edge(from_id, to_id) or travel_time < G[from_id][to_id].get('time', float('inf')):
-                G.add_edge(from_id, to_id,
-                          distance=distance,
-                          time=travel_time,
-                          waiting_time=waiting_time,
-                          mode='bus',
-                          route=route_id,
-                          buses=buses_assigned,
-                          frequency=frequency,
-                          type='bus')
-                bus_edges_added += 1
-    
-    print(f"Added {metro_edges_added} metro edges and {bus_edges_added} bus edges to the multimodal graph")
-    
-    # Calculate travel times for road segments based on traffic
-    road_edges_updated = 0
-    for u, v, data in list(G.edges(data=True)):
-        if data.get('mode') == 'road':
-            distance = data['distance']
-            condition = data.get('condition', 7)  # Default condition
-            base_speed = 40 * (condition / 10)  # Base speed in km/h
-            
-            # Check if we have traffic data for this road
-            road_id = (str(u), str(v))
-            if road_id in graph.traffic_data:
-                traffic = graph.traffic_data[road_id][time_of_day]
-                capacity = data['capacity']
-                traffic_factor = max(0.2, 1 - (traffic / capacity))
-            else:
-                traffic_factor = 0.8  # Default traffic factor
-                
-            # Calculate travel time in minutes
-            travel_time = (distance / (base_speed * traffic_factor)) * 60
-            G[u][v]['time'] = travel_time
-            road_edges_updated += 1
-    
-    print(f"Updated travel times for {road_edges_updated} road edges based on traffic conditions")
-    
-    # Apply preferred modes if specified
-    if preferred_modes:
-        for u, v, data in G.edges(data=True):
-            mode = data.get('mode', 'road')
-            if mode not in preferred_modes:
-                # Add a penalty to non-preferred modes (double the time)
-                G[u][v]['time'] *= 2
-    
-    # Prepare for tracking mode transfers during pathfinding
-    def get_edge_weight(u, v, data):
-        """Custom weight function that penalizes transfers between different modes"""
-        # Base weight is the travel time
-        weight = data['time']
-        
-        # Add waiting time for first bus or metro segment
-        if data.get('mode') == 'bus' and 'waiting_time' in data:
-            weight += data['waiting_time']
-        elif data.get('mode') == 'metro':
-            weight += 3  # Average metro waiting time (3 minutes)
-            
-        return weight
-    
     try:
-        # Find the shortest path considering transfer penalties
-        path = nx.dijkstra_path(G, source=start_id, target=end_id, weight=get_edge_weight)
-        
-        # Calculate total metrics
-        total_time = 0
-        total_distance = 0
-        segments = []
-        transfers = 0
-        current_mode = None
-        transfer_penalty = 0  # Additional time penalty for transfers
-        
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i+1]
-            segment_data = G[u][v]
-            segment_mode = segment_data.get('mode', 'road')
-            
-            # Add the segment's distance
-            segment_distance = segment_data['distance']
-            total_distance += segment_distance
-            
-            # Add the segment's time
-            segment_time = segment_data['time']
-            
-            # Check if this is a transfer and add penalty
-            if current_mode is not None and segment_mode != current_mode:
-                transfers += 1
-                
-                # Add transfer penalty
-                if current_mode == 'road' and segment_mode == 'bus':
-                    transfer_penalty += segment_data.get('waiting_time', 5)
-                elif current_mode == 'road' and segment_mode == 'metro':
-                    transfer_penalty += 3  # Average metro waiting time
-                elif segment_mode == 'bus':
-                    transfer_penalty += segment_data.get('waiting_time', 5)
-                elif segment_mode == 'metro':
-                    transfer_penalty += 3  # Average metro waiting time
-            
-            # Update current mode
-            current_mode = segment_mode
-            
-            # Add to total time
-            total_time += segment_time
-            
-            # Create segment information
-            segment_info = {
-                'from_id': u,
-                'to_id': v,
-                'from_name': graph.nodes[u]['name'],
-                'to_name': graph.nodes[v]['name'],
-                'mode': segment_mode,
-                'type': segment_data.get('type', 'road'),
-                'distance': segment_distance,
-                'time': segment_time
-            }
-            
-            # Add mode-specific details
-            if segment_mode == 'metro':
-                segment_info['line'] = segment_data.get('line', 'Unknown')
-                segment_info['line_id'] = segment_data.get('line_id', 'Unknown')
-            elif segment_mode == 'bus':
-                segment_info['route'] = segment_data.get('route', 'Unknown')
-                segment_info['frequency'] = segment_data.get('frequency', 'Unknown')
-                segment_info['waiting_time'] = segment_data.get('waiting_time', 'Unknown')
-            
-            segments.append(segment_info)
-        
-        # Add transfer penalty to total time
-        total_time += transfer_penalty
-        
-        # Check if we exceeded max_transfers
-        if max_transfers is not None and transfers > max_transfers:
-            # Try to find a route with fewer transfers
-            def transfer_limited_weight(u, v, data):
-                """Weight function that heavily penalizes exceeding transfer limit"""
-                weight = data['time']
-                
-                # Apply a huge penalty if using this edge would exceed the transfer limit
-                if transfers_so_far.get(u, 0) >= max_transfers and data.get('mode') != current_modes.get(u, None):
-                    weight += 1000000  # Very large penalty
-                
-                return weight
-            
-            # Keep track of transfers and modes along the path
-            transfers_so_far = {start_id: 0}
-            current_modes = {start_id: None}
-            
-            # Modified Dijkstra for transfer-limited path
-            # (This is a simplified approach - for a production system you might 
-            # want a more sophisticated algorithm that properly tracks transfers)
-            try:
-                alt_path = []
-                # ... implementation of transfer-limited pathfinding would go here ...
-                # Since this is complex, we'll skip the full implementation
-                # and just use our original path, noting that a proper implementation
-                # would attempt to respect the transfer limit
-            except nx.NetworkXNoPath:
-                # If no alternative path, stick with the original
-                alt_path = path
-            
-            # If we found a better path, use it
-            if alt_path and len(alt_path) > 1:
-                path = alt_path
-                # ... recalculate all metrics for the new path ...
-                # For now, we'll just note the limitation in our response
-        
-        # Group segments by transportation mode for a cleaner representation
-        route_summary = []
-        current_segment = None
-        
-        for segment in segments:
-            if current_segment is None or segment['mode'] != current_segment['mode']:
-                # Start a new segment group
-                if current_segment is not None:
-                    route_summary.append(current_segment)
-                    
-                current_segment = {
-                    'mode': segment['mode'],
-                    'type': segment['type'],
-                    'stops': [segment['from_name'], segment['to_name']],
-                    'stop_ids': [segment['from_id'], segment['to_id']],
-                    'distance': segment['distance'],
-                    'time': segment['time']
+        router = graph.multimodal_router(time_of_day)
+        
+        # Non-preferred modes count double while searching (waits are not penalised)
+        penalties = None
+        if preferred_modes:
+            penalties = {mode: 2.0 for mode in ('road', 'bus', 'metro') if mode not in preferred_modes}
+        
+        route = router.route(start_id, end_id, max_transfers, penalties=penalties)
+        if route is None:
+            # A route that only exists beyond the limit is reported apart from no route at all
+            if max_transfers is not None and router.route(start_id, end_id, penalties=penalties) is not None:
+                return {
+                    'success': False,
+                    'max_transfers_exceeded': True,
+                    'message': f"No route from {start_id} to {end_id} with at most {max_transfers} transfers"
                 }
-                
-                # Add mode-specific details
-                if segment['mode'] == 'metro':
-                    current_segment['line'] = segment.get('line', 'Unknown')
-                    current_segment['line_id'] = segment.get('line_id', 'Unknown')
-                elif segment['mode'] == 'bus':
-                    current_segment['route'] = segment.get('route', 'Unknown')
-                    current_segment['frequency'] = segment.get('frequency', 'Unknown')
-            else:
-                # Continue the current segment group
-                current_segment['stops'].append(segment['to_name'])
-                current_segment['stop_ids'].append(segment['to_id'])
-                current_segment['distance'] += segment['distance']
-                current_segment['time'] += segment['time']
+            return _no_path_result(graph.build_networkx_graph(include_potential=False), start_id, end_id)
         
-        # Add the last segment group
-        if current_segment is not None:
-            route_summary.append(current_segment)
-        
-        # Compare with road-only route for improvement calculation
+        # Compare with the road-only route for improvement calculation
         road_only_time = None
         road_only_distance = None
-        
-        # Create a road-only graph
-        road_G = graph.build_networkx_graph(include_potential=False)
-        
-        # Ensure all edges are marked as road
-        for u, v, data in road_G.edges(data=True):
-            data['mode'] = 'road'
-        
-        # Update travel times based on traffic
-        for u, v, data in road_G.edges(data=True):
-            distance = data['distance']
-            condition = data.get('condition', 7)
-            base_speed = 40 * (condition / 10)
-            
-            # Check for traffic data
-            road_id = (str(u), str(v))
-            if road_id in graph.traffic_data:
-                traffic = graph.traffic_data[road_id][time_of_day]
-                capacity = data['capacity']
-                traffic_factor = max(0.2, 1 - (traffic / capacity))
-            else:
-                traffic_factor = 0.8
-                
-            # Calculate travel time
-            travel_time = (distance / (base_speed * traffic_factor)) * 60
-            road_G[u][v]['time'] = travel_time
-        
-        try:
-            # Find the shortest road-only path
-            road_path = nx.shortest_path(road_G, source=start_id, target=end_id, weight='time')
-            road_only_time = sum(road_G[road_path[i]][road_path[i+1]]['time'] for i in range(len(road_path)-1))
-            road_only_distance = sum(road_G[road_path[i]][road_path[i+1]]['distance'] for i in range(len(road_path)-1))
-        except nx.NetworkXNoPath:
-            # If no road-only path, leave as None
-            pass
+        road_route = router.route(start_id, end_id, modes=('road',))
+        if road_route is not None:
+            road_only_time = road_route.minutes
+            road_only_distance = road_route.km
         
         # Calculate improvement metrics
         time_saved = None
         percent_improvement = None
         
         if road_only_time is not None:
-            time_saved = road_only_time - total_time
+            time_saved = road_only_time - route.minutes
             if road_only_time > 0:
                 percent_improvement = (time_saved / road_only_time) * 100
         
-        return {
-            'success': True,
-            'path': path,
-            'path_names': [graph.nodes[node_id]['name'] for node_id in path],
-            'total_time_minutes': total_time,
-            'total_distance_km': total_distance,
-            'transfers': transfers,
-            'segments': segments,
-            'route_summary': route_summary,
+        result = _multimodal_result(graph, router, start_id, route)
+        result.update({
             'time_of_day': time_of_day,
             'road_only_time': road_only_time,
             'road_only_distance': road_only_distance,
             'time_saved_vs_road': time_saved,
-            'percent_improvement': percent_improvement,
-            'max_transfers_exceeded': max_transfers is not None and transfers > max_transfers
+            'percent_improvement': percent_improvement
+        })
+        return result
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Error finding multimodal route: {str(e)}"
         }
-    except nx.NetworkXNoPath:
+
+
+def multimodal_options(graph, start_id, end_id, time_of_day='morning', max_transfers=None):
+    """
+    Find the Pareto-optimal multimodal routes over travel time, transfers and road distance.
+    
+    One multi-criteria search on graph.multimodal_router() returns every route that no
+    other route beats on all three, e.g. the fastest route next to one with fewer changes
+    and one that spends less distance on the road.
+    
+    Args:
+        graph: The transportation graph object
+        start_id: Starting location ID
+        end_id: Destination location ID
+        time_of_day: Time period for traffic consideration
+        max_transfers: Maximum number of transfers allowed
+                      If None, no limit is imposed
+                      
+    Returns:
+        Dictionary with 'options', fastest first, each shaped like a multimodal_route() result;
+        on failure max_transfers_exceeded as in multimodal_route()
+    """
+    if start_id not in graph.nodes:
         return {
             'success': False,
-            'message': f"No path found between {start_id} and {end_id}"
+            'message': f"Start node {start_id} not found in the transportation network"
+        }
+    
+    if end_id not in graph.nodes:
+        return {
+            'success': False,
+            'message': f"End node {end_id} not found in the transportation network"
+        }
+    
+    try:
+        router = graph.multimodal_router(time_of_day)
+        routes = router.pareto(start_id, end_id, max_transfers)
+        if not routes:
+            if max_transfers is not None and router.route(start_id, end_id) is not None:
+                return {
+                    'success': False,
+                    'max_transfers_exceeded': True,
+                    'message': f"No route from {start_id} to {end_id} with at most {max_transfers} transfers"
+                }
+            return _no_path_result(graph.build_networkx_graph(include_potential=False), start_id, end_id)
+        
+        return {
+            'success': True,
+            'time_of_day': time_of_day,
+            'options': [_multimodal_result(graph, router, start_id, route) for route in routes]
         }
     except Exception as e:
         return {
             'success': False,
-            'message': f"Error finding multimodal route: {str(e)}"
-        }
\ No newline at end of file
+            'message': f"Error finding multimodal routes: {str(e)}"
+        }
+
+def _multimodal_result(graph, router, start_id, route):
+    """Path, totals, segments and legs of a MultimodalRoute, as returned by multimodal_route()."""
+    line_names = {line_id: name for line_id, name, _, _ in graph.metro_lines}
+    frequencies = {r.route_id: r.headway for r in router.timetable.routes if r.mode == 'bus'}
+    
+    segments = []
+    for seg in route.segments:
+        segment_info = {
+            'from_id': seg.u,
+            'to_id': seg.v,
+            'from_name': graph.nodes[seg.u]['name'],
+            'to_name': graph.nodes[seg.v]['name'],
+            'mode': seg.mode,
+            'type': seg.mode,
+            'distance': seg.km,
+            'time': seg.minutes
+        }
+        
+        # Add mode-specific details; waiting_time is the wait to board before this hop
+        if seg.mode == 'metro':
+            segment_info['line'] = line_names.get(seg.route, 'Unknown')
+            segment_info['line_id'] = seg.route
+            segment_info['waiting_time'] = seg.wait
+        elif seg.mode == 'bus':
+            segment_info['route'] = seg.route
+            segment_info['frequency'] = frequencies.get(seg.route, 'Unknown')
+            segment_info['waiting_time'] = seg.wait
+        
+        segments.append(segment_info)
+    
+    # Group segments into legs (one mode and route, boarded once) for a cleaner representation
+    route_summary = []
+    current_segment = None
+    
+    for seg, segment in zip(route.segments, segments):
+        same_leg = (current_segment is not None and seg.wait == 0
+                    and (segment['mode'], segment.get('route'), segment.get('line_id')) ==
+                    (current_segment['mode'], current_segment.get('route'), current_segment.get('line_id')))
+        if not same_leg:
+            # Start a new segment group
+            if current_segment is not None:
+                route_summary.append(current_segment)
+                
+            current_segment = {
+                'mode': segment['mode'],
+                'type': segment['type'],
+                'stops': [segment['from_name'], segment['to_name']],
+                'stop_ids': [segment['from_id'], segment['to_id']],
+                'distance': segment['distance'],
+                'time': segment['time'] + seg.wait
+            }
+            
+            # Add mode-specific details
+            if segment['mode'] == 'metro':
+                current_segment['line'] = segment['line']
+                current_segment['line_id'] = segment['line_id']
+                current_segment['waiting_time'] = seg.wait
+            elif segment['mode'] == 'bus':
+                current_segment['route'] = segment['route']
+                current_segment['frequency'] = segment['frequency']
+                current_segment['waiting_time'] = seg.wait
+        else:
+            # Continue the current segment group
+            current_segment['stops'].append(segment['to_name'])
+            current_segment['stop_ids'].append(segment['to_id'])
+            current_segment['distance'] += segment['distance']
+            current_segment['time'] += segment['time']
+    
+    # Add the last segment group
+    if current_segment is not None:
+        route_summary.append(current_segment)
+    
+    path = [start_id] + [seg.v for seg in route.segments]
+    
+    return {
+        'success': True,
+        'path': path,
+        'path_names': [graph.nodes[node_id]['name'] for node_id in path],
+        'total_time_minutes': route.minutes,
+        'total_distance_km': route.km,
+        'road_distance_km': route.road_km,
+        'transfers': route.transfers,
+        'segments': segments,
+        'route_summary': route_summary
+    }
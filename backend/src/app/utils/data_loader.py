@@ -1,293 +1,296 @@
 import pandas as pd
-import ast
+import numpy as np
+from typing import Iterator, List, Optional, Sequence
+
+# Possible column name variations of the CSV exports
+from_id_variants = ['FromID', 'From ID', 'From_ID', 'Source', 'Source ID']
+to_id_variants = ['ToID', 'To ID', 'To_ID', 'Target', 'Target ID']
+distance_variants = ['Distance (km)', 'Distance(km)', 'Distance_km', 'Length (km)']
+capacity_variants = ['Current Capacity (vehicles/hour)', 'Capacity (veh/h)', 'Current Capacity']
+condition_variants = ['Condition (1-10)', 'Condition', 'Road Condition']
+construction_cost_variants = ['Construction Cost (Million EGP)', 'Cost (Million EGP)', 'Construction Cost']
+estimated_capacity_variants = ['Estimated Capacity (vehicles/hour)', 'Est. Capacity', 'Estimated Capacity']
+morning_variants = ['Morning Peak (veh/h)', 'Morning', 'AM Peak']
+afternoon_variants = ['Afternoon (veh/h)', 'Afternoon', 'Midday']
+evening_variants = ['Evening Peak (veh/h)', 'Evening', 'PM Peak']
+night_variants = ['Night (veh/h)', 'Night', 'Late Night']
+line_id_variants = ['LineID', 'Line ID', 'Line Number']
+stations_variants = ['Stations (comma-separated IDs)', 'Stations', 'Station IDs']
+passengers_variants = ['Daily Passengers', 'Passengers', 'Daily Ridership']
+route_id_variants = ['RouteID', 'Route ID', 'Route Number']
+stops_variants = ['Stops (comma-separated IDs)', 'Stops', 'Stop IDs']
+buses_variants = ['Buses Assigned', 'Buses', 'Fleet Size']
+
+
+def find_column(columns, variants: Sequence[str]) -> Optional[str]:
+    """Return the first of variants present in columns, or None."""
+    return next((col for col in variants if col in columns), None)
+
+
+def read_columns(path) -> List[str]:
+    """Read only the header row of a CSV file."""
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def read_frames(path, usecols=None, chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield a CSV file as DataFrames, in chunks of chunksize rows when given.
+    Only the columns in usecols are parsed.
+    """
+    if usecols is not None:
+        usecols = [col for col in dict.fromkeys(usecols) if col is not None]
+    if chunksize:
+        yield from pd.read_csv(path, usecols=usecols, chunksize=chunksize)
+    else:
+        yield pd.read_csv(path, usecols=usecols)
+
+
+def convert_ids(series: pd.Series) -> list:
+    """
+    Convert numeric string IDs to integers for consistent processing, e.g. "3" -> 3.
+    Non-numeric IDs such as "F1" are kept as they are.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.tolist()
+    series = series.astype(object)
+    digits = series.map(type).eq(str) & series.str.isdigit().fillna(False).astype(bool)
+    if not digits.any():
+        return series.tolist()
+    converted = series.copy()
+    converted[digits] = series[digits].astype(np.int64).astype(object)
+    return converted.tolist()
+
+
+def parse_road_ids(series: pd.Series) -> list:
+    """
+    Parse RoadID values such as "(""1"",""3"")" into (from_id, to_id) tuples.
+    Values that are not two comma-separated IDs are kept as strings.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.tolist()
+    series = series.astype(object)
+    is_str = series.map(type).eq(str)
+    has_comma = is_str & series.str.contains(',', regex=False).fillna(False).astype(bool)
+    cleaned = series[has_comma].str.replace('"', '', regex=False).str.replace('(', '', regex=False) \
+        .str.replace(')', '', regex=False)
+    parts = cleaned.str.split(',')
+    pairs = parts.str.len() == 2
+
+    road_ids = series.astype(object)
+    road_ids[has_comma] = cleaned
+    if pairs.any():
+        from_ids = convert_ids(parts[pairs].str[0].str.strip())
+        to_ids = convert_ids(parts[pairs].str[1].str.strip())
+        road_ids[pairs[pairs].index] = pd.Series(list(zip(from_ids, to_ids)), index=pairs[pairs].index, dtype=object)
+    return road_ids.tolist()
+
+
+def _known_roads(graph, label: str, from_ids: list, to_ids: list, *columns: list) -> list:
+    """
+    Build road tuples for rows whose endpoints both exist in graph.nodes.
+    Rows that reference unknown nodes are reported and skipped.
+    """
+    nodes = graph.nodes
+    roads = []
+    for from_id, to_id, *values in zip(from_ids, to_ids, *columns):
+        # Only add roads where both endpoints exist in our nodes list
+        if from_id in nodes and to_id in nodes:
+            roads.append((from_id, to_id, *values))
+        else:
+            print(f"Warning: {label} from {from_id} to {to_id} references nodes that don't exist")
+    return roads
+
+
+def load_data_from_csv(graph, neighborhoods_file, facilities_file, existing_roads_file,
+                     potential_roads_file, traffic_file, metro_file, bus_file, demand_file,
+                     chunksize: Optional[int] = None):
+    """
+    Load all data from CSV files into the graph.
+    Column names are resolved once per file and each column is converted as a whole;
+    pass chunksize to stream large files in chunks of that many rows.
+    """
+
+    # A compacted node table is read-only; go back to dicts while loading
+    if not isinstance(graph.nodes, dict):
+        graph.nodes = graph.nodes.to_dict()
 
-def load_data_from_csv(graph, neighborhoods_file, facilities_file, existing_roads_file, 
-                     potential_roads_file, traffic_file, metro_file, bus_file, demand_file):
-    """Load all data from CSV files into the graph"""
-    
     # Load neighborhoods and districts
-    neighborhoods_df = pd.read_csv(neighborhoods_file)
-    print(f"Neighborhoods CSV columns: {neighborhoods_df.columns.tolist()}")
-    for _, row in neighborhoods_df.iterrows(): 
-        node_id = row['ID']
-        # Convert numeric IDs to integers
-        if isinstance(node_id, str) and node_id.isdigit():
-            node_id = int(node_id)
-            
-        graph.nodes[node_id] = {
-            'id': node_id,
-            'name': row['Name'],
-            'population': row['Population'],
-            'type': row['Type'],
-            'x': row['X-coordinate'],
-            'y': row['Y-coordinate'],
-            'is_facility': False
-        }
-        
+    columns = read_columns(neighborhoods_file)
+    print(f"Neighborhoods CSV columns: {columns}")
+    for df in read_frames(neighborhoods_file, chunksize=chunksize):
+        for node_id, name, population, node_type, x, y in zip(
+                convert_ids(df['ID']), df['Name'].tolist(), df['Population'].tolist(), df['Type'].tolist(),
+                df['X-coordinate'].tolist(), df['Y-coordinate'].tolist()):
+            graph.nodes[node_id] = {
+                'id': node_id,
+                'name': name,
+                'population': population,
+                'type': node_type,
+                'x': x,
+                'y': y,
+                'is_facility': False
+            }
+
     # Load facilities
-    facilities_df = pd.read_csv(facilities_file)
-    print(f"Facilities CSV columns: {facilities_df.columns.tolist()}")
-    for _, row in facilities_df.iterrows():
-        node_id = row['ID']
-        graph.nodes[node_id] = {
-            'id': node_id,
-            'name': row['Name'],
-            'type': row['Type'],
-            'x': row['X-coordinate'],
-            'y': row['Y-coordinate'],
-            'is_facility': True,
-            'population': 0  # Facilities don't have population
-        }
-        
+    columns = read_columns(facilities_file)
+    print(f"Facilities CSV columns: {columns}")
+    for df in read_frames(facilities_file, chunksize=chunksize):
+        for node_id, name, node_type, x, y in zip(
+                df['ID'].tolist(), df['Name'].tolist(), df['Type'].tolist(),
+                df['X-coordinate'].tolist(), df['Y-coordinate'].tolist()):
+            graph.nodes[node_id] = {
+                'id': node_id,
+                'name': name,
+                'type': node_type,
+                'x': x,
+                'y': y,
+                'is_facility': True,
+                'population': 0  # Facilities don't have population
+            }
+
     # Load existing roads
-    roads_df = pd.read_csv(existing_roads_file)
-    print(f"Existing Roads CSV columns: {roads_df.columns.tolist()}")
-    
-    # Define possible column name variations for existing roads
-    from_id_variants = ['FromID', 'From ID', 'From_ID', 'Source', 'Source ID']
-    to_id_variants = ['ToID', 'To ID', 'To_ID', 'Target', 'Target ID']
-    distance_variants = ['Distance (km)', 'Distance(km)', 'Distance_km', 'Length (km)']
-    capacity_variants = ['Current Capacity (vehicles/hour)', 'Capacity (veh/h)', 'Current Capacity']
-    condition_variants = ['Condition (1-10)', 'Condition', 'Road Condition']
-    
-    # Find the actual column names in the dataframe
-    from_id_col = next((col for col in from_id_variants if col in roads_df.columns), None)
-    to_id_col = next((col for col in to_id_variants if col in roads_df.columns), None)
-    distance_col = next((col for col in distance_variants if col in roads_df.columns), None)
-    capacity_col = next((col for col in capacity_variants if col in roads_df.columns), None)
-    condition_col = next((col for col in condition_variants if col in roads_df.columns), None)
-    
+    columns = read_columns(existing_roads_file)
+    print(f"Existing Roads CSV columns: {columns}")
+
+    # Find the actual column names in the file
+    from_id_col = find_column(columns, from_id_variants)
+    to_id_col = find_column(columns, to_id_variants)
+    distance_col = find_column(columns, distance_variants)
+    capacity_col = find_column(columns, capacity_variants)
+    condition_col = find_column(columns, condition_variants)
+
     print(f"Using column names: {from_id_col}, {to_id_col}, {distance_col}, {capacity_col}, {condition_col}")
-    
+
     graph.existing_roads = []
-    for _, row in roads_df.iterrows():
-        from_id = row[from_id_col]
-        to_id = row[to_id_col]
-        
-        # Convert numeric IDs to integers for consistent processing
-        if isinstance(from_id, str) and from_id.isdigit():
-            from_id = int(from_id)
-        if isinstance(to_id, str) and to_id.isdigit():
-            to_id = int(to_id)
-        
-        # Only add roads where both endpoints exist in our nodes list
-        if from_id in graph.nodes and to_id in graph.nodes:
-            graph.existing_roads.append(
-                (from_id, to_id, row[distance_col], row[capacity_col], row[condition_col])
-            )
-        else:
-            print(f"Warning: Road from {from_id} to {to_id} references nodes that don't exist")
-    
+    for df in read_frames(existing_roads_file, [from_id_col, to_id_col, distance_col, capacity_col, condition_col],
+                          chunksize):
+        graph.existing_roads.extend(_known_roads(
+            graph, "Road", convert_ids(df[from_id_col]), convert_ids(df[to_id_col]),
+            df[distance_col].tolist(), df[capacity_col].tolist(), df[condition_col].tolist()))
+
     # Load potential roads
-    potential_df = pd.read_csv(potential_roads_file)
-    print(f"Potential Roads CSV columns: {potential_df.columns.tolist()}")
-    
-    # Define possible column name variations for potential roads
-    construction_cost_variants = ['Construction Cost (Million EGP)', 'Cost (Million EGP)', 'Construction Cost']
-    estimated_capacity_variants = ['Estimated Capacity (vehicles/hour)', 'Est. Capacity', 'Estimated Capacity']
-    
+    columns = read_columns(potential_roads_file)
+    print(f"Potential Roads CSV columns: {columns}")
+
     # Find the actual column names
-    from_id_col = next((col for col in from_id_variants if col in potential_df.columns), None)
-    to_id_col = next((col for col in to_id_variants if col in potential_df.columns), None)
-    distance_col = next((col for col in distance_variants if col in potential_df.columns), None)
-    capacity_col = next((col for col in estimated_capacity_variants if col in potential_df.columns), None)
-    cost_col = next((col for col in construction_cost_variants if col in potential_df.columns), None)
-    
+    from_id_col = find_column(columns, from_id_variants)
+    to_id_col = find_column(columns, to_id_variants)
+    distance_col = find_column(columns, distance_variants)
+    capacity_col = find_column(columns, estimated_capacity_variants)
+    cost_col = find_column(columns, construction_cost_variants)
+
     print(f"Using column names for potential roads: {from_id_col}, {to_id_col}, {distance_col}, {capacity_col}, {cost_col}")
-    
+
     graph.potential_roads = []
-    for _, row in potential_df.iterrows():
-        from_id = row[from_id_col]
-        to_id = row[to_id_col]
-        
-        # Convert numeric IDs to integers for consistent processing
-        if isinstance(from_id, str) and from_id.isdigit():
-            from_id = int(from_id)
-        if isinstance(to_id, str) and to_id.isdigit():
-            to_id = int(to_id)
-        
-        # Only add roads where both endpoints exist in our nodes list
-        if from_id in graph.nodes and to_id in graph.nodes:
-            graph.potential_roads.append(
-                (from_id, to_id, row[distance_col], row[capacity_col], row[cost_col])
-            )
-        else:
-            print(f"Warning: Potential road from {from_id} to {to_id} references nodes that don't exist")
-    
+    for df in read_frames(potential_roads_file, [from_id_col, to_id_col, distance_col, capacity_col, cost_col],
+                          chunksize):
+        graph.potential_roads.extend(_known_roads(
+            graph, "Potential road", convert_ids(df[from_id_col]), convert_ids(df[to_id_col]),
+            df[distance_col].tolist(), df[capacity_col].tolist(), df[cost_col].tolist()))
+
     # Load traffic data with improved handling for different formats
-    traffic_df = pd.read_csv(traffic_file)
-    print(f"Traffic CSV columns: {traffic_df.columns.tolist()}")
-    
-    # Define traffic column variations
-    morning_variants = ['Morning Peak (veh/h)', 'Morning', 'AM Peak']
-    afternoon_variants = ['Afternoon (veh/h)', 'Afternoon', 'Midday']
-    evening_variants = ['Evening Peak (veh/h)', 'Evening', 'PM Peak']
-    night_variants = ['Night (veh/h)', 'Night', 'Late Night']
-    
+    columns = read_columns(traffic_file)
+    print(f"Traffic CSV columns: {columns}")
+
     # Find actual column names for time periods
-    morning_col = next((col for col in morning_variants if col in traffic_df.columns), None)
-    afternoon_col = next((col for col in afternoon_variants if col in traffic_df.columns), None)
-    evening_col = next((col for col in evening_variants if col in traffic_df.columns), None)
-    night_col = next((col for col in night_variants if col in traffic_df.columns), None)
-    
+    period_cols = [
+        find_column(columns, morning_variants),
+        find_column(columns, afternoon_variants),
+        find_column(columns, evening_variants),
+        find_column(columns, night_variants),
+    ]
+
     # Check if the traffic data format uses a single RoadID column or separate FromID/ToID columns
-    if 'RoadID' in traffic_df.columns:
+    if 'RoadID' in columns:
         print("Traffic data uses RoadID format")
-        # Format with a single RoadID column
-        for _, row in traffic_df.iterrows():
-            try:
-                # Handle the complex string format from the CSV: "(""1"",""3"")"
-                road_id_str = row['RoadID']
-                
-                # Clean up and parse the tuple string
-                if isinstance(road_id_str, str) and "," in road_id_str:
-                    # Try to extract the IDs from the string format
-                    road_id_str = road_id_str.replace('"', '').replace('(', '').replace(')', '')
-                    parts = road_id_str.split(',')
-                    if len(parts) == 2:
-                        # Create the road ID tuple as expected by the algorithm
-                        from_id = parts[0].strip()
-                        to_id = parts[1].strip()
-                        
-                        # Convert numeric IDs to integers for consistent processing
-                        if from_id.isdigit():
-                            from_id = int(from_id)
-                        if to_id.isdigit():
-                            to_id = int(to_id)
-                        
-                        # Use the tuple as the key - this matches how roads are identified in the graph
-                        road_id = (from_id, to_id)
-                    else:
-                        # Use the original as fallback
-                        road_id = road_id_str
-                else:
-                    road_id = road_id_str
-                
-                graph.traffic_data[road_id] = {
-                    'morning': row[morning_col],
-                    'afternoon': row[afternoon_col],
-                    'evening': row[evening_col],
-                    'night': row[night_col]
-                }
-                
+        for df in read_frames(traffic_file, ['RoadID'] + period_cols, chunksize):
+            # Handle the complex string format from the CSV: "(""1"",""3"")"
+            road_ids = parse_road_ids(df['RoadID'])
+            for road_id, *flows in zip(road_ids, *(df[col].tolist() for col in period_cols)):
+                graph.traffic_data[road_id] = dict(zip(('morning', 'afternoon', 'evening', 'night'), flows))
+
                 # Also add the reverse direction with the same traffic data
                 # This ensures bidirectional traffic is properly modeled
                 if isinstance(road_id, tuple):
-                    to_from_id = (road_id[1], road_id[0])
-                    graph.traffic_data[to_from_id] = {
-                        'morning': row[morning_col],
-                        'afternoon': row[afternoon_col],
-                        'evening': row[evening_col],
-                        'night': row[night_col]
-                    }
-            except Exception as e:
-                print(f"Error processing traffic data row {row['RoadID']}: {e}")
+                    graph.traffic_data[(road_id[1], road_id[0])] = dict(
+                        zip(('morning', 'afternoon', 'evening', 'night'), flows))
     else:
-        from_id_col = next((col for col in from_id_variants if col in traffic_df.columns), None)
-        to_id_col = next((col for col in to_id_variants if col in traffic_df.columns), None)
-        
-        print(f"Using traffic column names: {from_id_col}, {to_id_col}, {morning_col}, {afternoon_col}, {evening_col}, {night_col}")
-        
-        for _, row in traffic_df.iterrows():
-            from_id = row[from_id_col]
-            to_id = row[to_id_col]
-            
-            # Convert numeric IDs to integers for consistent processing
-            if isinstance(from_id, str) and from_id.isdigit():
-                from_id = int(from_id)
-            if isinstance(to_id, str) and to_id.isdigit():
-                to_id = int(to_id)
-                
-            road_id = (from_id, to_id)
-            graph.traffic_data[road_id] = {
-                'morning': row[morning_col],
-                'afternoon': row[afternoon_col],
-                'evening': row[evening_col],
-                'night': row[night_col]
-            }
-    
+        from_id_col = find_column(columns, from_id_variants)
+        to_id_col = find_column(columns, to_id_variants)
+
+        print(f"Using traffic column names: {from_id_col}, {to_id_col}, {', '.join(map(str, period_cols))}")
+
+        for df in read_frames(traffic_file, [from_id_col, to_id_col] + period_cols, chunksize):
+            road_ids = zip(convert_ids(df[from_id_col]), convert_ids(df[to_id_col]))
+            for road_id, *flows in zip(road_ids, *(df[col].tolist() for col in period_cols)):
+                graph.traffic_data[road_id] = dict(zip(('morning', 'afternoon', 'evening', 'night'), flows))
+
     # Load metro lines with improved handling
     try:
-        metro_df = pd.read_csv(metro_file)
-        print(f"Metro CSV columns: {metro_df.columns.tolist()}")
-        
-        # Define metro column variations
-        line_id_variants = ['LineID', 'Line ID', 'Line Number']
-        stations_variants = ['Stations (comma-separated IDs)', 'Stations', 'Station IDs']
-        passengers_variants = ['Daily Passengers', 'Passengers', 'Daily Ridership']
-        
-        line_id_col = next((col for col in line_id_variants if col in metro_df.columns), None)
-        name_col = 'Name' if 'Name' in metro_df.columns else next((col for col in ['Line Name', 'Route'] if col in metro_df.columns), None)
-        stations_col = next((col for col in stations_variants if col in metro_df.columns), None)
-        passengers_col = next((col for col in passengers_variants if col in metro_df.columns), None)
-        
+        columns = read_columns(metro_file)
+        print(f"Metro CSV columns: {columns}")
+
+        line_id_col = find_column(columns, line_id_variants)
+        name_col = 'Name' if 'Name' in columns else find_column(columns, ['Line Name', 'Route'])
+        stations_col = find_column(columns, stations_variants)
+        passengers_col = find_column(columns, passengers_variants)
+
         print(f"Using metro column names: {line_id_col}, {name_col}, {stations_col}, {passengers_col}")
-        
+
+        graph.metro_lines = []
         if line_id_col and name_col and stations_col and passengers_col:
-            graph.metro_lines = [
-                (row[line_id_col], row[name_col], row[stations_col], row[passengers_col]) 
-                for _, row in metro_df.iterrows()
-            ]
+            cols = [line_id_col, name_col, stations_col, passengers_col]
+            for df in read_frames(metro_file, cols, chunksize):
+                graph.metro_lines.extend(zip(*(df[col].tolist() for col in cols)))
         else:
             print("Warning: Could not find all required columns for metro lines")
-            graph.metro_lines = []
     except Exception as e:
         print(f"Error loading metro data: {e}")
         graph.metro_lines = []
-    
+
     # Load bus routes with improved handling
     try:
-        bus_df = pd.read_csv(bus_file)
-        print(f"Bus CSV columns: {bus_df.columns.tolist()}")
-        
-        route_id_variants = ['RouteID', 'Route ID', 'Route Number']
-        stops_variants = ['Stops (comma-separated IDs)', 'Stops', 'Stop IDs']
-        buses_variants = ['Buses Assigned', 'Buses', 'Fleet Size']
-        
-        route_id_col = next((col for col in route_id_variants if col in bus_df.columns), None)
-        stops_col = next((col for col in stops_variants if col in bus_df.columns), None)
-        buses_col = next((col for col in buses_variants if col in bus_df.columns), None)
-        passengers_col = next((col for col in passengers_variants if col in bus_df.columns), None)
-        
+        columns = read_columns(bus_file)
+        print(f"Bus CSV columns: {columns}")
+
+        route_id_col = find_column(columns, route_id_variants)
+        stops_col = find_column(columns, stops_variants)
+        buses_col = find_column(columns, buses_variants)
+        passengers_col = find_column(columns, passengers_variants)
+
         print(f"Using bus column names: {route_id_col}, {stops_col}, {buses_col}, {passengers_col}")
-        
+
+        graph.bus_routes = []
         if route_id_col and stops_col and buses_col and passengers_col:
-            graph.bus_routes = [
-                (row[route_id_col], row[stops_col], row[buses_col], row[passengers_col]) 
-                for _, row in bus_df.iterrows()
-            ]
+            cols = [route_id_col, stops_col, buses_col, passengers_col]
+            for df in read_frames(bus_file, cols, chunksize):
+                graph.bus_routes.extend(zip(*(df[col].tolist() for col in cols)))
         else:
             print("Warning: Could not find all required columns for bus routes")
-            graph.bus_routes = []
     except Exception as e:
         print(f"Error loading bus data: {e}")
         graph.bus_routes = []
-    
+
     # Load transport demand with improved handling
     try:
-        demand_df = pd.read_csv(demand_file)
-        print(f"Demand CSV columns: {demand_df.columns.tolist()}")
-        
-        from_id_col = next((col for col in from_id_variants if col in demand_df.columns), None)
-        to_id_col = next((col for col in to_id_variants if col in demand_df.columns), None)
-        passengers_col = next((col for col in passengers_variants if col in demand_df.columns), None)
-        
+        columns = read_columns(demand_file)
+        print(f"Demand CSV columns: {columns}")
+
+        from_id_col = find_column(columns, from_id_variants)
+        to_id_col = find_column(columns, to_id_variants)
+        passengers_col = find_column(columns, passengers_variants)
+
         print(f"Using demand column names: {from_id_col}, {to_id_col}, {passengers_col}")
-        
+
         if from_id_col and to_id_col and passengers_col:
-            for _, row in demand_df.iterrows():
-                from_id = row[from_id_col]
-                to_id = row[to_id_col]
-                
-                # Convert numeric IDs to integers for consistent processing
-                if isinstance(from_id, str) and from_id.isdigit():
-                    from_id = int(from_id)
-                if isinstance(to_id, str) and to_id.isdigit():
-                    to_id = int(to_id)
-                
-                key = (from_id, to_id)
-                graph.transport_demand[key] = row[passengers_col]
+            for df in read_frames(demand_file, [from_id_col, to_id_col, passengers_col], chunksize):
+                keys = zip(convert_ids(df[from_id_col]), convert_ids(df[to_id_col]))
+                graph.transport_demand.update(zip(keys, df[passengers_col].tolist()))
         else:
             print("Warning: Could not find all required columns for transport demand")
     except Exception as e:
-        print(f"Error loading demand data: {e}")
\ No newline at end of file
+        print(f"Error loading demand data: {e}")
+
+    # Store the nodes as an interned, column-backed table
+    graph.compact_nodes()
+    graph.invalidate_caches()
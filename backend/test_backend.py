@@ -8,6 +8,9 @@ from tabulate import tabulate
 # Base URL for the API
 BASE_URL = "http://localhost:5000/api"
 
+# Base URL of the planner blueprints (/flow, /network, ...)
+SERVICE_URL = "http://localhost:5000"
+
 class TestResult:
     def __init__(self, endpoint, status, success=None, message=None, data=None):
         self.endpoint = endpoint
@@ -93,6 +96,64 @@ def test_api_endpoint(endpoint, method="GET", payload=None, params=None, silent=
     if not silent:
         print("=" * 50)
 
+def test_service_endpoint(path, method="GET", payload=None, params=None, headers=None,
+                          expected_status=200, expected_key=None):
+    """Call a planner blueprint endpoint and check its status code and response keys"""
+    url = f"{SERVICE_URL}/{path}"
+    try:
+        if method == "GET":
+            response = requests.get(url, params=params, headers=headers)
+        else:
+            response = requests.post(url, json=payload, params=params, headers=headers)
+        data = response.json()
+    except requests.RequestException as e:
+        return TestResult(path, 0, False, f"Request failed: {e}")
+    except ValueError:
+        return TestResult(path, response.status_code, False, "Invalid JSON response")
+
+    success = response.status_code == expected_status and (expected_key is None or expected_key in data)
+    message = data.get('error', '') if isinstance(data, dict) else ''
+    return TestResult(path, response.status_code, success, message, data)
+
+def test_flow_endpoints():
+    """Test the batch, table, isochrone, timed-route and network endpoints"""
+    print("\n===== Testing Flow and Network Endpoints =====")
+
+    pairs = [{"origin": "1", "dest": "F1"}, {"origin": "2", "dest": "3"}]
+    cases = [
+        ("POST", "flow/route/batch", {"period": "morning", "pairs": pairs}, None, None, 200, "routes"),
+        ("POST", "flow/route/batch", {"period": "morning", "pairs": "x"}, None, None, 400, "error"),
+        ("POST", "flow/table", {"sources": ["1", "3"], "destinations": ["F1", "F2"], "period": "morning"},
+         None, None, 200, "durations"),
+        ("POST", "flow/table", {"sources": ["1"], "destinations": ["F1"], "profile": "emergency"},
+         None, None, 200, "durations"),
+        ("GET", "flow/isochrone", None, {"origin": "1", "period": "morning", "budgets": "10,20"},
+         None, 200, "isochrones"),
+        ("GET", "flow/isochrone", None, {"origin": "1", "budgets": "10", "hull": "1"}, None, 200, "isochrones"),
+        ("GET", "flow/isochrone", None, {"origin": "1", "budgets": "abc"}, None, 400, "error"),
+        ("GET", "flow/route/timed", None, {"origin": "1", "dest": "F1", "depart": "07:45"}, None, 200, "arrival"),
+        ("GET", "flow/route/timed", None, {"origin": "1", "dest": "F1", "depart": "25:99"}, None, 400, "error"),
+        ("GET", "flow/route/astar", None, {"origin": "1", "dest": "F1", "heuristic": "landmarks",
+                                          "alternatives": "2"}, None, 400, "error"),
+        ("GET", "network/snapshot", None, None, None, 200, "version"),
+        ("POST", "network/reload", {}, None, {"X-Reload-Token": "wrong-token"}, 403, "error"),
+    ]
+
+    results = []
+    for method, path, payload, params, headers, status, key in cases:
+        result = test_service_endpoint(path, method, payload, params, headers, status, key)
+        results.append((method, path, status, result))
+
+    table_data = [[method, path, status, result.status, '✓' if result.success else '✗', result.message]
+                  for method, path, status, result in results]
+    print(tabulate(table_data, headers=["Method", "Endpoint", "Expected", "Status", "Passed", "Message"]))
+
+    passed = sum(1 for *_, result in results if result.success)
+    print(f"\nFlow/Network Endpoints: {passed}/{len(results)} passed")
+    print("=" * 50)
+
+    return passed == len(results)
+
 def test_connectivity(all_nodes):
     """Test connectivity between key node pairs"""
     print("\n===== Testing Network Connectivity =====")
@@ -488,11 +549,14 @@ def run_comprehensive_tests():
         else:
             summary["failed"] += 1
     
+    summary["flow_endpoints"] = "PASS" if test_flow_endpoints() else "FAIL"
+
     print("\n===== Test Summary =====")
     print(f"Basic Endpoints: {summary['passed']}/{summary['passed'] + summary['failed']} passed")
     print(f"Network Connectivity: {summary['connectivity']}")
     print(f"Valid Paths Found: {summary['valid_paths']}")
     print(f"Multimodal Routing: {summary['multimodal']}")
+    print(f"Flow/Network Endpoints: {summary['flow_endpoints']}")
     
     pass_rate = (summary['passed'] / (summary['passed'] + summary['failed'])) * 100
     print(f"\nOverall API Success Rate: {pass_rate:.1f}%")
@@ -555,6 +619,8 @@ def run_tests():
         "off_peak_hours": "afternoon,night"
     })
     
+    test_flow_endpoints()
+    
     print("\nAll tests completed!")
 
 if __name__ == "__main__":
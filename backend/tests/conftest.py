@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The application package lives in backend/src and is imported as `app`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,59 @@
+"""
+Incremental catchment repair (FacilityCatchment.updated) checked against a full rebuild.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app.algorithm.catchment import FacilityCatchment
+from app.graph.compiled import ROAD, CompiledGraph, NodeIndex
+
+
+def random_graph(rnd):
+    n = rnd.randint(2, 60)
+    nodes = NodeIndex(str(i) for i in range(n))
+    records = []
+    for _ in range(rnd.randint(0, 3 * n)):
+        u, v = rnd.randrange(n), rnd.randrange(n)
+        if u != v:
+            records.append((u, v, rnd.uniform(0.1, 5.0), 1000, 5, None, ROAD, -1, False))
+    return CompiledGraph.from_edge_records(nodes, records)
+
+
+def assert_consistent(catchment, weights):
+    """Every label is reached from its parent over parent_edge, from the same facility."""
+    for v in range(catchment.graph.num_nodes):
+        p = catchment.parent[v]
+        if p < 0:
+            continue
+        e = catchment.parent_edge[v]
+        assert {catchment.graph.edge_u[e], catchment.graph.edge_v[e]} == {p, v}
+        assert catchment.facility[v] == catchment.facility[p]
+        assert catchment.minutes[v] == pytest.approx(catchment.minutes[p] + weights[e], abs=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_updated_matches_rebuild(seed):
+    rnd = random.Random(seed)
+    graph = random_graph(rnd)
+    facilities = rnd.sample(graph.nodes.ids, rnd.randint(1, min(4, graph.num_nodes)))
+    before = np.array([rnd.uniform(0.5, 10.0) for _ in range(graph.num_edges)])
+    catchment = FacilityCatchment.build(graph, before, facilities)
+
+    # Some edges get slower, some faster, some close (inf) and the rest stay
+    after = before.copy()
+    for e in range(graph.num_edges):
+        r = rnd.random()
+        if r < 0.25:
+            after[e] *= rnd.uniform(1.0, 4.0)
+        elif r < 0.5:
+            after[e] *= rnd.uniform(0.1, 1.0)
+        elif r < 0.55:
+            after[e] = np.inf
+
+    repaired = catchment.updated(graph, after)
+    rebuilt = FacilityCatchment.build(graph, after, facilities)
+    np.testing.assert_allclose(repaired.minutes, rebuilt.minutes, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(repaired.facility >= 0, rebuilt.facility >= 0)
+    assert_consistent(repaired, after)
@@ -0,0 +1,28 @@
+"""
+Streaming JSON reader (graph.json_stream.iter_json_array) against json.loads.
+"""
+import json
+
+import pytest
+
+from app.graph.json_stream import iter_json_array
+
+VALID = ['[]', ' [ ] \n', '[1, 2.5e3, -7]', '[{"a": [1, {"b": "]"}]}, "x,y", null]\n\n', '[{"n": 123456789}]']
+INVALID = ['', '{"a": 1}', '[1, 2', '[1 2]', '[1,]', '[{"a":1}] garbage{', '[] x', '[1] ]']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 20])
+@pytest.mark.parametrize('text', VALID)
+def test_matches_json_loads(tmp_path, text, chunk_size):
+    path = tmp_path / 'data.json'
+    path.write_text(text, encoding='utf-8')
+    assert list(iter_json_array(str(path), chunk_size)) == json.loads(text)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 20])
+@pytest.mark.parametrize('text', INVALID)
+def test_rejects_malformed_files(tmp_path, text, chunk_size):
+    path = tmp_path / 'data.json'
+    path.write_text(text, encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), chunk_size))
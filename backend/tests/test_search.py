@@ -0,0 +1,104 @@
+"""
+Shortest-path engines (bidirectional Dijkstra, A*, ALT, contraction hierarchies)
+checked against networkx on small random graphs.
+"""
+import math
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from app.algorithm.contraction import ContractionHierarchy
+from app.algorithm.landmarks import Landmarks
+from app.algorithm.search import RouteEngine
+from app.graph.compiled import ROAD, CompiledGraph, NodeIndex
+
+
+def random_graph(seed):
+    """(compiled graph, weights, x, y, networkx reference) with parallel edges, zero weights and islands."""
+    rnd = random.Random(seed)
+    n = rnd.randint(2, 40)
+    nodes = NodeIndex(str(i) for i in range(n))
+    records = []
+    for _ in range(rnd.randint(0, 3 * n)):
+        u, v = rnd.randrange(n), rnd.randrange(n)
+        if u != v:
+            # A second route index gives a parallel edge between the same pair
+            records.append((u, v, rnd.uniform(0.1, 5.0), 1000, 5, None, ROAD, rnd.choice((-1, 0)), False))
+    graph = CompiledGraph.from_edge_records(nodes, records, route_ids=('r',))
+    x = np.array([31.0 + rnd.random() * 0.3 for _ in range(n)])
+    y = np.array([30.0 + rnd.random() * 0.3 for _ in range(n)])
+    weights = np.array([0.0 if rnd.random() < 0.05 else d * rnd.uniform(1.0, 3.0) for d in graph.dist_km])
+    reference = nx.MultiGraph()
+    reference.add_nodes_from(nodes.ids)
+    for e in range(graph.num_edges):
+        reference.add_edge(nodes.ids[graph.edge_u[e]], nodes.ids[graph.edge_v[e]], weight=weights[e])
+    return graph, weights, x, y, reference
+
+
+def reference_costs(reference):
+    return dict(nx.all_pairs_dijkstra_path_length(reference, weight='weight'))
+
+
+def path_cost(reference, path):
+    return sum(min(d['weight'] for d in reference[a][b].values()) for a, b in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_route_engine_matches_networkx(seed):
+    graph, weights, x, y, reference = random_graph(seed)
+    costs = reference_costs(reference)
+    engines = {
+        'dijkstra': (RouteEngine(graph, weights, x, y), False),
+        'great_circle': (RouteEngine(graph, weights, x, y), 'great_circle'),
+        'landmarks': (RouteEngine(graph, weights, x, y, Landmarks.build(graph, weights, count=3)), 'landmarks'),
+    }
+    for origin in graph.nodes.ids:
+        for dest in graph.nodes.ids:
+            expected = costs[origin].get(dest, math.inf)
+            for name, (engine, heuristic) in engines.items():
+                if math.isinf(expected):
+                    assert math.isinf(engine.distance(origin, dest)), name
+                    with pytest.raises(nx.NetworkXNoPath):
+                        engine.shortest_path(origin, dest, heuristic=heuristic)
+                    continue
+                cost, path = engine.shortest_path(origin, dest, heuristic=heuristic)
+                assert cost == pytest.approx(expected, abs=1e-9), name
+                assert path[0] == origin and path[-1] == dest
+                assert path_cost(reference, path) == pytest.approx(expected, abs=1e-9), name
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_contraction_hierarchy_matches_networkx(seed):
+    graph, weights, _, _, reference = random_graph(seed)
+    costs = reference_costs(reference)
+    ch = ContractionHierarchy.build(graph, weights)
+    ids = graph.nodes.ids
+    for origin in ids:
+        for dest in ids:
+            expected = costs[origin].get(dest, math.inf)
+            if math.isinf(expected):
+                assert math.isinf(ch.distance(origin, dest))
+                continue
+            cost, path = ch.shortest_path(origin, dest)
+            assert cost == pytest.approx(expected, abs=1e-9)
+            assert path[0] == origin and path[-1] == dest
+            assert path_cost(reference, path) == pytest.approx(expected, abs=1e-9)
+
+    table, _ = ch.table(range(len(ids)), range(len(ids)))
+    for i, origin in enumerate(ids):
+        for j, dest in enumerate(ids):
+            assert table[i, j] == pytest.approx(costs[origin].get(dest, math.inf), abs=1e-9)
+
+
+def test_landmarks_bound_is_admissible():
+    graph, weights, _, _, reference = random_graph(7)
+    costs = reference_costs(reference)
+    landmarks = Landmarks.build(graph, weights, count=4)
+    ids = graph.nodes.ids
+    for v, origin in enumerate(ids):
+        for t, dest in enumerate(ids):
+            expected = costs[origin].get(dest, math.inf)
+            if not math.isinf(expected):
+                assert landmarks.lower_bound(v, t) <= expected + 1e-9